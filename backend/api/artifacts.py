@@ -0,0 +1,208 @@
+# backend/api/artifacts.py
+"""
+Storage layout of saved backtest results.
+
+A result holds a few headline statistics next to series that grow with the
+data: the equity curve, its dates and every trade. Stored together, listing
+ten backtests deserialized ten equity curves. Results are therefore split
+when a backtest is saved:
+
+- summary columns on Backtest (return, final equity, trade count and
+  maximum drawdown) for lists, dashboards and ordering;
+- the light sections (stats, monte_carlo, ...) in Backtest.results;
+- the heavy sections (HEAVY_RESULT_KEYS) compressed into a BacktestArtifact
+  row, only read when one backtest's full results are requested.
+
+Artifacts are written in a binary columnar layout (COLUMNAR_ENCODING) and
+lzma-compressed:
+
+- the equity curve as a float64 array, so values round-trip exactly;
+- the dates as the first bar's epoch minute, the usual bar interval and the
+  list of (position, interval) gaps where the series deviates from it
+  (weekends, sessions, missing bars), instead of one string per bar;
+- the trades column by column, which groups their repetitive display
+  strings for the compressor.
+
+Payload layout before compression: a little-endian uint32 header length,
+the JSON header (counts, interval, trade columns and anything that is not
+one of the arrays), then the equity and gap arrays. Artifacts saved as
+compressed JSON (JSON_ZLIB_ENCODING) remain readable.
+"""
+import json
+import lzma
+import struct
+import zlib
+
+import numpy as np
+import pandas as pd
+
+HEAVY_RESULT_KEYS = ('plot_data', 'trades')
+
+# Encodings a BacktestArtifact payload can be stored in
+JSON_ZLIB_ENCODING = 'json+zlib'
+COLUMNAR_ENCODING = 'columnar+lzma'
+
+DATE_FORMAT = '%Y-%m-%d %H:%M'
+
+
+def parse_stat(value):
+    """A formatted statistic ('12,970.04', '-3.20') as a float, or None."""
+    try:
+        return float(str(value).replace(',', '').replace('$', ''))
+    except (TypeError, ValueError):
+        return None
+
+
+def max_drawdown_pct(equity_curve):
+    """Largest peak-to-trough fall of an equity curve, as a negative percentage (0 when it never falls)."""
+    equity = np.asarray(equity_curve, dtype=float)
+    if not len(equity):
+        return None
+    peaks = np.maximum.accumulate(equity)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drawdowns = np.where(peaks > 0, (equity - peaks) / peaks * 100, 0.0)
+    return round(float(drawdowns.min()), 2)
+
+
+def summary_fields(results):
+    """Values of the Backtest summary columns for a result."""
+    stats = results.get('stats') or {}
+    trade_count = stats.get('# Trades', 0)
+    return {
+        'return_pct': parse_stat(stats.get('Return [%]')),
+        'final_equity': parse_stat(stats.get('Equity Final [$]')),
+        'trade_count': trade_count if isinstance(trade_count, int) else 0,
+        'max_drawdown': max_drawdown_pct((results.get('plot_data') or {}).get('equity_curve', [])),
+    }
+
+
+def split_results(results):
+    """Split a result into its (light, heavy) sections."""
+    light = {key: value for key, value in results.items() if key not in HEAVY_RESULT_KEYS}
+    heavy = {key: results[key] for key in HEAVY_RESULT_KEYS if key in results}
+    return light, heavy
+
+
+def date_minutes(dates):
+    """Epoch minutes of a list of formatted dates, or None if they are not all in DATE_FORMAT."""
+    try:
+        parsed = pd.to_datetime(pd.Series(dates, dtype=object), format=DATE_FORMAT)
+    except (TypeError, ValueError):
+        return None
+    if parsed.isna().any():
+        return None
+    return parsed.to_numpy(dtype='datetime64[m]').astype(np.int64)
+
+
+def format_minutes(minutes):
+    """Inverse of date_minutes."""
+    # ISO strings ('2020-01-01T00:00') are DATE_FORMAT with a 'T', and much faster than strftime
+    as_dates = np.asarray(minutes, dtype=np.int64).astype('datetime64[m]')
+    return [date.replace('T', ' ') for date in np.datetime_as_string(as_dates, unit='m').tolist()]
+
+
+def encode_dates(dates):
+    """
+    (start, interval, gaps) for a list of formatted dates, in epoch minutes;
+    gaps is an (n x 2) array of (position, minutes since the previous date).
+    Returns None if the dates are not all in DATE_FORMAT.
+    """
+    minutes = date_minutes(dates)
+    if minutes is None:
+        return None
+
+    steps = np.diff(minutes)
+    interval = 0
+    if len(steps):
+        values, counts = np.unique(steps, return_counts=True)
+        interval = int(values[np.argmax(counts)])
+    positions = np.flatnonzero(steps != interval) + 1
+    gaps = np.column_stack([positions, steps[positions - 1]]).astype('<i8')
+    return int(minutes[0]), interval, gaps
+
+
+def decode_dates(start, interval, gaps, count):
+    """Inverse of encode_dates."""
+    steps = np.full(count, interval, dtype=np.int64)
+    steps[0] = start
+    if len(gaps):
+        steps[gaps[:, 0]] = gaps[:, 1]
+    return format_minutes(np.cumsum(steps))
+
+
+def encode_artifact(heavy):
+    """Compress the heavy sections of a result. Returns (encoding, payload)."""
+    header = {key: value for key, value in heavy.items() if key not in HEAVY_RESULT_KEYS}
+    equity = np.empty(0, dtype='<f8')
+    gaps = np.empty((0, 2), dtype='<i8')
+
+    if 'plot_data' in heavy:
+        plot_data = dict(heavy['plot_data'])
+        if 'equity_curve' in plot_data:
+            equity = np.asarray(plot_data.pop('equity_curve'), dtype='<f8')
+            header['equity_count'] = len(equity)
+        encoded_dates = encode_dates(plot_data['dates']) if plot_data.get('dates') else None
+        if encoded_dates is not None:
+            start, interval, gaps = encoded_dates
+            header['dates'] = {'start': start, 'interval': interval, 'count': len(plot_data.pop('dates')), 'gaps': len(gaps)}
+        header['plot_data'] = plot_data
+
+    if 'trades' in heavy:
+        trades = heavy['trades']
+        columns = list(dict.fromkeys(key for trade in trades for key in trade))
+        header['trades'] = {
+            'count': len(trades),
+            'columns': {column: [trade.get(column) for trade in trades] for column in columns},
+            # Positions of the trades lacking a column, for the rare columns not every trade has
+            'missing': {
+                column: [n for n, trade in enumerate(trades) if column not in trade]
+                for column in columns if any(column not in trade for trade in trades)
+            },
+        }
+
+    encoded_header = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    raw = struct.pack('<I', len(encoded_header)) + encoded_header + equity.tobytes() + gaps.tobytes()
+    return COLUMNAR_ENCODING, lzma.compress(raw)
+
+
+def decode_columnar(raw):
+    """The heavy sections in a decompressed COLUMNAR_ENCODING payload."""
+    header_length, = struct.unpack_from('<I', raw)
+    offset = 4 + header_length
+    header = json.loads(raw[4:offset].decode('utf-8'))
+
+    heavy = header
+    equity_count = heavy.pop('equity_count', None)
+    dates = heavy.pop('dates', None)
+    trades = heavy.pop('trades', None)
+
+    if 'plot_data' in heavy:
+        plot_data = {}
+        if equity_count is not None:
+            equity = np.frombuffer(raw, dtype='<f8', count=equity_count, offset=offset)
+            offset += equity.nbytes
+            plot_data['equity_curve'] = equity.tolist()
+        if dates is not None:
+            gaps = np.frombuffer(raw, dtype='<i8', count=2 * dates['gaps'], offset=offset).reshape(-1, 2)
+            plot_data['dates'] = decode_dates(dates['start'], dates['interval'], gaps, dates['count'])
+        heavy['plot_data'] = {**plot_data, **heavy['plot_data']}
+
+    if trades is not None:
+        missing = {column: set(positions) for column, positions in trades['missing'].items()}
+        heavy['trades'] = [
+            {
+                column: values[n] for column, values in trades['columns'].items()
+                if column not in missing or n not in missing[column]
+            }
+            for n in range(trades['count'])
+        ]
+    return heavy
+
+
+def decode_artifact(encoding, payload):
+    """The heavy sections stored in an artifact payload."""
+    if encoding == COLUMNAR_ENCODING:
+        return decode_columnar(lzma.decompress(bytes(payload)))
+    if encoding == JSON_ZLIB_ENCODING:
+        return json.loads(zlib.decompress(bytes(payload)).decode('utf-8'))
+    raise ValueError(f"Unknown backtest artifact encoding '{encoding}'.")
@@ -0,0 +1,1189 @@
+# backend/api/backtest_service.py
+"""
+The backtest request pipeline shared by the synchronous /api/backtest/ view
+and the background job workers: parse parameters, load market data, enforce
+tier entitlements, run the engine and persist the result.
+"""
+import contextlib
+import copy
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+from rest_framework import status
+
+from .models import Backtest, BacktestArtifact, BacktestChartTile, UserProfile
+from .quota import usage_today, consume_backtest, refund_backtest
+from .artifacts import summary_fields, split_results, encode_artifact, date_minutes, format_minutes
+from .pyramid import PYRAMID_FACTOR, build_pyramid, pyramid_tiles, decode_tile, level_for_budget, window_points, TILE_BUCKETS
+from .downsampling import DEFAULT_MAX_POINTS, MIN_MAX_POINTS, MAX_MAX_POINTS
+from .chart_data import OHLCV_COLUMNS, CHART_DATA_ENCODINGS, CHART_DATA_DTYPES, strategy_chart_columns, chart_frame_columns
+from .backtester import validate_strategy_config
+from .csv_data_loader import load_csv_data, check_csv_coverage, get_available_tickers, get_available_timeframes
+from .lanes import run_leverage_sweep, DEFAULT_SWEEP_LEVERAGES, MAX_SWEEP_LEVERAGES
+from .optimizer import (
+    parse_parameter_grid, grid_size, summarize_results, build_grid, build_combinations, sample_grid, set_parameter, run_grid_search,
+    run_halving_search, run_walk_forward, RANKABLE_STATS, SEARCH_METHODS, SAMPLING_METHODS, DEFAULT_HALVING_SAMPLES,
+    DEFAULT_HALVING_ETA, DEFAULT_WALK_FORWARD_FOLDS, MAX_WALK_FORWARD_FOLDS, DEFAULT_TRAIN_RATIO,
+)
+from .portfolio import run_portfolio_backtest, MIN_PORTFOLIO_ASSETS, MAX_PORTFOLIO_ASSETS
+from .pipeline import (
+    run_staged_backtest, prepare_cached_indicators, cached_stage, data_cache, market_data_key, frame_size,
+)
+from .result_cache import canonical_request_hash, backtest_result_cache, backtest_single_flight
+
+logger = logging.getLogger(__name__)
+
+MAX_SAVED_BACKTESTS = 10  # Per user; older backtests are deleted as new ones are saved
+
+
+class BacktestError(Exception):
+    """A backtest request that cannot be fulfilled, with the HTTP status to report it under."""
+
+    def __init__(self, message, status_code=status.HTTP_400_BAD_REQUEST):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def fetch_csv_data(ticker, start_date, end_date, timeframe):
+    """Fetch data from local CSV files"""
+    try:
+        data, data_range_info = load_csv_data(ticker, start_date, end_date, timeframe)
+        return data, data_range_info
+    except Exception as e:
+        raise ValueError(f"CSV data loading error: {str(e)}")
+
+
+def fetch_market_data(ticker, start_date, end_date, timeframe):
+    """
+    Fetch market data from local CSV files.
+    """
+    try:
+        print(f"Loading CSV data for {ticker}")
+        data, data_range_info = fetch_csv_data(ticker, start_date, end_date, timeframe)
+        print(f"Successfully loaded CSV data: {data.shape}")
+        return data, data_range_info
+    except Exception as e:
+        error_msg = f"CSV data loading failed: {str(e)}"
+        print(error_msg)
+        raise ValueError(error_msg)
+
+
+def parse_backtest_params(data):
+    """
+    Read and validate the backtest parameters from request data.
+    Returns a plain dict that can be stored on a job and replayed later.
+    """
+    params = {
+        'strategy_id': data.get('strategy_id'),
+        'ticker': data.get('ticker', 'AAPL'),
+        'start_date': data.get('start_date', '2022-01-01'),
+        'end_date': data.get('end_date', '2023-01-01'),
+        'timeframe': data.get('timeframe', 'day'),  # Polygon uses 'day', 'hour', 'minute'
+        'cash': int(data.get('cash', 10000)),
+        'leverage': float(data.get('leverage', 1.0)),
+    }
+
+    if not params['strategy_id']:
+        raise BacktestError("Strategy ID is required.")
+
+    if params['cash'] <= 0:
+        raise BacktestError("Initial cash must be positive.")
+
+    if params['leverage'] < 1.0 or params['leverage'] > 10.0:
+        raise BacktestError("Leverage must be between 1x and 10x.")
+
+    if not params['ticker'] or not params['ticker'].strip():
+        raise BacktestError("Ticker symbol is required.")
+
+    return params
+
+
+def parse_max_points(data):
+    """Read how many equity points a chart may receive (see downsampling)."""
+    try:
+        max_points = int(data.get('max_points', DEFAULT_MAX_POINTS))
+    except (TypeError, ValueError):
+        raise BacktestError("Max points must be a whole number.")
+    if max_points < MIN_MAX_POINTS or max_points > MAX_MAX_POINTS:
+        raise BacktestError(f"Max points must be between {MIN_MAX_POINTS} and {MAX_MAX_POINTS}.")
+    return max_points
+
+
+def parse_sweep_leverages(data):
+    """Read the list of leverages for a leverage sweep (duplicates removed, order kept)."""
+    leverages = data.get('leverages', DEFAULT_SWEEP_LEVERAGES)
+    if not isinstance(leverages, (list, tuple)) or not leverages:
+        raise BacktestError("Leverages must be a non-empty list.")
+    if len(leverages) > MAX_SWEEP_LEVERAGES:
+        raise BacktestError(f"At most {MAX_SWEEP_LEVERAGES} leverage values can be compared at once.")
+
+    parsed = []
+    for leverage in leverages:
+        try:
+            leverage = float(leverage)
+        except (TypeError, ValueError):
+            raise BacktestError("Leverage must be a number.")
+        if leverage < 1.0 or leverage > 10.0:
+            raise BacktestError("Leverage must be between 1x and 10x.")
+        if leverage not in parsed:
+            parsed.append(leverage)
+    return parsed
+
+
+def parse_search_options(data):
+    """Read how an optimization searches the grid: every combination, or successive halving over samples."""
+    method = data.get('method', 'grid')
+    if method not in SEARCH_METHODS:
+        raise BacktestError(f"Unknown search method '{method}'. Choose one of: {', '.join(SEARCH_METHODS)}.")
+    if method == 'grid':
+        return {'method': method}
+
+    sampling = data.get('sampling', 'latin_hypercube')
+    if sampling not in SAMPLING_METHODS:
+        raise BacktestError(f"Unknown sampling '{sampling}'. Choose one of: {', '.join(SAMPLING_METHODS)}.")
+    try:
+        samples = int(data.get('samples', DEFAULT_HALVING_SAMPLES))
+        eta = int(data.get('eta', DEFAULT_HALVING_ETA))
+        seed = int(data.get('seed', 0))
+    except (TypeError, ValueError):
+        raise BacktestError("Samples, eta and seed must be whole numbers.")
+    if samples < 1:
+        raise BacktestError("Samples must be at least 1.")
+    if eta < 2:
+        raise BacktestError("Eta must be at least 2.")
+    return {'method': method, 'sampling': sampling, 'samples': samples, 'eta': eta, 'seed': seed}
+
+
+def parse_optimization_params(data):
+    """
+    Read the parameters of an optimization: the backtest parameters, plus the
+    grid to search ('parameters' in the request), the statistic to rank by,
+    how many ranked rows to report and the search options.
+    """
+    params = parse_backtest_params(data)
+    try:
+        top = int(data.get('top', 20))
+    except (TypeError, ValueError):
+        raise BacktestError("Top must be a whole number.")
+
+    rank_by = data.get('rank_by', 'Return [%]')
+    if rank_by not in RANKABLE_STATS:
+        raise BacktestError(f"Cannot rank by '{rank_by}'. Choose one of: {', '.join(RANKABLE_STATS)}.")
+
+    params.update({
+        'grid': data.get('parameters'),
+        'rank_by': rank_by,
+        'top': max(1, top),
+        'search': parse_search_options(data),
+    })
+    return params
+
+
+def parse_walk_forward_params(data):
+    """
+    Read the parameters of a walk-forward optimization: the backtest
+    parameters, plus the grid to search ('parameters' in the request), the
+    statistic to rank by and the fold layout.
+    """
+    params = parse_backtest_params(data)
+    rank_by = data.get('rank_by', 'Return [%]')
+    if rank_by not in RANKABLE_STATS:
+        raise BacktestError(f"Cannot rank by '{rank_by}'. Choose one of: {', '.join(RANKABLE_STATS)}.")
+
+    params.update({'grid': data.get('parameters'), 'rank_by': rank_by, 'walk_forward': parse_walk_forward_options(data)})
+    return params
+
+
+def parse_walk_forward_options(data):
+    """Read the fold layout of a walk-forward optimization."""
+    try:
+        folds = int(data.get('folds', DEFAULT_WALK_FORWARD_FOLDS))
+        train_ratio = float(data.get('train_ratio', DEFAULT_TRAIN_RATIO))
+    except (TypeError, ValueError):
+        raise BacktestError("Folds must be a whole number and the train ratio a number.")
+    if folds < 1 or folds > MAX_WALK_FORWARD_FOLDS:
+        raise BacktestError(f"Folds must be between 1 and {MAX_WALK_FORWARD_FOLDS}.")
+    if train_ratio <= 0:
+        raise BacktestError("The train ratio must be positive.")
+    return {'folds': folds, 'train_ratio': train_ratio, 'anchored': bool(data.get('anchored', False))}
+
+
+def parse_portfolio_tickers(data):
+    """Read the tickers of a portfolio backtest (upper-cased, duplicates removed, order kept)."""
+    tickers = data.get('tickers')
+    if not isinstance(tickers, (list, tuple)):
+        raise BacktestError("Tickers must be a list.")
+
+    parsed = []
+    for ticker in tickers:
+        ticker = str(ticker).strip().upper()
+        if not ticker:
+            raise BacktestError("Ticker symbol is required.")
+        if ticker not in parsed:
+            parsed.append(ticker)
+
+    if len(parsed) < MIN_PORTFOLIO_ASSETS or len(parsed) > MAX_PORTFOLIO_ASSETS:
+        raise BacktestError(f"A portfolio must hold between {MIN_PORTFOLIO_ASSETS} and {MAX_PORTFOLIO_ASSETS} tickers.")
+    return parsed
+
+
+def parse_batch_params(user, data):
+    """
+    Read the parameters of a batch backtest. The datasets are every available
+    pairing of the requested `tickers` and `timeframes`, each defaulting to
+    everything the user's tier allows. Returns the parameters with a
+    'datasets' list of [ticker, timeframe] pairs in place of ticker and timeframe.
+    """
+    params = parse_backtest_params(data)
+    del params['ticker'], params['timeframe']
+
+    tickers = data.get('tickers')
+    timeframes = data.get('timeframes')
+    for name, values in (('Tickers', tickers), ('Timeframes', timeframes)):
+        if values is not None and (not isinstance(values, (list, tuple)) or not values):
+            raise BacktestError(f"{name} must be a non-empty list.")
+
+    allowed_tickers = user.profile.get_allowed_tickers()
+    if tickers is None:
+        tickers = sorted(
+            ticker for ticker in get_available_tickers() if allowed_tickers is None or ticker in allowed_tickers
+        )
+    else:
+        tickers = [str(ticker).strip().upper() for ticker in tickers]
+
+    datasets = []
+    for ticker in tickers:
+        available = get_available_timeframes(ticker)
+        requested = timeframes if timeframes is not None else user.profile.get_allowed_timeframes()
+        for timeframe in requested:
+            check_tier_entitlements(user, ticker, timeframe)
+            if timeframe in available and [ticker, timeframe] not in datasets:
+                datasets.append([ticker, timeframe])
+
+    if not datasets:
+        raise BacktestError("No data is available for the requested tickers and timeframes.")
+
+    dataset_limit = user.profile.get_batch_dataset_limit()
+    if len(datasets) > dataset_limit:
+        raise BacktestError(
+            f"This batch covers {len(datasets)} datasets, but your {user.profile.tier.title()} tier allows "
+            f"up to {dataset_limit} per batch. Please select fewer tickers or timeframes, or upgrade your plan.",
+            status.HTTP_403_FORBIDDEN
+        )
+
+    params['datasets'] = datasets
+    return params
+
+
+def build_data_range_message(ticker, start_date, end_date, data_range_info):
+    """Describe how well the loaded data covers the requested date range."""
+    requested_start = pd.to_datetime(start_date)
+    requested_end = pd.to_datetime(end_date)
+    actual_start = pd.to_datetime(data_range_info['actual_start'])
+    actual_end = pd.to_datetime(data_range_info['actual_end'])
+
+    # Calculate the coverage of the requested range
+    requested_days = (requested_end - requested_start).days
+    actual_days = (actual_end - actual_start).days
+
+    # Debug logging
+    print(f"Debug: Requested range: {start_date} to {end_date} ({requested_days} days)")
+    print(f"Debug: Actual data range: {data_range_info['actual_start']} to {data_range_info['actual_end']} ({actual_days} days)")
+
+    # Calculate what percentage of the requested range we actually have
+    # We'll consider it a full range if we have at least 80% of the requested days
+    # and the actual range overlaps significantly with the requested range
+    coverage_threshold = 0.8  # 80% coverage
+
+    # Check if the actual range significantly overlaps with the requested range
+    overlap_start = max(requested_start, actual_start)
+    overlap_end = min(requested_end, actual_end)
+    overlap_days = max(0, (overlap_end - overlap_start).days)
+
+    # Calculate coverage percentage
+    coverage_percentage = overlap_days / requested_days if requested_days > 0 else 0
+
+    # Debug logging
+    print(f"Debug: Overlap: {overlap_start} to {overlap_end} ({overlap_days} days)")
+    print(f"Debug: Coverage percentage: {coverage_percentage:.1%}")
+
+    # Determine if this is a significant portion of the requested range
+    is_significant_coverage = coverage_percentage >= coverage_threshold
+
+    # Check if we have limited overlap with the requested range
+    # This should be based on overlap, not total actual days
+    is_limited_data = overlap_days < (requested_days * 0.5)  # Less than 50% overlap
+
+    if is_limited_data or not is_significant_coverage:
+        # Check if there's no overlap at all
+        if overlap_days == 0:
+            message = f"⚠️ No data available for requested range. You requested {start_date} to {end_date}, but data is only available from {data_range_info['actual_start']} to {data_range_info['actual_end']} for {ticker}."
+        else:
+            message = f"⚠️ Limited data available for requested range. You requested {start_date} to {end_date} ({requested_days} days), but only {overlap_days} days overlap with available data from {data_range_info['actual_start']} to {data_range_info['actual_end']} for {ticker}."
+
+        return {
+            'warning': True,
+            'message': message,
+            'requested_range': f"{start_date} to {end_date}",
+            'available_range': f"{data_range_info['actual_start']} to {data_range_info['actual_end']}",
+            'data_points': data_range_info['data_points'],
+            'data_source': data_range_info['source'],
+            'coverage_percentage': round(coverage_percentage * 100, 1),
+            'overlap_days': overlap_days
+        }
+    elif coverage_percentage >= 0.95:  # 95% or more coverage
+        return {
+            'warning': False,
+            'message': f"✅ Full data range available: {start_date} to {end_date}",
+            'requested_range': f"{start_date} to {end_date}",
+            'available_range': f"{data_range_info['actual_start']} to {data_range_info['actual_end']}",
+            'data_points': data_range_info['data_points'],
+            'data_source': data_range_info['source'],
+            'coverage_percentage': round(coverage_percentage * 100, 1)
+        }
+    else:
+        return {
+            'warning': False,
+            'message': f"📊 Partial data range available: {data_range_info['actual_start']} to {data_range_info['actual_end']} (requested {start_date} to {end_date})",
+            'requested_range': f"{start_date} to {end_date}",
+            'available_range': f"{data_range_info['actual_start']} to {data_range_info['actual_end']}",
+            'data_points': data_range_info['data_points'],
+            'data_source': data_range_info['source'],
+            'coverage_percentage': round(coverage_percentage * 100, 1)
+        }
+
+
+def check_tier_entitlements(user, ticker, timeframe):
+    """Raise BacktestError if the user's tier does not include the ticker or timeframe."""
+    # Check if the requested timeframe is allowed for the user's tier
+    user_tier = user.profile.tier
+    allowed_timeframes = user.profile.get_allowed_timeframes()
+    if timeframe not in allowed_timeframes:
+        raise BacktestError(
+            f"Timeframe '{timeframe}' is not available for your current tier '{user_tier}'. "
+            f"Your tier allows: {', '.join(allowed_timeframes)}. "
+            f"Please upgrade your plan to access more timeframes.",
+            status.HTTP_403_FORBIDDEN
+        )
+
+    # Check if the requested ticker is allowed for the user's tier
+    allowed_tickers = user.profile.get_allowed_tickers()
+    if allowed_tickers is not None and ticker not in allowed_tickers:
+        raise BacktestError(
+            f"Ticker '{ticker}' is not available for your current tier '{user_tier}'. "
+            f"Your tier allows: {', '.join(allowed_tickers)}. "
+            f"Please upgrade your plan to access more tickers.",
+            status.HTTP_403_FORBIDDEN
+        )
+
+
+def market_data_error(ticker, error_msg):
+    """The BacktestError reported for a market data loading failure."""
+    if "API key" in error_msg.lower():
+        return BacktestError("Invalid API key. Please check your Alpha Vantage or Polygon API configuration.", status.HTTP_500_INTERNAL_SERVER_ERROR)
+    elif "not found" in error_msg.lower() or "invalid" in error_msg.lower():
+        return BacktestError(f"Invalid ticker symbol: {ticker}. Please check the symbol and try again.")
+    else:
+        return BacktestError(f"Could not fetch market data from Polygon, yfinance, or Alpha Vantage: {error_msg}", status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def load_market_data(ticker, start_date, end_date, timeframe):
+    """
+    Load and validate market data (through the data stage cache).
+    Returns (data, data_range_info); raises BacktestError on any failure.
+    """
+    data_key = market_data_key(ticker, start_date, end_date, timeframe)
+    try:
+        data, data_range_info = cached_stage(
+            data_cache, data_key,
+            lambda: fetch_market_data(ticker, start_date, end_date, timeframe),
+            size=lambda loaded: frame_size(loaded[0])
+        )
+    except Exception as e:
+        raise market_data_error(ticker, str(e))
+
+    # Debug: Print the actual columns we received
+    print(f"Debug: Data columns: {list(data.columns)}")
+    print(f"Debug: Data shape: {data.shape}")
+    print(f"Debug: Sample data:\n{data.head()}")
+    print(f"Debug: Data source: {data_range_info.get('source', 'unknown')}")
+
+    # Check if we have the required 'Close' column
+    if 'Close' not in data.columns:
+        available_columns = list(data.columns)
+        raise BacktestError(f"Data format error: 'Close' column not found. Available columns: {available_columns}. Please check your data source.")
+
+    # Ensure we have all required columns
+    required_columns = ['Open', 'High', 'Low', 'Close', 'Volume']
+    missing_columns = [col for col in required_columns if col not in data.columns]
+    if missing_columns:
+        raise BacktestError(f"Missing required columns: {missing_columns}. Available columns: {list(data.columns)}")
+
+    # Validate data quality
+    if data.empty:
+        raise BacktestError(f"No valid data found for {ticker} in the specified date range.")
+
+    if len(data) < 30:  # Need at least 30 data points for indicators
+        raise BacktestError(f"Insufficient data for {ticker}. Need at least 30 data points, got {len(data)}.")
+
+    return data, data_range_info
+
+
+def check_dataset(ticker, start_date, end_date, timeframe):
+    """
+    Raise the BacktestError load_market_data would for a dataset the catalog
+    rules out (missing, or no rows in the range), without reading any CSV.
+    """
+    try:
+        check_csv_coverage(ticker, start_date, end_date, timeframe)
+    except ValueError as e:
+        # Worded as it reaches load_market_data through fetch_market_data and fetch_csv_data
+        raise market_data_error(ticker, f"CSV data loading failed: CSV data loading error: {e}")
+
+
+def admit_backtest(user, params, strategy_config=None, tickers=None):
+    """
+    Pre-flight checks of a backtest request, before any data is loaded: the
+    daily limit, then for each ticker (params['ticker'] unless `tickers` is
+    given) the dataset catalog and the tier entitlements, then the strategy
+    configuration if one is given. Each failure raises the same BacktestError
+    the full pipeline would raise for it, but rejected requests never reach
+    the CSV files or the engine. The daily limit is checked against the
+    cached count; an admitted run then reserves its backtest (see
+    reserved_backtest).
+    """
+    check_daily_backtest_limit(user)
+
+    for ticker in tickers or [params['ticker']]:
+        check_dataset(ticker, params['start_date'], params['end_date'], params['timeframe'])
+        check_tier_entitlements(user, ticker, params['timeframe'])
+
+    if strategy_config is not None:
+        try:
+            validate_strategy_config(strategy_config)
+        except ValueError as e:
+            raise BacktestError(f"An error occurred during the backtest: {str(e)}", status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def admit_batch(user, params, strategy_config):
+    """
+    Pre-flight checks of a batch backtest (see admit_backtest): the daily
+    limit, then at least one dataset with rows in the range (a batch only
+    fails when every dataset does), then the strategy configuration. The tier
+    entitlements of every dataset are checked by parse_batch_params.
+    """
+    check_daily_backtest_limit(user)
+
+    errors = []
+    for ticker, timeframe in params['datasets']:
+        try:
+            check_dataset(ticker, params['start_date'], params['end_date'], timeframe)
+        except BacktestError as e:
+            errors.append(e.message)
+        else:
+            break
+    else:
+        raise BacktestError(f"The strategy failed on every dataset: {errors[0]}")
+
+    try:
+        validate_strategy_config(strategy_config)
+    except ValueError as e:
+        raise BacktestError(f"An error occurred during the backtest: {str(e)}", status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def load_backtest_data(user, ticker, start_date, end_date, timeframe):
+    """
+    Load market data for a backtest and enforce the user's tier entitlements.
+    Returns (data, data_range_message); raises BacktestError on any failure.
+    """
+    data, data_range_info = load_market_data(ticker, start_date, end_date, timeframe)
+
+    check_tier_entitlements(user, ticker, timeframe)
+
+    data_range_message = build_data_range_message(ticker, start_date, end_date, data_range_info)
+    return data, data_range_message
+
+
+def daily_limit_error(user, daily_limit):
+    return BacktestError(
+        f"You have reached your daily backtest limit of {daily_limit} for your {user.profile.tier.title()} tier. "
+        f"Please upgrade your plan or try again tomorrow.",
+        status.HTTP_429_TOO_MANY_REQUESTS
+    )
+
+
+def check_daily_backtest_limit(user):
+    """Raise BacktestError if the user has used up today's backtests (from the cached count; see quota)."""
+    daily_limit = user.profile.get_daily_backtest_limit()
+    if usage_today(user) >= daily_limit:
+        raise daily_limit_error(user, daily_limit)
+
+
+def consume_daily_backtest(user, day=None):
+    """Count a backtest against the day's limit, atomically; raise BacktestError if none are left."""
+    daily_limit = user.profile.get_daily_backtest_limit()
+    if not consume_backtest(user, daily_limit, day):
+        raise daily_limit_error(user, daily_limit)
+
+
+@contextlib.contextmanager
+def reserved_backtest(user):
+    """
+    Reserve one of today's backtests for an admitted run, before any data is
+    loaded, so that concurrent requests at the limit are refused before doing
+    the work. The reservation is refunded if the run raises.
+    """
+    day = timezone.localdate()
+    consume_daily_backtest(user, day)
+    try:
+        yield
+    except Exception:
+        refund_backtest(user, day)
+        raise
+
+
+def save_backtest(user, strategy_name, params, results):
+    """
+    Bump the user's counter, prune old rows and store the result (the run is
+    counted against the daily limit when it is admitted; see reserved_backtest).
+    Returns the new Backtest, or None if it could not be saved.
+    """
+    try:
+        # Create new backtest record, with the equity curve and trades stored apart
+        light, heavy = split_results(results)
+        encoding, payload = encode_artifact(heavy)
+        with transaction.atomic():
+            # Updating the profile first locks its row, so a user's saves prune and create one at a time
+            UserProfile.objects.filter(user=user).update(total_backtests=F('total_backtests') + 1)
+
+            # Keep only the newest MAX_SAVED_BACKTESTS backtests, this one included
+            stale_ids = list(
+                Backtest.objects.filter(user=user).order_by('-created_at', '-id')
+                .values_list('id', flat=True)[MAX_SAVED_BACKTESTS - 1:]
+            )
+            if stale_ids:
+                Backtest.objects.filter(id__in=stale_ids).delete()
+
+            backtest = Backtest.objects.create(
+                user=user,
+                strategy_name=strategy_name,
+                ticker=params['ticker'].upper(),
+                start_date=params['start_date'],
+                end_date=params['end_date'],
+                timeframe=params['timeframe'],
+                initial_cash=params['cash'],
+                leverage=params['leverage'],
+                results=light,
+                **summary_fields(results)
+            )
+            BacktestArtifact.objects.create(backtest=backtest, encoding=encoding, payload=payload)
+        logger.info("Backtest saved with ID: %s", backtest.id)
+    except Exception as save_error:
+        logger.warning("Could not save backtest to database: %s", save_error)
+        # Don't fail the request if saving fails
+        return None
+
+    try:
+        save_chart_pyramid(backtest, results)
+    except Exception as pyramid_error:
+        # The range endpoint builds missing pyramids on demand
+        logger.warning("Could not save chart pyramid of backtest %s: %s", backtest.id, pyramid_error)
+    return backtest
+
+
+def parse_chart_range(data):
+    """
+    Read the [from, to] window of a chart range request as epoch minutes
+    (None for an open end). A 'to' without a time covers that whole day.
+    """
+    bounds = []
+    for name in ('from', 'to'):
+        value = data.get(name)
+        if not value:
+            bounds.append(None)
+            continue
+        try:
+            moment = pd.Timestamp(value)
+        except (TypeError, ValueError):
+            raise BacktestError(f"'{name}' must be a date (YYYY-MM-DD) or a date and time (YYYY-MM-DD HH:MM).")
+        if name == 'to' and len(str(value).strip()) == 10:
+            moment += pd.Timedelta(days=1) - pd.Timedelta(minutes=1)
+        bounds.append(int(moment.value // 60_000_000_000))
+
+    if bounds[0] is not None and bounds[1] is not None and bounds[0] > bounds[1]:
+        raise BacktestError("'from' must not be after 'to'.")
+    return bounds
+
+
+def chart_series(backtest, results):
+    """
+    The bar minutes and series ({name: values}) of a backtest's chart
+    pyramid: its equity curve and the close prices of its ticker.
+    Returns (None, None) if the results have no dated equity curve.
+    """
+    plot_data = results.get('plot_data') or {}
+    equity_curve = plot_data.get('equity_curve') or []
+    minutes = date_minutes(plot_data.get('dates') or [])
+    if minutes is None or not len(minutes) or len(equity_curve) < len(minutes):
+        return None, None
+
+    equity = np.asarray(equity_curve[:len(minutes)], dtype=float)
+    # A position closed after the last bar is shown at the last bar
+    equity[-1] = equity_curve[-1]
+    series = {'equity': equity}
+
+    if backtest.ticker != 'PORTFOLIO':
+        try:
+            data, _ = load_market_data(backtest.ticker, str(backtest.start_date), str(backtest.end_date), backtest.timeframe)
+        except BacktestError:
+            data = None
+        if data is not None:
+            bar_minutes = data.index.values.astype('datetime64[m]').astype(np.int64)
+            close = pd.Series(data['Close'].to_numpy(dtype=float), index=bar_minutes)
+            series['close'] = close[~close.index.duplicated()].reindex(minutes).to_numpy()
+    return minutes, series
+
+
+def save_chart_pyramid(backtest, results):
+    """Build and store the chart pyramid tiles of a saved backtest."""
+    minutes, series = chart_series(backtest, results)
+    if minutes is None:
+        return
+
+    names = ','.join(series)
+    BacktestChartTile.objects.bulk_create([
+        BacktestChartTile(
+            backtest=backtest, level=level, start_minute=start_minute, end_minute=end_minute,
+            series=names, payload=payload
+        )
+        for level, start_minute, end_minute, payload in pyramid_tiles(build_pyramid(minutes, series))
+    ], ignore_conflicts=True)
+
+
+def _range_level(tiles, level, start_minute, end_minute):
+    """Decode the tiles of one level overlapping the window. Returns (points by series, buckets in the window)."""
+    level_tiles = list(tiles.filter(level=level, end_minute__gte=start_minute, start_minute__lte=end_minute))
+    if not level_tiles:
+        return {}, 0
+    series_names = level_tiles[0].series_names
+    buckets = np.concatenate([decode_tile(tile.payload, series_names) for tile in level_tiles])
+    in_window = int(((buckets['start'] >= start_minute) & (buckets['start'] <= end_minute)).sum())
+    return window_points(buckets, series_names, start_minute, end_minute), in_window
+
+
+def chart_range(backtest, start_minute=None, end_minute=None, max_points=DEFAULT_MAX_POINTS):
+    """
+    The chart points of a saved backtest in [start_minute, end_minute], from
+    the finest pyramid level that gives at most `max_points` points per series.
+    """
+    tiles = backtest.chart_tiles.all()
+    if not tiles.exists():
+        # Backtests saved before chart pyramids existed get theirs on first use
+        save_chart_pyramid(backtest, backtest.full_results())
+        if not tiles.exists():
+            raise BacktestError("This backtest has no chart data.", status.HTTP_404_NOT_FOUND)
+
+    base = list(tiles.filter(level=0).values_list('start_minute', 'end_minute'))
+    top_level = tiles.aggregate(top=Max('level'))['top']
+    start_minute = base[0][0] if start_minute is None else start_minute
+    end_minute = base[-1][1] if end_minute is None else end_minute
+
+    # Full level-0 tiles bound the number of bars in the window from above
+    overlapping = sum(1 for first, last in base if last >= start_minute and first <= end_minute)
+    level = min(level_for_budget(overlapping * TILE_BUCKETS, max_points), top_level)
+    points, in_window = _range_level(tiles, level, start_minute, end_minute)
+
+    # Refine while the next finer level still fits the budget, then coarsen if the points do not
+    while level > 0 and 2 * in_window * PYRAMID_FACTOR <= max_points:
+        level -= 1
+        points, in_window = _range_level(tiles, level, start_minute, end_minute)
+    while level < top_level and any(len(minutes) > max_points for minutes, _ in points.values()):
+        level += 1
+        points, in_window = _range_level(tiles, level, start_minute, end_minute)
+    if not in_window:
+        raise BacktestError("The requested range does not overlap the backtest.")
+
+    return {
+        'backtest_id': backtest.id,
+        'level': level,
+        'levels': top_level + 1,
+        'from': format_minutes([start_minute])[0],
+        'to': format_minutes([end_minute])[0],
+        'series': {
+            name: {'dates': format_minutes(minutes), 'values': values.tolist()}
+            for name, (minutes, values) in points.items()
+        },
+    }
+
+
+def parse_chart_data_params(data):
+    """
+    Read the dataset, window, columns and encoding of a chart data request.
+    The dataset range (start_date, end_date) is what indicators are computed
+    over, as in a backtest, so repeated requests for windows of it ('from',
+    'to') are served from the same cached frames.
+    """
+    params = {
+        'ticker': data.get('ticker', ''),
+        'timeframe': data.get('timeframe', ''),
+        'start_date': data.get('start_date', '2022-01-01'),
+        'end_date': data.get('end_date', '2023-01-01'),
+        'strategy_id': data.get('strategy_id'),
+        # Not 'format', which DRF reserves for choosing a renderer
+        'encoding': data.get('encoding', 'json'),
+        'dtype': data.get('dtype', 'float32'),
+        'max_points': parse_max_points(data),
+    }
+    params['from'], params['to'] = parse_chart_range(data)
+
+    if not params['ticker'] or not params['ticker'].strip():
+        raise BacktestError("Ticker symbol is required.")
+    if not params['timeframe']:
+        raise BacktestError("Timeframe is required.")
+    if params['encoding'] not in CHART_DATA_ENCODINGS:
+        raise BacktestError(f"Encoding must be one of: {', '.join(CHART_DATA_ENCODINGS)}.")
+    if params['dtype'] not in CHART_DATA_DTYPES:
+        raise BacktestError(f"Dtype must be one of: {', '.join(CHART_DATA_DTYPES)}.")
+
+    columns = data.get('columns')
+    if isinstance(columns, str):
+        columns = [column.strip() for column in columns.split(',') if column.strip()]
+    params['columns'] = list(columns) if columns else list(OHLCV_COLUMNS)
+    return params
+
+
+def chart_data(user, params, strategy_config=None):
+    """
+    The requested columns of a dataset window, decimated to the point budget.
+    `strategy_config` adds the indicator columns its conditions use.
+    Returns (times, {column: values}, step).
+    """
+    check_tier_entitlements(user, params['ticker'], params['timeframe'])
+    data, _ = load_market_data(params['ticker'], params['start_date'], params['end_date'], params['timeframe'])
+    data_key = market_data_key(params['ticker'], params['start_date'], params['end_date'], params['timeframe'])
+    df, _ = prepare_cached_indicators(data, data_key)
+
+    columns = list(params['columns'])
+    if strategy_config is not None:
+        columns += [column for column in strategy_chart_columns(strategy_config) if column not in columns]
+    unknown = [column for column in columns if column not in df.columns]
+    if unknown:
+        raise BacktestError(f"Unknown columns: {', '.join(unknown)}. Available columns: {', '.join(df.columns)}.")
+
+    minutes = df.index.values.astype('datetime64[m]').astype(np.int64)
+    in_window = np.ones(len(df), dtype=bool)
+    if params['from'] is not None:
+        in_window &= minutes >= params['from']
+    if params['to'] is not None:
+        in_window &= minutes <= params['to']
+    if not in_window.any():
+        raise BacktestError("The requested range does not overlap the dataset.")
+
+    return chart_frame_columns(df[in_window], columns, params['max_points'])
+
+
+def _run_engine(data, strategy_config, params):
+    """Run the backtesting engine."""
+    try:
+        print(f"DEBUG: Strategy configuration: {strategy_config}")
+        print(f"DEBUG: Initial cash: ${params['cash']:,.2f}")
+        print(f"DEBUG: Leverage: {params['leverage']}x")
+
+        data_key = market_data_key(params['ticker'], params['start_date'], params['end_date'], params['timeframe'])
+        results = run_staged_backtest(data, strategy_config, params['cash'], params['leverage'], data_key=data_key)
+    except Exception as e:
+        raise BacktestError(f"An error occurred during the backtest: {str(e)}", status.HTTP_500_INTERNAL_SERVER_ERROR)
+    return results
+
+
+def backtest_request_hash(strategy_config, params):
+    """Cache and coalescing key for a backtest request."""
+    return canonical_request_hash(
+        strategy_config, params['ticker'], params['timeframe'], params['start_date'],
+        params['end_date'], params['cash'], params['leverage']
+    )
+
+
+def optimization_request_hash(strategy_config, params):
+    """
+    Coalescing key for an optimization or walk-forward request; the search
+    settings are hashed with the strategy.
+    """
+    search = {key: params[key] for key in ('grid', 'rank_by', 'top', 'search', 'walk_forward') if key in params}
+    return canonical_request_hash(
+        {'strategy': strategy_config, 'optimization': search}, params['ticker'], params['timeframe'],
+        params['start_date'], params['end_date'], params['cash'], params['leverage']
+    )
+
+
+def batch_request_hash(strategy_config, params):
+    """Coalescing key for a batch backtest request; the dataset list stands in for the ticker."""
+    datasets = ','.join(f"{ticker}/{timeframe}" for ticker, timeframe in params['datasets'])
+    return canonical_request_hash(
+        strategy_config, datasets, 'batch', params['start_date'], params['end_date'], params['cash'], params['leverage']
+    )
+
+
+def execute_backtest(user, strategy_name, strategy_config, params, hold_claim=None):
+    """
+    Run the full pipeline for one backtest request.
+    Returns (results, backtest); raises BacktestError on any user-facing failure.
+    A job worker passes `hold_claim` (see jobs.claim_holder) to save the result
+    only while it still owns the job.
+
+    Identical requests are served from the in-process result cache, and
+    concurrent identical requests share a single engine run, in any process
+    (see result_cache.SharedSingleFlight).
+    """
+    admit_backtest(user, params, strategy_config)
+    with reserved_backtest(user):
+        cache_key = backtest_request_hash(strategy_config, params)
+        results = backtest_result_cache.get(cache_key)
+
+        if results is not None:
+            logger.debug("Serving cached backtest result %s", cache_key[:12])
+            check_tier_entitlements(user, params['ticker'], params['timeframe'])
+        else:
+            data, data_range_message = load_backtest_data(
+                user, params['ticker'], params['start_date'], params['end_date'], params['timeframe']
+            )
+
+            # --- RUN THE BACKTESTING ENGINE ---
+            results = backtest_single_flight.do(
+                cache_key, lambda: _run_engine(data, strategy_config, params), share=lambda results: 'error' not in results
+            )
+            if 'error' not in results:
+                backtest_result_cache.set(cache_key, results)
+
+        # Check if backtest returned an error
+        if 'error' in results:
+            print(f"Error: {results['error']}")
+            raise BacktestError(results['error'])
+
+        if 'Equity Final [$]' not in results:
+            print("Warning: 'Equity Final [$]' not found in results. This might indicate no trades were made.")
+            print("Full results:", results)
+        else:
+            print(results)
+
+        with hold_claim() if hold_claim else contextlib.nullcontext():
+            backtest = save_backtest(user, strategy_name, params, results)
+        return results, backtest
+
+
+def execute_leverage_sweep(user, strategy_name, strategy_config, params, leverages):
+    """
+    Backtest a strategy at several leverages in one simulation pass.
+
+    Counts as a single backtest: the lane at the requested leverage (or the
+    first lane if it is not part of the sweep) is saved like a normal backtest.
+    Returns (sweep, backtest); raises BacktestError on any user-facing failure.
+    """
+    admit_backtest(user, params, strategy_config)
+    with reserved_backtest(user):
+        data, data_range_message = load_backtest_data(
+            user, params['ticker'], params['start_date'], params['end_date'], params['timeframe']
+        )
+        data_key = market_data_key(params['ticker'], params['start_date'], params['end_date'], params['timeframe'])
+
+        try:
+            sweep = run_leverage_sweep(data, strategy_config, params['cash'], leverages, data_key=data_key)
+        except Exception as e:
+            raise BacktestError(f"An error occurred during the backtest: {str(e)}", status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        if 'error' in sweep:
+            logger.info("Leverage sweep failed: %s", sweep['error'])
+            raise BacktestError(sweep['error'])
+
+        primary = leverages.index(params['leverage']) if params['leverage'] in leverages else 0
+        backtest = save_backtest(
+            user, strategy_name, dict(params, leverage=leverages[primary]), sweep['results'][primary]
+        )
+
+        return {
+            'dates': sweep['dates'],
+            'lanes': sweep['lanes'],
+            'backtest_id': backtest.id if backtest else None,
+        }, backtest
+
+
+def execute_portfolio_backtest(user, strategy_name, strategy_config, params, tickers):
+    """
+    Backtest a strategy on several tickers with shared cash (see portfolio).
+
+    Counts as a single backtest, saved under the ticker 'PORTFOLIO'.
+    Returns (results, backtest); raises BacktestError on any user-facing failure.
+    """
+    admit_backtest(user, params, strategy_config, tickers)
+    with reserved_backtest(user):
+        datasets, data_keys = {}, {}
+        for ticker in tickers:
+            datasets[ticker], _ = load_backtest_data(
+                user, ticker, params['start_date'], params['end_date'], params['timeframe']
+            )
+            data_keys[ticker] = market_data_key(ticker, params['start_date'], params['end_date'], params['timeframe'])
+
+        try:
+            results = run_portfolio_backtest(datasets, strategy_config, params['cash'], params['leverage'], data_keys)
+        except Exception as e:
+            raise BacktestError(f"An error occurred during the backtest: {str(e)}", status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        if 'error' in results:
+            logger.info("Portfolio backtest failed: %s", results['error'])
+            raise BacktestError(results['error'])
+
+        backtest = save_backtest(user, strategy_name, dict(params, ticker='PORTFOLIO'), results)
+        return results, backtest
+
+
+def check_grid_limit(user, combinations_count):
+    """Refuse grids with more combinations than the user's tier allows per optimization."""
+    grid_limit = user.profile.get_optimization_grid_limit()
+    if combinations_count > grid_limit:
+        raise BacktestError(
+            f"This grid has {combinations_count} combinations, but your {user.profile.tier.title()} tier allows "
+            f"up to {grid_limit} per optimization. Please narrow the ranges or upgrade your plan.",
+            status.HTTP_403_FORBIDDEN
+        )
+
+
+def optimizer_processes():
+    """
+    Processes an optimization searches on. Optimizations run as jobs, each on
+    one of run_backtest_workers' processes, so by default a search stays on
+    that process; BACKTEST_OPTIMIZER_PROCESSES gives each search more, on top
+    of the workers' --processes.
+    """
+    return getattr(settings, 'BACKTEST_OPTIMIZER_PROCESSES', 1)
+
+
+def optimization_combinations(user, strategy_config, params):
+    """
+    The (parameters, config) combinations an optimization (see
+    parse_optimization_params) tries: every combination of the grid, or the
+    samples successive halving starts from, within the user's tier limit.
+    Returns (combinations, grid size); raises BacktestError.
+    """
+    search = params['search']
+    try:
+        grid = parse_parameter_grid(params['grid'])
+    except ValueError as e:
+        raise BacktestError(str(e))
+
+    combinations_count = grid_size(grid)
+    grid_limit = user.profile.get_optimization_grid_limit()
+    if search['method'] == 'grid':
+        check_grid_limit(user, combinations_count)
+    if search['method'] == 'halving' and search['samples'] > grid_limit:
+        raise BacktestError(
+            f"Successive halving with {search['samples']} samples exceeds your {user.profile.tier.title()} tier's "
+            f"limit of {grid_limit} combinations per optimization. Please request fewer samples or upgrade your plan.",
+            status.HTTP_403_FORBIDDEN
+        )
+
+    try:
+        if search['method'] == 'grid':
+            combinations = build_grid(strategy_config, grid)
+        else:
+            parameter_sets = sample_grid(grid, search['samples'], search['sampling'], search['seed'])
+            combinations = build_combinations(strategy_config, parameter_sets)
+    except ValueError as e:
+        raise BacktestError(str(e))
+    return combinations, combinations_count
+
+
+def admit_optimization(user, params, strategy_config):
+    """
+    Pre-flight checks of an optimization (see admit_backtest): its grid
+    against the tier limit and the strategy, then the backtest parameters.
+    """
+    optimization_combinations(user, strategy_config, params)
+    admit_backtest(user, params)
+
+
+def execute_optimization(user, strategy_name, strategy_config, params, hold_claim=None):
+    """
+    Search a strategy's parameters on one dataset, trying every combination
+    of the grid or running successive halving over samples of it (see
+    parse_optimization_params).
+
+    Counts as a single backtest: the best combination is saved like a normal
+    backtest (inside `hold_claim()` if given; see jobs.claim_holder).
+    Returns (report, backtest); raises BacktestError on any user-facing failure.
+    """
+    search, rank_by = params['search'], params['rank_by']
+    combinations, combinations_count = optimization_combinations(user, strategy_config, params)
+
+    admit_backtest(user, params)
+    with reserved_backtest(user):
+        data, data_range_message = load_backtest_data(
+            user, params['ticker'], params['start_date'], params['end_date'], params['timeframe']
+        )
+        data_key = market_data_key(params['ticker'], params['start_date'], params['end_date'], params['timeframe'])
+
+        processes = optimizer_processes()
+        try:
+            df_with_indicators, _ = prepare_cached_indicators(data, data_key)
+            rungs = None
+            if search['method'] == 'grid':
+                rows = run_grid_search(df_with_indicators, combinations, params['cash'], params['leverage'], rank_by, processes)
+            else:
+                rows, rungs = run_halving_search(
+                    df_with_indicators, combinations, params['cash'], params['leverage'], rank_by, search['eta'], processes
+                )
+        except ValueError as e:
+            raise BacktestError(str(e))
+        except Exception as e:
+            raise BacktestError(f"An error occurred during the optimization: {str(e)}", status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        best = rows[0]
+        if 'error' in best:
+            raise BacktestError(f"Every parameter combination failed: {best['error']}")
+
+        best_config = copy.deepcopy(strategy_config)
+        for name, value in best['parameters'].items():
+            set_parameter(best_config, name, value)
+        best_results = run_staged_backtest(data, best_config, params['cash'], params['leverage'], data_key=data_key)
+        backtest = None
+        if 'error' not in best_results:
+            with hold_claim() if hold_claim else contextlib.nullcontext():
+                backtest = save_backtest(user, strategy_name, params, best_results)
+
+        report = {
+            'method': search['method'],
+            'combinations': combinations_count,
+            'evaluated': len(combinations),
+            'rank_by': rank_by,
+            'results': rows[:params['top']],
+            'best': {'parameters': best['parameters'], 'configuration': best_config},
+            'backtest_id': backtest.id if backtest else None,
+        }
+        if rungs is not None:
+            report.update({'sampling': search['sampling'], 'eta': search['eta'], 'rungs': rungs})
+        return report, backtest
+
+
+def walk_forward_combinations(user, strategy_config, params):
+    """
+    The (parameters, config) combinations of a walk-forward optimization's
+    grid (see parse_walk_forward_params), within the user's tier limit.
+    Raises BacktestError.
+    """
+    try:
+        grid = parse_parameter_grid(params['grid'])
+    except ValueError as e:
+        raise BacktestError(str(e))
+    check_grid_limit(user, grid_size(grid))
+
+    try:
+        return build_grid(strategy_config, grid)
+    except ValueError as e:
+        raise BacktestError(str(e))
+
+
+def admit_walk_forward(user, params, strategy_config):
+    """
+    Pre-flight checks of a walk-forward optimization (see admit_backtest): its
+    grid against the tier limit and the strategy, then the backtest parameters.
+    """
+    walk_forward_combinations(user, strategy_config, params)
+    admit_backtest(user, params)
+
+
+def execute_walk_forward(user, strategy_name, strategy_config, params, hold_claim=None):
+    """
+    Walk-forward optimization of a strategy's parameters over a grid (see
+    parse_walk_forward_params).
+
+    Counts as a single backtest: the stitched out-of-sample result is saved
+    like a normal backtest (inside `hold_claim()` if given; see
+    jobs.claim_holder). Returns (report, backtest), the report holding the
+    out-of-sample stats (its curve and trades are the saved backtest's);
+    raises BacktestError on any user-facing failure.
+    """
+    rank_by, options = params['rank_by'], params['walk_forward']
+    combinations = walk_forward_combinations(user, strategy_config, params)
+
+    admit_backtest(user, params)
+    with reserved_backtest(user):
+        data, data_range_message = load_backtest_data(
+            user, params['ticker'], params['start_date'], params['end_date'], params['timeframe']
+        )
+        data_key = market_data_key(params['ticker'], params['start_date'], params['end_date'], params['timeframe'])
+
+        try:
+            df_with_indicators, _ = prepare_cached_indicators(data, data_key)
+            walk_forward = run_walk_forward(
+                df_with_indicators, combinations, params['cash'], params['leverage'], rank_by,
+                options['folds'], options['train_ratio'], options['anchored'], optimizer_processes()
+            )
+        except ValueError as e:
+            raise BacktestError(str(e))
+        except Exception as e:
+            raise BacktestError(f"An error occurred during the walk-forward optimization: {str(e)}",
+                                status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        results = walk_forward['results']
+        if 'error' in results:
+            raise BacktestError(results['error'])
+        with hold_claim() if hold_claim else contextlib.nullcontext():
+            backtest = save_backtest(user, strategy_name, params, results)
+
+        return {
+            'combinations': len(combinations),
+            'rank_by': rank_by,
+            'folds': walk_forward['folds'],
+            'out_of_sample': split_results(results)[0],
+            'backtest_id': backtest.id if backtest else None,
+        }, backtest
+
+
+def backtest_dataset(strategy_config, params, ticker, timeframe):
+    """
+    Backtest one dataset of a batch (entitlements are checked when the batch
+    is submitted). Returns {'summary', 'results'}, or {'error'}.
+    """
+    try:
+        data, _ = load_market_data(ticker, params['start_date'], params['end_date'], timeframe)
+        data_key = market_data_key(ticker, params['start_date'], params['end_date'], timeframe)
+        results = run_staged_backtest(data, strategy_config, params['cash'], params['leverage'], data_key=data_key)
+    except BacktestError as e:
+        return {'error': e.message}
+    except Exception as e:
+        return {'error': f"An error occurred during the backtest: {str(e)}"}
+
+    if 'error' in results:
+        return {'error': results['error']}
+    return {'summary': summarize_results(results), 'results': results}
+
+
+def batch_summary(job):
+    """The compact result of a batch job: headline statistics for each ticker/timeframe pair."""
+    cells = []
+    for row in job.batch_results.defer('results', 'payload'):
+        cell = {
+            'ticker': row.ticker,
+            'timeframe': row.timeframe,
+            'result_url': f"/api/backtest-jobs/{job.id}/result/{row.ticker}/{row.timeframe}/",
+        }
+        if row.error:
+            cell['error'] = row.error
+        else:
+            cell['stats'] = row.summary
+        cells.append(cell)
+
+    datasets = job.parameters['datasets']
+    return {
+        'job_id': str(job.id),
+        'tickers': list(dict.fromkeys(ticker for ticker, _ in datasets)),
+        'timeframes': list(dict.fromkeys(timeframe for _, timeframe in datasets)),
+        'cells': cells,
+    }
@@ -3,6 +3,13 @@ import pandas as pd
 import operator
 import numpy as np
 
+VALID_OPERATORS = ['less_than', 'greater_than', 'crosses_above', 'crosses_below', 'equals', 'not_equals', 'between', 'outside']
+VALID_INDICATORS = ['RSI', 'MACD', 'Close', 'SMA', 'EMA', 'Bollinger_Bands', 'Stochastic', 'Williams_R', 'ATR', 'Volume']
+VALID_POSITION_SIZING_TYPES = ['fixed_percentage', 'fixed_dollar', 'kelly_criterion', 'risk_based', 'volatility_based']
+VALID_STOP_LOSS_TYPES = ['fixed_percentage', 'fixed_dollar', 'trailing_percentage', 'trailing_dollar', 'atr_based', 'support_resistance']
+VALID_TAKE_PROFIT_TYPES = ['fixed_percentage', 'fixed_dollar', 'risk_reward_ratio', 'indicator_based']
+ATR_PERIODS = [5, 10, 14, 20, 50]  # ATR columns add_indicators_to_data provides (atr_5 ... atr_50)
+
 def validate_strategy_config(config: dict) -> None:
     """Validate strategy configuration before running backtest."""
     if not isinstance(config, dict):
@@ -26,10 +33,10 @@ def validate_strategy_config(config: dict) -> None:
             if field not in condition:
                 raise ValueError(f"Condition {i} missing required field: {field}")
         
-        if condition['operator'] not in ['less_than', 'greater_than', 'crosses_above', 'crosses_below', 'equals', 'not_equals', 'between', 'outside']:
+        if condition['operator'] not in VALID_OPERATORS:
             raise ValueError(f"Invalid operator in condition {i}: {condition['operator']}")
         
-        if condition['indicator'] not in ['RSI', 'MACD', 'Close', 'SMA', 'EMA', 'Bollinger_Bands', 'Stochastic', 'Williams_R', 'ATR', 'Volume']:
+        if condition['indicator'] not in VALID_INDICATORS:
             raise ValueError(f"Invalid indicator in condition {i}: {condition['indicator']}")
     
     # Validate action
@@ -50,8 +57,7 @@ def validate_strategy_config(config: dict) -> None:
     if 'positionSizing' not in entry_condition:
         raise ValueError("Entry condition must have a 'positionSizing' field")
     
-    valid_position_sizing_types = ['fixed_percentage', 'fixed_dollar', 'kelly_criterion', 'risk_based', 'volatility_based']
-    if entry_condition['positionSizing'] not in valid_position_sizing_types:
+    if entry_condition['positionSizing'] not in VALID_POSITION_SIZING_TYPES:
         raise ValueError(f"Invalid position sizing type: {entry_condition['positionSizing']}")
     
     if 'sizingValue' not in entry_condition or not isinstance(entry_condition['sizingValue'], (int, float)):
@@ -74,8 +80,7 @@ def validate_strategy_config(config: dict) -> None:
         if 'type' not in stop_loss:
             raise ValueError("Stop loss must have a 'type' field")
         
-        valid_stop_loss_types = ['fixed_percentage', 'fixed_dollar', 'trailing_percentage', 'trailing_dollar', 'atr_based', 'support_resistance']
-        if stop_loss['type'] not in valid_stop_loss_types:
+        if stop_loss['type'] not in VALID_STOP_LOSS_TYPES:
             raise ValueError(f"Invalid stop loss type: {stop_loss['type']}")
         
         if 'value' not in stop_loss or not isinstance(stop_loss['value'], (int, float)):
@@ -90,42 +95,58 @@ def validate_strategy_config(config: dict) -> None:
         if 'type' not in take_profit:
             raise ValueError("Take profit must have a 'type' field")
         
-        valid_take_profit_types = ['fixed_percentage', 'fixed_dollar', 'risk_reward_ratio', 'indicator_based']
-        if take_profit['type'] not in valid_take_profit_types:
+        if take_profit['type'] not in VALID_TAKE_PROFIT_TYPES:
             raise ValueError(f"Invalid take profit type: {take_profit['type']}")
         
         if 'value' not in take_profit or not isinstance(take_profit['value'], (int, float)):
             raise ValueError("Take profit must have a numeric 'value' field")
 
-def calculate_position_size(entry_condition: dict, current_portfolio_value: float, current_price: float, atr_value: float = None) -> float:
-    """Calculate position size based on entry conditions."""
+def _no_print(*args, **kwargs):
+    pass
+
+def volatility_sizing_factor(current_price: float, atr_value: float = None) -> float:
+    """Multiplier applied to volatility_based position sizes."""
+    if atr_value is None:
+        atr_value = current_price * 0.02  # Default to 2% of price
+    
+    # Calculate volatility as percentage of price
+    volatility_pct = (atr_value / current_price) * 100
+    
+    # Apply volatility adjustment with reasonable bounds
+    # Lower volatility = larger position, but cap at 5x to prevent extreme sizing
+    return min(5.0, max(0.2, 1.0 / max(volatility_pct, 0.1)))
+
+def calculate_position_size(entry_condition: dict, current_portfolio_value: float, current_price: float, atr_value: float = None,
+                            quiet: bool = False) -> float:
+    """Calculate position size based on entry conditions (`quiet` skips the debug output)."""
+    log = _no_print if quiet else print
     sizing_type = entry_condition.get('positionSizing', 'fixed_percentage')
     sizing_value = entry_condition.get('sizingValue', 2)
     
-    print(f"DEBUG: calculate_position_size - Entry condition: {entry_condition}")
-    print(f"DEBUG: calculate_position_size - Sizing type: {sizing_type}, Sizing value: {sizing_value}")
-    print(f"DEBUG: calculate_position_size - Portfolio value: ${current_portfolio_value:,.2f}")
+    log(f"DEBUG: calculate_position_size - Entry condition: {entry_condition}")
+    log(f"DEBUG: calculate_position_size - Sizing type: {sizing_type}, Sizing value: {sizing_value}")
+    log(f"DEBUG: calculate_position_size - Portfolio value: ${current_portfolio_value:,.2f}")
     
     if sizing_type == 'fixed_percentage':
         # Use fixed percentage of portfolio
         position_value = current_portfolio_value * (sizing_value / 100)
-        print(f"DEBUG: calculate_position_size - Fixed percentage: {sizing_value}% of ${current_portfolio_value:,.2f} = ${position_value:,.2f}")
-        print(f"DEBUG: calculate_position_size - Final position: ${position_value:,.2f}")
+        log(f"DEBUG: calculate_position_size - Fixed percentage: {sizing_value}% of ${current_portfolio_value:,.2f} = ${position_value:,.2f}")
+        log(f"DEBUG: calculate_position_size - Final position: ${position_value:,.2f}")
         return position_value
     
     elif sizing_type == 'fixed_dollar':
         # Use fixed dollar amount
         position_value = sizing_value
-        print(f"DEBUG: calculate_position_size - Fixed dollar: ${sizing_value:,.2f}")
-        print(f"DEBUG: calculate_position_size - Final position: ${position_value:,.2f}")
+        log(f"DEBUG: calculate_position_size - Fixed dollar: ${sizing_value:,.2f}")
+        log(f"DEBUG: calculate_position_size - Final position: ${position_value:,.2f}")
         return position_value
     
     elif sizing_type == 'risk_based':
         # Risk-based sizing (1-2% risk per trade)
         risk_per_trade = entry_condition.get('riskPerTrade', 1)
         position_value = current_portfolio_value * (risk_per_trade / 100)
-        print(f"DEBUG: calculate_position_size - Risk based: {risk_per_trade}% of ${current_portfolio_value:,.2f} = ${position_value:,.2f}")
-        print(f"DEBUG: calculate_position_size - Final position: ${position_value:,.2f}")
+        log(f"DEBUG: calculate_position_size - Risk based: {risk_per_trade}% of ${current_portfolio_value:,.2f} = ${position_value:,.2f}")
+        log(f"DEBUG: calculate_position_size - Final position: ${position_value:,.2f}")
         return position_value
     
     elif sizing_type == 'kelly_criterion':
@@ -133,36 +154,26 @@ def calculate_position_size(entry_condition: dict, current_portfolio_value: floa
         # In a real implementation, this would use win rate and odds
         kelly_fraction = 0.25  # Conservative Kelly fraction
         position_value = current_portfolio_value * kelly_fraction
-        print(f"DEBUG: calculate_position_size - Kelly criterion: {kelly_fraction * 100}% of ${current_portfolio_value:,.2f} = ${position_value:,.2f}")
-        print(f"DEBUG: calculate_position_size - Final position: ${position_value:,.2f}")
+        log(f"DEBUG: calculate_position_size - Kelly criterion: {kelly_fraction * 100}% of ${current_portfolio_value:,.2f} = ${position_value:,.2f}")
+        log(f"DEBUG: calculate_position_size - Final position: ${position_value:,.2f}")
         return position_value
     
     elif sizing_type == 'volatility_based':
         # Volatility-adjusted sizing with proper bounds
-        if atr_value is None:
-            atr_value = current_price * 0.02  # Default to 2% of price
-        
-        volatility_period = entry_condition.get('volatilityPeriod', 20)
-        
-        # Calculate volatility as percentage of price
-        volatility_pct = (atr_value / current_price) * 100
-        
-        # Apply volatility adjustment with reasonable bounds
-        # Lower volatility = larger position, but cap at 5x to prevent extreme sizing
-        volatility_factor = min(5.0, max(0.2, 1.0 / max(volatility_pct, 0.1)))
+        volatility_factor = volatility_sizing_factor(current_price, atr_value)
         
         position_value = current_portfolio_value * (sizing_value / 100) * volatility_factor
         
-        print(f"DEBUG: calculate_position_size - Volatility based: {sizing_value}% of ${current_portfolio_value:,.2f} × {volatility_factor:.2f} = ${position_value:,.2f}")
-        print(f"DEBUG: calculate_position_size - Final position: ${position_value:,.2f}")
+        log(f"DEBUG: calculate_position_size - Volatility based: {sizing_value}% of ${current_portfolio_value:,.2f} × {volatility_factor:.2f} = ${position_value:,.2f}")
+        log(f"DEBUG: calculate_position_size - Final position: ${position_value:,.2f}")
         
         return position_value
     
     else:
         # Default to 2% of portfolio
         position_value = current_portfolio_value * 0.02
-        print(f"DEBUG: calculate_position_size - Default: 2% of ${current_portfolio_value:,.2f} = ${position_value:,.2f}")
-        print(f"DEBUG: calculate_position_size - Final position: ${position_value:,.2f}")
+        log(f"DEBUG: calculate_position_size - Default: 2% of ${current_portfolio_value:,.2f} = ${position_value:,.2f}")
+        log(f"DEBUG: calculate_position_size - Final position: ${position_value:,.2f}")
         return position_value
 
 def should_exit_position_enhanced(exit_condition: dict, position_type: str, entry_price: float, 
@@ -327,15 +338,32 @@ def should_exit_position_enhanced(exit_condition: dict, position_type: str, entr
     
     return should_exit, exit_reason
 
-def run_backtest(data_df: pd.DataFrame, strategy_config: dict, initial_cash: float, leverage: float = 1.0):
-    """Main backtesting function with comprehensive error handling."""
-    from api.indicators import add_indicators_to_data
-    
-    print(f"DEBUG: run_backtest - Strategy config received: {strategy_config}")
-    print(f"DEBUG: run_backtest - Initial cash: ${initial_cash:,.2f}")
-    print(f"DEBUG: run_backtest - Leverage: {leverage}x")
-    
-    # Validate inputs
+DEFAULT_EXIT_CONDITION = {'stopLoss': {'type': 'fixed_percentage', 'value': 5}, 'takeProfit': {'type': 'risk_reward_ratio', 'value': 2, 'riskRewardRatio': 2}}
+DEFAULT_ENTRY_CONDITION = {'positionSizing': 'fixed_percentage', 'sizingValue': 2}
+
+# Keys of a strategy configuration each stage of the pipeline depends on
+SIGNAL_CONFIG_KEYS = ('conditions', 'logicalOperator', 'action')
+SIMULATION_CONFIG_KEYS = ('entryCondition', 'exitCondition')
+
+# Position sizing types that size every trade as a fraction of the portfolio
+CASH_INVARIANT_SIZING_TYPES = ('fixed_percentage', 'risk_based', 'kelly_criterion', 'volatility_based')
+
+
+def signal_config(strategy_config: dict) -> dict:
+    """The part of a strategy configuration that determines its signals."""
+    return {key: strategy_config.get(key) for key in SIGNAL_CONFIG_KEYS}
+
+
+def simulation_config(strategy_config: dict) -> dict:
+    """The part of a strategy configuration that determines how signals are traded."""
+    return {
+        'entryCondition': strategy_config.get('entryCondition', DEFAULT_ENTRY_CONDITION),
+        'exitCondition': strategy_config.get('exitCondition', DEFAULT_EXIT_CONDITION),
+    }
+
+
+def check_backtest_inputs(data_df: pd.DataFrame, strategy_config: dict, initial_cash: float) -> None:
+    """Validate the inputs to a backtest, raising ValueError if they are unusable."""
     if data_df.empty:
         raise ValueError("Input data is empty")
     
@@ -344,36 +372,149 @@ def run_backtest(data_df: pd.DataFrame, strategy_config: dict, initial_cash: flo
     
     # Validate strategy configuration
     validate_strategy_config(strategy_config)
+
+
+def prepare_indicators(data_df: pd.DataFrame) -> pd.DataFrame:
+    """Stage 1: calculate all indicators for the price data."""
+    from api.indicators import add_indicators_to_data
+    
+    df_with_indicators = add_indicators_to_data(data_df)
+    
+    if df_with_indicators.empty:
+        raise ValueError("No valid data after calculating indicators")
+    
+    return df_with_indicators
+
+
+def simulate_portfolio(df_with_indicators: pd.DataFrame, signals: pd.Series, strategy_config: dict,
+                       initial_cash: float, leverage: float = 1.0):
+    """Stage 3: trade the signals and compute the result statistics."""
+    conditions = simulation_config(strategy_config)
+    exit_condition = conditions['exitCondition']
+    entry_condition = conditions['entryCondition']
+    
+    print(f"DEBUG: run_backtest - Exit condition: {exit_condition}")
+    print(f"DEBUG: run_backtest - Entry condition: {entry_condition}")
+    
+    simulator = PortfolioSimulator(df_with_indicators, signals, initial_cash, leverage, exit_condition, entry_condition)
+    return simulator.run_simulation()
+
+
+def backtest_failure(message: str) -> dict:
+    """Result returned when a backtest cannot be completed."""
+    return {
+        'error': message,
+        'stats': {},
+        'plot_data': {'equity_curve': [], 'dates': []},
+        'trades': []
+    }
+
+
+def simulation_failure(e: Exception) -> dict:
+    """Result returned when the portfolio simulation raises."""
+    return backtest_failure(f'Simulation failed: {str(e)}')
+
+
+def format_trade(trade: dict, leverage: float, scale: float = 1.0) -> dict:
+    """
+    Format a numeric trade record for display. Dollar amounts are multiplied
+    by `scale`, which lets a simulation run at one cash amount be reported at
+    another.
+    """
+    if trade['position_size'] is not None:
+        pnl_display = '—'  # No P&L for entry trades
+        position_size = f"${trade['position_size'] * scale:,.2f}"
+    else:
+        position_size = '—'
+        pnl_amount = trade['pnl'] * scale
+        price_change_pct = trade['pnl_pct']
+        if price_change_pct is None:
+            pnl_display = f"+${pnl_amount:,.2f}" if pnl_amount >= 0 else f"-${abs(pnl_amount):,.2f}"
+        elif pnl_amount >= 0:
+            pnl_display = f"+${pnl_amount:,.2f} (+{price_change_pct:.2f}%)"
+        else:
+            pnl_display = f"-${abs(pnl_amount):,.2f} ({price_change_pct:.2f}%)"
+
+    return {
+        'Date': trade['date'].strftime('%Y-%m-%d %H:%M'),
+        'Type': trade['type'],
+        'Price': f"{trade['price']:.2f}",
+        'Portfolio': f"${trade['portfolio'] * scale:,.2f}",
+        'P&L': pnl_display,
+        'Leverage': f"{leverage}x",
+        'Position Size': position_size,
+        'Exit Reason': trade['exit_reason']
+    }
+
+
+def format_dates(index: pd.DatetimeIndex) -> list:
+    """Dates of the equity curve as shown in results."""
+    return index.strftime('%Y-%m-%d %H:%M').tolist()
+
+
+def format_simulation_results(index: pd.DatetimeIndex, equity_curve: list, trades: list, initial_cash: float,
+                              leverage: float, scale: float = 1.0, dates: list = None) -> dict:
+    """
+    Format a simulation's equity curve and trade records, scaling dollar amounts by `scale`.
+    `dates` may pass in the already formatted index when formatting several simulations of the same data.
+    """
+    if not equity_curve:
+        return backtest_failure('Backtest generated no data.')
+    
+    try:
+        equity_curve = [equity * scale for equity in equity_curve]
+        final_equity = equity_curve[-1]
+        total_return_pct = ((final_equity - initial_cash) / initial_cash) * 100
+
+        return {
+            'stats': {
+                'Start': index[0].strftime('%Y-%m-%d'),
+                'End': index[-1].strftime('%Y-%m-%d'),
+                'Equity Final [$]': f"{final_equity:,.2f}",
+                'Return [%]': f"{total_return_pct:.2f}",
+                '# Trades': len(trades)
+            },
+            'plot_data': {
+                'equity_curve': equity_curve,
+                'dates': dates if dates is not None else format_dates(index)
+            },
+            'trades': [format_trade(trade, leverage, scale) for trade in trades]
+        }
+    except Exception as e:
+        return backtest_failure(f'Error formatting results: {str(e)}')
+
+
+def is_cash_invariant(strategy_config: dict) -> bool:
+    """
+    Whether a strategy's equity curve and trade P&L scale linearly with initial cash.
+
+    True when positions are sized as a fraction of the portfolio; fixed_dollar
+    sizing trades the same amount whatever the cash, so it is not.
+    """
+    sizing_type = simulation_config(strategy_config)['entryCondition'].get('positionSizing', 'fixed_percentage')
+    return sizing_type in CASH_INVARIANT_SIZING_TYPES
+
+
+def run_backtest(data_df: pd.DataFrame, strategy_config: dict, initial_cash: float, leverage: float = 1.0):
+    """Main backtesting function with comprehensive error handling."""
+    print(f"DEBUG: run_backtest - Strategy config received: {strategy_config}")
+    print(f"DEBUG: run_backtest - Initial cash: ${initial_cash:,.2f}")
+    print(f"DEBUG: run_backtest - Leverage: {leverage}x")
+    
+    check_backtest_inputs(data_df, strategy_config, initial_cash)
     
     try:
         # 1. Prepare Data: Calculate all indicators first.
-        df_with_indicators = add_indicators_to_data(data_df)
-        
-        if df_with_indicators.empty:
-            raise ValueError("No valid data after calculating indicators")
+        df_with_indicators = prepare_indicators(data_df)
         
         # 2. Generate Signals: Create a single column of 'BUY', 'SELL', or 'HOLD'.
         signals = generate_signals(df_with_indicators, strategy_config)
         
         # 3. Simulate Portfolio: Loop through prices and signals to simulate trades.
-        exit_condition = strategy_config.get('exitCondition', {'stopLoss': {'type': 'fixed_percentage', 'value': 5}, 'takeProfit': {'type': 'risk_reward_ratio', 'value': 2, 'riskRewardRatio': 2}})
-        entry_condition = strategy_config.get('entryCondition', {'positionSizing': 'fixed_percentage', 'sizingValue': 2})
-        
-        print(f"DEBUG: run_backtest - Exit condition: {exit_condition}")
-        print(f"DEBUG: run_backtest - Entry condition: {entry_condition}")
-        
-        simulator = PortfolioSimulator(df_with_indicators, signals, initial_cash, leverage, exit_condition, entry_condition)
-        results = simulator.run_simulation()
-        
-        return results
+        return simulate_portfolio(df_with_indicators, signals, strategy_config, initial_cash, leverage)
         
     except Exception as e:
-        return {
-            'error': f'Backtest failed: {str(e)}',
-            'stats': {},
-            'plot_data': {'equity_curve': [], 'dates': []},
-            'trades': []
-        }
+        return backtest_failure(f'Backtest failed: {str(e)}')
 
 def generate_signals(df: pd.DataFrame, config: dict) -> pd.Series:
     """
@@ -546,18 +687,20 @@ def generate_signals(df: pd.DataFrame, config: dict) -> pd.Series:
 class PortfolioSimulator:
     """Simulates trades based on a signal Series and returns the results."""
     def __init__(self, df: pd.DataFrame, signals: pd.Series, initial_cash: float, leverage: float = 1.0, 
-                 exit_condition: dict = None, entry_condition: dict = None):
+                 exit_condition: dict = None, entry_condition: dict = None, quiet: bool = False):
+        # A quiet simulator prints nothing, e.g. one run at a normalized cash whose dollar amounts are not the user's
+        self.quiet = quiet
         self.df = df
         self.signals = signals
         self.initial_cash = initial_cash
         self.leverage = max(1.0, min(10.0, leverage))  # Clamp leverage between 1x and 10x
-        self.exit_condition = exit_condition if exit_condition is not None else {'stopLoss': {'type': 'fixed_percentage', 'value': 5}, 'takeProfit': {'type': 'risk_reward_ratio', 'value': 2, 'riskRewardRatio': 2}}
-        self.entry_condition = entry_condition if entry_condition is not None else {'positionSizing': 'fixed_percentage', 'sizingValue': 2}
+        self.exit_condition = exit_condition if exit_condition is not None else DEFAULT_EXIT_CONDITION
+        self.entry_condition = entry_condition if entry_condition is not None else DEFAULT_ENTRY_CONDITION
         
-        print(f"DEBUG: PortfolioSimulator - Entry condition received: {entry_condition}")
-        print(f"DEBUG: PortfolioSimulator - Entry condition used: {self.entry_condition}")
-        print(f"DEBUG: PortfolioSimulator - Initial cash: ${initial_cash:,.2f}")
-        print(f"DEBUG: PortfolioSimulator - Leverage: {self.leverage}x")
+        self.log(f"DEBUG: PortfolioSimulator - Entry condition received: {entry_condition}")
+        self.log(f"DEBUG: PortfolioSimulator - Entry condition used: {self.entry_condition}")
+        self.log(f"DEBUG: PortfolioSimulator - Initial cash: ${initial_cash:,.2f}")
+        self.log(f"DEBUG: PortfolioSimulator - Leverage: {self.leverage}x")
         
         self.cash = initial_cash
         self.original_cash = initial_cash  # Track original cash for portfolio value calculation
@@ -573,6 +716,10 @@ class PortfolioSimulator:
         self.position_value = 0  # Track the actual dollar value of the position
         self.base_position_value = 0  # Track the base cash amount used for the position
 
+    def log(self, message: str):
+        if not self.quiet:
+            print(message)
+
     def should_exit_position(self, current_price: float, current_date, current_index: int) -> tuple[bool, str]:
         """Check if we should exit the position based on stop loss and take profit conditions."""
         if not self.in_position or self.position == 0:
@@ -588,178 +735,287 @@ class PortfolioSimulator:
         return should_exit, exit_reason
 
     def run_simulation(self):
-        """Run the portfolio simulation with proper buy/sell cycles."""
+        """Run the portfolio simulation and format its results."""
         try:
-            for i in range(len(self.df)):
-                current_price = self.df['Close'].iloc[i]
-                current_date = self.df.index[i]
-                signal = self.signals.iloc[i]
-                
-                # Skip if price is invalid
-                if pd.isna(current_price) or current_price <= 0:
-                    # Calculate equity based on current position and cash
-                    if self.in_position and self.entry_price is not None:
-                        if self.position_type == 'LONG':
-                            price_change = current_price - self.entry_price
-                            pnl = price_change * abs(self.position)
-                            current_equity = self.cash + self.base_position_value + pnl
-                        else:  # SHORT
-                            price_change = self.entry_price - current_price
-                            pnl = price_change * abs(self.position)
-                            current_equity = self.cash + pnl
-                    else:
-                        current_equity = self.cash
-                    self.equity_curve.append(current_equity)
-                    continue
+            self.simulate()
+            return self._format_results()
+            
+        except Exception as e:
+            return simulation_failure(e)
 
-                # Trading logic: LONG/SHORT when signal matches and we're not in position
-                # Exit when exit conditions are met
-                if signal in ['LONG', 'SHORT'] and not self.in_position and self.cash > 0:
-                    # Calculate position size based on entry conditions
-                    current_portfolio_value = self.cash
-                    
-                    # Get ATR value for volatility-based sizing if needed
-                    atr_value = None
-                    if self.entry_condition.get('positionSizing') == 'volatility_based':
-                        atr_period = self.entry_condition.get('volatilityPeriod', 20)
-                        atr_col = f'atr_{atr_period}'
-                        if atr_col in self.df.columns:
-                            atr_value = self.df[atr_col].iloc[i]
-                    
-                    # Calculate base position size (this is the cash we'll actually use)
-                    base_position_value = calculate_position_size(self.entry_condition, current_portfolio_value, current_price, atr_value)
-                    
-                    print(f"DEBUG: Position Sizing - Portfolio: ${current_portfolio_value:,.2f}, Requested: {self.entry_condition.get('sizingValue', 0)}%, Calculated: ${base_position_value:,.2f}")
-                    
-                    # Apply leverage to determine how many shares we can control
-                    # Leverage allows us to control more shares with the same cash
-                    leveraged_shares_value = base_position_value * self.leverage
-                    print(f"DEBUG: Leverage Applied - Base: ${base_position_value:,.2f} × {self.leverage}x = ${leveraged_shares_value:,.2f}")
-                    
-                    # Ensure we have enough cash for the BASE position (not the leveraged amount)
-                    # The leverage allows us to control more shares with the same cash
-                    if base_position_value > self.cash:
-                        # Cap at 95% of available cash to leave buffer
-                        base_position_value = self.cash * 0.95
-                        leveraged_shares_value = base_position_value * self.leverage
-                        print(f"DEBUG: Position capped by available cash - New base position: ${base_position_value:,.2f}")
-                        print(f"DEBUG: Leveraged shares value after capping: ${leveraged_shares_value:,.2f}")
-                    
-                    # Calculate number of shares (using leveraged shares value)
-                    if signal == 'LONG':
-                        # Long position: buy shares
-                        shares = leveraged_shares_value / current_price
-                        self.position = shares
-                        trade_type = 'LONG'
-                        trade_description = f"LONG: {current_date.strftime('%Y-%m-%d')} at ${current_price:.2f}"
-                    else:  # SHORT
-                        # Short position: sell shares (negative position)
-                        shares = leveraged_shares_value / current_price
-                        self.position = -shares
-                        trade_type = 'SHORT'
-                        trade_description = f"SHORT: {current_date.strftime('%Y-%m-%d')} at ${current_price:.2f}"
-                    
-                    # Update cash and position tracking
-                    if signal == 'LONG':
-                        # For long positions: deduct the base position value from cash
-                        self.cash -= base_position_value
+    def simulate(self):
+        """Run the portfolio simulation with proper buy/sell cycles, filling equity_curve and trades."""
+        for i in range(len(self.df)):
+            current_price = self.df['Close'].iloc[i]
+            current_date = self.df.index[i]
+            signal = self.signals.iloc[i]
+            
+            # Skip if price is invalid
+            if pd.isna(current_price) or current_price <= 0:
+                # Calculate equity based on current position and cash
+                if self.in_position and self.entry_price is not None:
+                    if self.position_type == 'LONG':
+                        price_change = current_price - self.entry_price
+                        pnl = price_change * abs(self.position)
+                        current_equity = self.cash + self.base_position_value + pnl
                     else:  # SHORT
-                        # For short positions: we borrow shares and sell them immediately
-                        # We receive cash equal to leveraged_shares_value from selling the borrowed shares
-                        self.cash += leveraged_shares_value
-                    
-                    self.position_value = leveraged_shares_value  # Track the leveraged position value
-                    self.base_position_value = base_position_value # Track the base position value
-                    
+                        price_change = self.entry_price - current_price
+                        pnl = price_change * abs(self.position)
+                        current_equity = self.cash + pnl
+                else:
+                    current_equity = self.cash
+                self.equity_curve.append(current_equity)
+                continue
 
+            # Trading logic: LONG/SHORT when signal matches and we're not in position
+            # Exit when exit conditions are met
+            if signal in ['LONG', 'SHORT'] and not self.in_position and self.cash > 0:
+                # Calculate position size based on entry conditions
+                current_portfolio_value = self.cash
+                
+                # Get ATR value for volatility-based sizing if needed
+                atr_value = None
+                if self.entry_condition.get('positionSizing') == 'volatility_based':
+                    atr_period = self.entry_condition.get('volatilityPeriod', 20)
+                    atr_col = f'atr_{atr_period}'
+                    if atr_col in self.df.columns:
+                        atr_value = self.df[atr_col].iloc[i]
+                
+                # Calculate base position size (this is the cash we'll actually use)
+                base_position_value = calculate_position_size(
+                    self.entry_condition, current_portfolio_value, current_price, atr_value, self.quiet
+                )
+                
+                self.log(f"DEBUG: Position Sizing - Portfolio: ${current_portfolio_value:,.2f}, Requested: {self.entry_condition.get('sizingValue', 0)}%, Calculated: ${base_position_value:,.2f}")
+                
+                # Apply leverage to determine how many shares we can control
+                # Leverage allows us to control more shares with the same cash
+                leveraged_shares_value = base_position_value * self.leverage
+                self.log(f"DEBUG: Leverage Applied - Base: ${base_position_value:,.2f} × {self.leverage}x = ${leveraged_shares_value:,.2f}")
+                
+                # Ensure we have enough cash for the BASE position (not the leveraged amount)
+                # The leverage allows us to control more shares with the same cash
+                if base_position_value > self.cash:
+                    # Cap at 95% of available cash to leave buffer
+                    base_position_value = self.cash * 0.95
+                    leveraged_shares_value = base_position_value * self.leverage
+                    self.log(f"DEBUG: Position capped by available cash - New base position: ${base_position_value:,.2f}")
+                    self.log(f"DEBUG: Leveraged shares value after capping: ${leveraged_shares_value:,.2f}")
+                
+                # Calculate number of shares (using leveraged shares value)
+                if signal == 'LONG':
+                    # Long position: buy shares
+                    shares = leveraged_shares_value / current_price
+                    self.position = shares
+                    trade_type = 'LONG'
+                    trade_description = f"LONG: {current_date.strftime('%Y-%m-%d')} at ${current_price:.2f}"
+                else:  # SHORT
+                    # Short position: sell shares (negative position)
+                    shares = leveraged_shares_value / current_price
+                    self.position = -shares
+                    trade_type = 'SHORT'
+                    trade_description = f"SHORT: {current_date.strftime('%Y-%m-%d')} at ${current_price:.2f}"
+                
+                # Update cash and position tracking
+                if signal == 'LONG':
+                    # For long positions: deduct the base position value from cash
+                    self.cash -= base_position_value
+                else:  # SHORT
+                    # For short positions: we borrow shares and sell them immediately
+                    # We receive cash equal to leveraged_shares_value from selling the borrowed shares
+                    self.cash += leveraged_shares_value
+                
+                self.position_value = leveraged_shares_value  # Track the leveraged position value
+                self.base_position_value = base_position_value # Track the base position value
+                
+
+                
+                self.in_position = True
+                self.position_type = signal
+                self.entry_price = current_price
+                self.entry_date = current_date
+                
+                # Initialize trailing stops
+                if signal == 'LONG':
+                    self.highest_price = current_price
+                else:  # SHORT
+                    self.lowest_price = current_price
+                
+                # Calculate current portfolio value for display
+                if trade_type == 'SHORT':
+                    # For short positions, portfolio value is the original cash
+                    # We don't include the cash from selling borrowed shares in portfolio value
+                    current_portfolio_display = self.original_cash
+                else:
+                    # For long positions, portfolio includes the invested cash
+                    current_portfolio_display = self.cash + self.base_position_value
+                
+                self.trades.append({
+                    'date': current_date,
+                    'type': trade_type,
+                    'price': current_price,
+                    'portfolio': current_portfolio_display,
+                    'pnl': None,  # No P&L for entry trades
+                    'pnl_pct': None,
+                    'position_size': leveraged_shares_value,
+                    'exit_reason': ''
+                })
+                self.log(f"{trade_description}, Value: ${base_position_value:,.2f}, Leverage: {self.leverage}x, Position Size: ${leveraged_shares_value:,.2f}")
                     
-                    self.in_position = True
-                    self.position_type = signal
-                    self.entry_price = current_price
-                    self.entry_date = current_date
-                    
-                    # Initialize trailing stops
-                    if signal == 'LONG':
-                        self.highest_price = current_price
+            elif self.in_position and self.position != 0 and self.should_exit_position(current_price, current_date, i)[0]:
+                # Get exit reason
+                _, exit_reason = self.should_exit_position(current_price, current_date, i)
+                
+                # Exit position: close all position
+                if self.position_type == 'LONG':
+                    # Close long position: sell shares
+                    exit_value = self.position * current_price
+                    trade_type = 'EXIT LONG'
+                    trade_description = f"EXIT LONG: {current_date.strftime('%Y-%m-%d')} at ${current_price:.2f}"
+                else:  # SHORT
+                    # Close short position: buy back shares
+                    exit_value = abs(self.position) * current_price
+                    trade_type = 'EXIT SHORT'
+                    trade_description = f"EXIT SHORT: {current_date.strftime('%Y-%m-%d')} at ${current_price:.2f}"
+                
+                # Calculate P&L for this specific trade
+                if self.entry_price is not None:
+                    if self.position_type == 'LONG':
+                        # Long position P&L
+                        price_change_pct = ((current_price - self.entry_price) / self.entry_price) * 100
+                        pnl_amount = (current_price - self.entry_price) * abs(self.position)
                     else:  # SHORT
-                        self.lowest_price = current_price
+                        # Short position P&L (profit when price goes down)
+                        price_change_pct = ((self.entry_price - current_price) / self.entry_price) * 100
+                        pnl_amount = (self.entry_price - current_price) * abs(self.position)
                     
-                    # Calculate current portfolio value for display
-                    if trade_type == 'SHORT':
-                        # For short positions, portfolio value is the original cash
-                        # We don't include the cash from selling borrowed shares in portfolio value
-                        current_portfolio_display = self.original_cash
+                    # Format P&L display
+                    if pnl_amount >= 0:
+                        pnl_display = f"+${pnl_amount:,.2f} (+{price_change_pct:.2f}%)"
                     else:
-                        # For long positions, portfolio includes the invested cash
-                        current_portfolio_display = self.cash + self.base_position_value
-                    
-                    self.trades.append({
-                        'Date': current_date.strftime('%Y-%m-%d %H:%M'), 
-                        'Type': trade_type, 
-                        'Price': f"{current_price:.2f}", 
-                        'Portfolio': f"${current_portfolio_display:,.2f}",
-                        'P&L': '—',  # No P&L for entry trades
-                        'Leverage': f"{self.leverage}x",
-                        'Position Size': f"${leveraged_shares_value:,.2f}",
-                        'Exit Reason': ''
-                    })
-                    print(f"{trade_description}, Value: ${base_position_value:,.2f}, Leverage: {self.leverage}x, Position Size: ${leveraged_shares_value:,.2f}")
-                        
-                elif self.in_position and self.position != 0 and self.should_exit_position(current_price, current_date, i)[0]:
-                    # Get exit reason
-                    _, exit_reason = self.should_exit_position(current_price, current_date, i)
-                    
-                    # Exit position: close all position
+                        pnl_display = f"-${abs(pnl_amount):,.2f} ({price_change_pct:.2f}%)"
+                else:
+                    pnl_display = "N/A"
+                
+                # Update cash based on P&L
+                if self.position_type == 'LONG':
+                    # For long positions: we get back our original cash + P&L
+                    # We originally deducted base_position_value from cash, now we get it back + P&L
+                    old_cash = self.cash
+                    self.cash += self.base_position_value + pnl_amount
+                    self.log(f"DEBUG: Exit LONG - Old Cash: ${old_cash:,.2f}, Base Position Returned: ${self.base_position_value:,.2f}, P&L: ${pnl_amount:,.2f}, New Cash: ${self.cash:,.2f}")
+                else:  # SHORT
+                    # For short positions: we need to buy back the borrowed shares
+                    # We originally received base_position_value in cash when we sold the borrowed shares
+                    # Now we need to pay the current price to buy them back
+                    old_cash = self.cash
+                    actual_shares = abs(self.position)
+                    buyback_cost = actual_shares * current_price
+                    # Net effect: we pay the buyback cost from our cash
+                    # The P&L is already calculated correctly as (entry_price - current_price) * shares
+                    self.cash -= buyback_cost
+                    self.log(f"DEBUG: Exit SHORT - Old Cash: ${old_cash:,.2f}, Buyback Cost: ${buyback_cost:,.2f}, P&L: ${pnl_amount:,.2f}, New Cash: ${self.cash:,.2f}")
+                
+                # Reset position tracking
+                self.position = 0
+                self.position_value = 0
+                self.base_position_value = 0
+                self.in_position = False
+                self.position_type = None
+                self.entry_price = None
+                self.entry_date = None
+                
+                # Update original cash to reflect the new portfolio value after the trade
+                if trade_type == 'EXIT SHORT':
+                    self.original_cash = self.original_cash + pnl_amount
+                else:
+                    self.original_cash = self.cash
+                
+                # Calculate portfolio value for exit trades
+                if trade_type == 'EXIT SHORT':
+                    # For short exits, portfolio value is the original cash plus P&L
+                    # This represents the final portfolio value after the trade
+                    exit_portfolio_display = self.original_cash + pnl_amount
+
+                else:
+                    # For long exits, portfolio includes the returned cash
+                    exit_portfolio_display = self.cash
+                
+                self.trades.append({
+                    'date': current_date,
+                    'type': trade_type,
+                    'price': current_price,
+                    'portfolio': exit_portfolio_display,
+                    'pnl': pnl_amount,
+                    'pnl_pct': price_change_pct,
+                    'position_size': None,
+                    'exit_reason': exit_reason
+                })
+                self.log(f"{trade_description}, P&L: {pnl_display}, Leverage: {self.leverage}x, Reason: {exit_reason}")
+            
+            # Calculate current equity (cash + position value + unrealized P&L if in position)
+            if self.in_position and self.entry_price is not None:
+                if self.position_type == 'LONG':
+                    # For long positions: cash + base_position_value + unrealized P&L
+                    # The base_position_value represents the cash we invested in the position
+                    price_change = current_price - self.entry_price
+                    unrealized_pnl = price_change * abs(self.position)
+                    current_equity = self.cash + self.base_position_value + unrealized_pnl
+                    self.log(f"DEBUG: Equity LONG - Cash: ${self.cash:,.2f}, Base Position: ${self.base_position_value:,.2f}, Unrealized P&L: ${unrealized_pnl:,.2f}, Total Equity: ${current_equity:,.2f}")
+                else:  # SHORT
+                    # For short positions: original cash + unrealized P&L
+                    # The unrealized P&L represents our potential profit/loss
+                    # We use original_cash because current cash includes proceeds from selling borrowed shares
+                    price_change = self.entry_price - current_price
+                    unrealized_pnl = price_change * abs(self.position)
+                    current_equity = self.original_cash + unrealized_pnl
+
+            else:
+                # When not in position, equity is just the cash
+                current_equity = self.cash
+
+            
+            # Prevent negative equity - implement margin call
+            if current_equity <= 0:
+                # Force exit position to prevent negative equity
+                if self.in_position and self.position != 0:
+                    # Emergency exit - close position at current price
                     if self.position_type == 'LONG':
-                        # Close long position: sell shares
                         exit_value = self.position * current_price
-                        trade_type = 'EXIT LONG'
-                        trade_description = f"EXIT LONG: {current_date.strftime('%Y-%m-%d')} at ${current_price:.2f}"
+                        trade_type = 'MARGIN CALL LONG'
                     else:  # SHORT
-                        # Close short position: buy back shares
                         exit_value = abs(self.position) * current_price
-                        trade_type = 'EXIT SHORT'
-                        trade_description = f"EXIT SHORT: {current_date.strftime('%Y-%m-%d')} at ${current_price:.2f}"
+                        trade_type = 'MARGIN CALL SHORT'
                     
-                    # Calculate P&L for this specific trade
+                    # Calculate P&L for margin call
                     if self.entry_price is not None:
                         if self.position_type == 'LONG':
-                            # Long position P&L
-                            price_change_pct = ((current_price - self.entry_price) / self.entry_price) * 100
                             pnl_amount = (current_price - self.entry_price) * abs(self.position)
                         else:  # SHORT
-                            # Short position P&L (profit when price goes down)
-                            price_change_pct = ((self.entry_price - current_price) / self.entry_price) * 100
                             pnl_amount = (self.entry_price - current_price) * abs(self.position)
                         
-                        # Format P&L display
                         if pnl_amount >= 0:
-                            pnl_display = f"+${pnl_amount:,.2f} (+{price_change_pct:.2f}%)"
+                            pnl_display = f"+${pnl_amount:,.2f}"
                         else:
-                            pnl_display = f"-${abs(pnl_amount):,.2f} ({price_change_pct:.2f}%)"
+                            pnl_display = f"-${abs(pnl_amount):,.2f}"
                     else:
                         pnl_display = "N/A"
                     
-                    # Update cash based on P&L
+                    # Update cash based on exit
                     if self.position_type == 'LONG':
-                        # For long positions: we get back our original cash + P&L
-                        # We originally deducted base_position_value from cash, now we get it back + P&L
+                        # For long: get back original position value + P&L
                         old_cash = self.cash
                         self.cash += self.base_position_value + pnl_amount
-                        print(f"DEBUG: Exit LONG - Old Cash: ${old_cash:,.2f}, Base Position Returned: ${self.base_position_value:,.2f}, P&L: ${pnl_amount:,.2f}, New Cash: ${self.cash:,.2f}")
+                        self.log(f"DEBUG: Margin Call LONG - Old Cash: ${old_cash:,.2f}, Base Position Returned: ${self.base_position_value:,.2f}, P&L: ${pnl_amount:,.2f}, New Cash: ${self.cash:,.2f}")
                     else:  # SHORT
-                        # For short positions: we need to buy back the borrowed shares
-                        # We originally received base_position_value in cash when we sold the borrowed shares
-                        # Now we need to pay the current price to buy them back
+                        # For short margin calls: same logic as normal exit
                         old_cash = self.cash
                         actual_shares = abs(self.position)
                         buyback_cost = actual_shares * current_price
-                        # Net effect: we pay the buyback cost from our cash
-                        # The P&L is already calculated correctly as (entry_price - current_price) * shares
                         self.cash -= buyback_cost
-                        print(f"DEBUG: Exit SHORT - Old Cash: ${old_cash:,.2f}, Buyback Cost: ${buyback_cost:,.2f}, P&L: ${pnl_amount:,.2f}, New Cash: ${self.cash:,.2f}")
+                        self.log(f"DEBUG: Margin Call SHORT - Old Cash: ${old_cash:,.2f}, Buyback Cost: ${buyback_cost:,.2f}, P&L: ${pnl_amount:,.2f}, New Cash: ${self.cash:,.2f}")
                     
-                    # Reset position tracking
+                    # Reset position
                     self.position = 0
                     self.position_value = 0
                     self.base_position_value = 0
@@ -768,261 +1024,120 @@ class PortfolioSimulator:
                     self.entry_price = None
                     self.entry_date = None
                     
-                    # Update original cash to reflect the new portfolio value after the trade
-                    if trade_type == 'EXIT SHORT':
+                    # Update original cash to reflect the new portfolio value after the margin call
+                    if trade_type == 'MARGIN CALL SHORT':
                         self.original_cash = self.original_cash + pnl_amount
                     else:
                         self.original_cash = self.cash
                     
-                    # Calculate portfolio value for exit trades
-                    if trade_type == 'EXIT SHORT':
-                        # For short exits, portfolio value is the original cash plus P&L
-                        # This represents the final portfolio value after the trade
-                        exit_portfolio_display = self.original_cash + pnl_amount
-
+                    # Calculate portfolio value for margin call trades
+                    if trade_type == 'MARGIN CALL SHORT':
+                        # For short margin calls, portfolio value is just the cash
+                        margin_call_portfolio_display = self.cash
                     else:
-                        # For long exits, portfolio includes the returned cash
-                        exit_portfolio_display = self.cash
+                        # For long margin calls, portfolio includes the returned cash
+                        margin_call_portfolio_display = self.cash
                     
                     self.trades.append({
-                        'Date': current_date.strftime('%Y-%m-%d %H:%M'), 
-                        'Type': trade_type, 
-                        'Price': f"{current_price:.2f}", 
-                        'Portfolio': f"${exit_portfolio_display:,.2f}",
-                        'P&L': pnl_display,
-                        'Leverage': f"{self.leverage}x",
-                        'Position Size': '—',
-                        'Exit Reason': exit_reason
+                        'date': current_date,
+                        'type': trade_type,
+                        'price': current_price,
+                        'portfolio': margin_call_portfolio_display,
+                        'pnl': pnl_amount,
+                        'pnl_pct': None,  # Margin calls report the amount only
+                        'position_size': None,
+                        'exit_reason': 'Margin Call'
                     })
-                    print(f"{trade_description}, P&L: {pnl_display}, Leverage: {self.leverage}x, Reason: {exit_reason}")
+                    self.log(f"MARGIN CALL: {trade_type} at ${current_price:.2f}, P&L: {pnl_display}")
                 
-                # Calculate current equity (cash + position value + unrealized P&L if in position)
-                if self.in_position and self.entry_price is not None:
-                    if self.position_type == 'LONG':
-                        # For long positions: cash + base_position_value + unrealized P&L
-                        # The base_position_value represents the cash we invested in the position
-                        price_change = current_price - self.entry_price
-                        unrealized_pnl = price_change * abs(self.position)
-                        current_equity = self.cash + self.base_position_value + unrealized_pnl
-                        print(f"DEBUG: Equity LONG - Cash: ${self.cash:,.2f}, Base Position: ${self.base_position_value:,.2f}, Unrealized P&L: ${unrealized_pnl:,.2f}, Total Equity: ${current_equity:,.2f}")
-                    else:  # SHORT
-                        # For short positions: original cash + unrealized P&L
-                        # The unrealized P&L represents our potential profit/loss
-                        # We use original_cash because current cash includes proceeds from selling borrowed shares
-                        price_change = self.entry_price - current_price
-                        unrealized_pnl = price_change * abs(self.position)
-                        current_equity = self.original_cash + unrealized_pnl
-
-                else:
-                    # When not in position, equity is just the cash
-                    current_equity = self.cash
-
-                
-                # Prevent negative equity - implement margin call
-                if current_equity <= 0:
-                    # Force exit position to prevent negative equity
-                    if self.in_position and self.position != 0:
-                        # Emergency exit - close position at current price
-                        if self.position_type == 'LONG':
-                            exit_value = self.position * current_price
-                            trade_type = 'MARGIN CALL LONG'
-                        else:  # SHORT
-                            exit_value = abs(self.position) * current_price
-                            trade_type = 'MARGIN CALL SHORT'
-                        
-                        # Calculate P&L for margin call
-                        if self.entry_price is not None:
-                            if self.position_type == 'LONG':
-                                pnl_amount = (current_price - self.entry_price) * abs(self.position)
-                            else:  # SHORT
-                                pnl_amount = (self.entry_price - current_price) * abs(self.position)
-                            
-                            if pnl_amount >= 0:
-                                pnl_display = f"+${pnl_amount:,.2f}"
-                            else:
-                                pnl_display = f"-${abs(pnl_amount):,.2f}"
-                        else:
-                            pnl_display = "N/A"
-                        
-                        # Update cash based on exit
-                        if self.position_type == 'LONG':
-                            # For long: get back original position value + P&L
-                            old_cash = self.cash
-                            self.cash += self.base_position_value + pnl_amount
-                            print(f"DEBUG: Margin Call LONG - Old Cash: ${old_cash:,.2f}, Base Position Returned: ${self.base_position_value:,.2f}, P&L: ${pnl_amount:,.2f}, New Cash: ${self.cash:,.2f}")
-                        else:  # SHORT
-                            # For short margin calls: same logic as normal exit
-                            old_cash = self.cash
-                            actual_shares = abs(self.position)
-                            buyback_cost = actual_shares * current_price
-                            self.cash -= buyback_cost
-                            print(f"DEBUG: Margin Call SHORT - Old Cash: ${old_cash:,.2f}, Buyback Cost: ${buyback_cost:,.2f}, P&L: ${pnl_amount:,.2f}, New Cash: ${self.cash:,.2f}")
-                        
-                        # Reset position
-                        self.position = 0
-                        self.position_value = 0
-                        self.base_position_value = 0
-                        self.in_position = False
-                        self.position_type = None
-                        self.entry_price = None
-                        self.entry_date = None
-                        
-                        # Update original cash to reflect the new portfolio value after the margin call
-                        if trade_type == 'MARGIN CALL SHORT':
-                            self.original_cash = self.original_cash + pnl_amount
-                        else:
-                            self.original_cash = self.cash
-                        
-                        # Calculate portfolio value for margin call trades
-                        if trade_type == 'MARGIN CALL SHORT':
-                            # For short margin calls, portfolio value is just the cash
-                            margin_call_portfolio_display = self.cash
-                        else:
-                            # For long margin calls, portfolio includes the returned cash
-                            margin_call_portfolio_display = self.cash
-                        
-                        self.trades.append({
-                            'Date': current_date.strftime('%Y-%m-%d %H:%M'), 
-                            'Type': trade_type, 
-                            'Price': f"{current_price:.2f}", 
-                            'Portfolio': f"${margin_call_portfolio_display:,.2f}",
-                            'P&L': pnl_display,
-                            'Leverage': f"{self.leverage}x",
-                            'Position Size': '—',
-                            'Exit Reason': 'Margin Call'
-                        })
-                        print(f"MARGIN CALL: {trade_type} at ${current_price:.2f}, P&L: {pnl_display}")
-                    
-                    current_equity = max(0, self.cash)  # Set equity to max of 0 or cash
-                
-                self.equity_curve.append(current_equity)
+                current_equity = max(0, self.cash)  # Set equity to max of 0 or cash
             
-            # Close any remaining open positions when data runs out
-            if self.in_position and self.position != 0:
-                print(f"DEBUG: Data finished - closing remaining {self.position_type} position")
-                
-                # Get the last price from the data
-                final_price = self.df['Close'].iloc[-1]
-                final_date = self.df.index[-1]
-                
-                # Calculate final P&L
-                if self.entry_price is not None:
-                    if self.position_type == 'LONG':
-                        # Long position P&L
-                        price_change_pct = ((final_price - self.entry_price) / self.entry_price) * 100
-                        pnl_amount = (final_price - self.entry_price) * abs(self.position)
-                    else:  # SHORT
-                        # Short position P&L (profit when price goes down)
-                        price_change_pct = ((self.entry_price - final_price) / self.entry_price) * 100
-                        pnl_amount = (self.entry_price - final_price) * abs(self.position)
-                    
-                    # Format P&L display
-                    if pnl_amount >= 0:
-                        pnl_display = f"+${pnl_amount:,.2f} (+{price_change_pct:.2f}%)"
-                    else:
-                        pnl_display = f"-${abs(pnl_amount):,.2f} ({price_change_pct:.2f}%)"
-                else:
-                    pnl_display = "N/A"
-                
-                # Update cash based on final P&L
+            self.equity_curve.append(current_equity)
+        
+        # Close any remaining open positions when data runs out
+        if self.in_position and self.position != 0:
+            self.log(f"DEBUG: Data finished - closing remaining {self.position_type} position")
+            
+            # Get the last price from the data
+            final_price = self.df['Close'].iloc[-1]
+            final_date = self.df.index[-1]
+            
+            # Calculate final P&L
+            if self.entry_price is not None:
                 if self.position_type == 'LONG':
-                    # For long positions: we get back our original cash + P&L
-                    old_cash = self.cash
-                    self.cash += self.base_position_value + pnl_amount
-                    print(f"DEBUG: Data End Exit LONG - Old Cash: ${old_cash:,.2f}, Base Position Returned: ${self.base_position_value:,.2f}, P&L: ${pnl_amount:,.2f}, New Cash: ${self.cash:,.2f}")
+                    # Long position P&L
+                    price_change_pct = ((final_price - self.entry_price) / self.entry_price) * 100
+                    pnl_amount = (final_price - self.entry_price) * abs(self.position)
                 else:  # SHORT
-                    # For short positions: we need to buy back the borrowed shares
-                    old_cash = self.cash
-                    actual_shares = abs(self.position)
-                    buyback_cost = actual_shares * final_price
-                    self.cash -= buyback_cost
-                    print(f"DEBUG: Data End Exit SHORT - Old Cash: ${old_cash:,.2f}, Buyback Cost: ${buyback_cost:,.2f}, P&L: ${pnl_amount:,.2f}, New Cash: ${self.cash:,.2f}")
-                
-                # Add final trade to history
-                trade_type = f"EXIT {self.position_type}"
-                
-                # Calculate portfolio value for data finished trades
-                if trade_type == 'EXIT SHORT':
-                    # For short exits, portfolio value is the original cash plus P&L
-                    final_portfolio_display = self.original_cash + pnl_amount
-                else:
-                    # For long exits, portfolio includes the returned cash
-                    final_portfolio_display = self.cash
-                
-                self.trades.append({
-                    'Date': final_date.strftime('%Y-%m-%d %H:%M'), 
-                    'Type': trade_type, 
-                    'Price': f"{final_price:.2f}", 
-                    'Portfolio': f"${final_portfolio_display:,.2f}",
-                    'P&L': pnl_display,
-                    'Leverage': f"{self.leverage}x",
-                    'Position Size': '—',
-                    'Exit Reason': 'Data Finished'
-                })
-                
-                print(f"Data Finished: {trade_type} at ${final_price:.2f}, P&L: {pnl_display}")
-                
-                # Reset position tracking
-                self.position = 0
-                self.position_value = 0
-                self.base_position_value = 0
-                self.in_position = False
-                self.position_type = None
-                self.entry_price = None
-                self.entry_date = None
+                    # Short position P&L (profit when price goes down)
+                    price_change_pct = ((self.entry_price - final_price) / self.entry_price) * 100
+                    pnl_amount = (self.entry_price - final_price) * abs(self.position)
                 
-                # Update original cash to reflect the new portfolio value after the data finished trade
-                if trade_type == 'EXIT SHORT':
-                    self.original_cash = self.original_cash + pnl_amount
+                # Format P&L display
+                if pnl_amount >= 0:
+                    pnl_display = f"+${pnl_amount:,.2f} (+{price_change_pct:.2f}%)"
                 else:
-                    self.original_cash = self.cash
-                
-                # Calculate final equity (should be just cash now)
-                final_equity = self.cash
-                self.equity_curve.append(final_equity)
+                    pnl_display = f"-${abs(pnl_amount):,.2f} ({price_change_pct:.2f}%)"
+            else:
+                pnl_display = "N/A"
             
-            return self._format_results()
+            # Update cash based on final P&L
+            if self.position_type == 'LONG':
+                # For long positions: we get back our original cash + P&L
+                old_cash = self.cash
+                self.cash += self.base_position_value + pnl_amount
+                self.log(f"DEBUG: Data End Exit LONG - Old Cash: ${old_cash:,.2f}, Base Position Returned: ${self.base_position_value:,.2f}, P&L: ${pnl_amount:,.2f}, New Cash: ${self.cash:,.2f}")
+            else:  # SHORT
+                # For short positions: we need to buy back the borrowed shares
+                old_cash = self.cash
+                actual_shares = abs(self.position)
+                buyback_cost = actual_shares * final_price
+                self.cash -= buyback_cost
+                self.log(f"DEBUG: Data End Exit SHORT - Old Cash: ${old_cash:,.2f}, Buyback Cost: ${buyback_cost:,.2f}, P&L: ${pnl_amount:,.2f}, New Cash: ${self.cash:,.2f}")
             
-        except Exception as e:
-            return {
-                'error': f'Simulation failed: {str(e)}',
-                'stats': {},
-                'plot_data': {'equity_curve': [], 'dates': []},
-                'trades': []
-            }
+            # Add final trade to history
+            trade_type = f"EXIT {self.position_type}"
+            
+            # Calculate portfolio value for data finished trades
+            if trade_type == 'EXIT SHORT':
+                # For short exits, portfolio value is the original cash plus P&L
+                final_portfolio_display = self.original_cash + pnl_amount
+            else:
+                # For long exits, portfolio includes the returned cash
+                final_portfolio_display = self.cash
+            
+            self.trades.append({
+                'date': final_date,
+                'type': trade_type,
+                'price': final_price,
+                'portfolio': final_portfolio_display,
+                'pnl': pnl_amount,
+                'pnl_pct': price_change_pct,
+                'position_size': None,
+                'exit_reason': 'Data Finished'
+            })
+            
+            self.log(f"Data Finished: {trade_type} at ${final_price:.2f}, P&L: {pnl_display}")
+            
+            # Reset position tracking
+            self.position = 0
+            self.position_value = 0
+            self.base_position_value = 0
+            self.in_position = False
+            self.position_type = None
+            self.entry_price = None
+            self.entry_date = None
+            
+            # Update original cash to reflect the new portfolio value after the data finished trade
+            if trade_type == 'EXIT SHORT':
+                self.original_cash = self.original_cash + pnl_amount
+            else:
+                self.original_cash = self.cash
+            
+            # Calculate final equity (should be just cash now)
+            final_equity = self.cash
+            self.equity_curve.append(final_equity)
 
     def _format_results(self):
         """Format the simulation results with error handling."""
-        if not self.equity_curve:
-            return {
-                'error': 'Backtest generated no data.',
-                'stats': {},
-                'plot_data': {'equity_curve': [], 'dates': []},
-                'trades': []
-            }
-        
-        try:
-            final_equity = self.equity_curve[-1]
-            total_return_pct = ((final_equity - self.initial_cash) / self.initial_cash) * 100
-
-            return {
-                'stats': {
-                    'Start': self.df.index[0].strftime('%Y-%m-%d'),
-                    'End': self.df.index[-1].strftime('%Y-%m-%d'),
-                    'Equity Final [$]': f"{final_equity:,.2f}",
-                    'Return [%]': f"{total_return_pct:.2f}",
-                    '# Trades': len(self.trades)
-                },
-                'plot_data': {
-                    'equity_curve': self.equity_curve,
-                    'dates': self.df.index.strftime('%Y-%m-%d %H:%M').tolist()
-                },
-                'trades': self.trades
-            }
-        except Exception as e:
-            return {
-                'error': f'Error formatting results: {str(e)}',
-                'stats': {},
-                'plot_data': {'equity_curve': [], 'dates': []},
-                'trades': []
-            }
\ No newline at end of file
+        return format_simulation_results(self.df.index, self.equity_curve, self.trades, self.initial_cash, self.leverage)
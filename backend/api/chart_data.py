@@ -0,0 +1,132 @@
+# backend/api/chart_data.py
+"""
+Columnar chart data: prices and indicator values for a dataset window.
+
+Charts need a few columns over many bars, so rows of JSON objects would
+repeat every column name on every bar. Columns are returned column by
+column instead, from the frames cached by the data and indicator stages,
+in one of two encodings:
+
+- 'json':   {'time': [...], 'columns': {'Close': [...], ...}} with missing
+            values as null;
+- 'binary': a little-endian uint32 header length, a JSON header (column
+            names, dtype, row count), then the int64 epoch-second times and
+            each column as a typed array, streamed one chunk per column.
+            A browser reads each column straight into a Float32Array or
+            Float64Array.
+
+When the window has more bars than `max_points`, consecutive bars are merged
+into candles of `step` bars: first Open, highest High, lowest Low, last Close
+and summed Volume, with indicators taking each candle's last value.
+"""
+import json
+import struct
+
+import numpy as np
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Columns drawn for each strategy indicator (see generate_signals)
+INDICATOR_CHART_COLUMNS = {
+    'RSI': ['rsi'],
+    'MACD': ['macd_line', 'macd_signal'],
+    'SMA': ['sma_20'],
+    'EMA': ['ema_20'],
+    'BOLLINGER_BANDS': ['bb_upper', 'bb_middle', 'bb_lower'],
+    'STOCHASTIC': ['stoch_k', 'stoch_d'],
+    'WILLIAMS_R': ['williams_r'],
+    'ATR': ['atr'],
+    'VOLUME': ['Volume'],
+    'CLOSE': ['Close'],
+}
+
+CHART_DATA_ENCODINGS = ['json', 'binary']
+CHART_DATA_DTYPES = ['float32', 'float64']
+
+# How each price column is merged when bars are decimated; other columns keep the last value
+DECIMATION_REDUCERS = {
+    'Open': 'first',
+    'High': np.maximum,
+    'Low': np.minimum,
+    'Volume': np.add,
+}
+
+
+def strategy_chart_columns(strategy_config: dict) -> list:
+    """The indicator columns a strategy's conditions use (their compared indicators included)."""
+    columns = []
+    for condition in strategy_config.get('conditions', []):
+        for indicator in (condition.get('indicator'), condition.get('compareIndicator')):
+            for column in INDICATOR_CHART_COLUMNS.get(str(indicator or '').upper(), []):
+                if column not in columns and column not in OHLCV_COLUMNS:
+                    columns.append(column)
+    return columns
+
+
+def decimation_step(n_rows: int, max_points: int) -> int:
+    """Bars merged into each point so that at most `max_points` remain."""
+    return max(1, -(-n_rows // max_points))
+
+
+def decimate_column(name: str, values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """Merge the bars of a column into the groups beginning at `starts` (see DECIMATION_REDUCERS)."""
+    reducer = DECIMATION_REDUCERS.get(name)
+    if reducer == 'first':
+        return values[starts]
+    if reducer is not None:
+        if np.issubdtype(values.dtype, np.floating):
+            # NaN-aware: a group is NaN only when all of its bars are
+            fill = {np.maximum: -np.inf, np.minimum: np.inf, np.add: 0.0}[reducer]
+            filled = np.where(np.isnan(values), fill, values)
+            merged = reducer.reduceat(filled, starts)
+            counts = np.add.reduceat((~np.isnan(values)).astype(int), starts)
+            return np.where(counts > 0, merged, np.nan)
+        return reducer.reduceat(values, starts)
+    ends = np.append(starts[1:], len(values)) - 1
+    return values[ends]
+
+
+def chart_frame_columns(df, columns: list, max_points: int):
+    """
+    Epoch-second times and the requested columns of a window, decimated to
+    at most `max_points` rows. Returns (times, {column: float array}, step).
+    """
+    step = decimation_step(len(df), max_points)
+    starts = np.arange(0, len(df), step)
+    times = df.index.values.astype('datetime64[s]').astype(np.int64)[starts]
+    values = {}
+    for column in columns:
+        column_values = df[column].to_numpy()
+        if step > 1:
+            column_values = decimate_column(column, column_values, starts)
+        values[column] = column_values.astype(float)
+    return times, values, step
+
+
+def chart_json(times, values: dict, step: int) -> dict:
+    """The compact JSON encoding: one array per column, NaN as null."""
+    return {
+        'rows': len(times),
+        'step': step,
+        'time': times.tolist(),
+        'columns': {
+            column: [None if np.isnan(value) else value for value in column_values.tolist()]
+            for column, column_values in values.items()
+        },
+    }
+
+
+def chart_binary_chunks(times, values: dict, step: int, dtype: str = 'float32'):
+    """Yield the binary encoding: the header, then the times, then one chunk per column."""
+    header = json.dumps({
+        'rows': len(times),
+        'step': step,
+        'time_dtype': 'int64',
+        'dtype': dtype,
+        'columns': list(values),
+    }, separators=(',', ':')).encode('utf-8')
+    yield struct.pack('<I', len(header)) + header
+    yield times.astype('<i8').tobytes()
+    for column_values in values.values():
+        yield column_values.astype(np.dtype(dtype).newbyteorder('<')).tobytes()
+
@@ -3,6 +3,28 @@ import pandas as pd
 from datetime import datetime
 import glob
 
+# Map frontend timeframes to directory names
+TIMEFRAME_DIRECTORIES = {
+    '1m': '1m',
+    '5m': '5m', 
+    '15m': '15m',
+    '30m': '30m',
+    '1h': '1h',
+    '4h': '4h',
+    '1d': '1d'
+}
+
+# Bytes read from the end of a file to find its last row
+TAIL_BYTES = 4096
+
+# Catalog entries by dataset directory: (file signature, entry)
+_catalog = {}
+
+def csv_dataset_dir(ticker: str, timeframe: str) -> str:
+    """Directory holding the CSV files of a ticker and timeframe."""
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(backend_dir, 'data', 'csv', ticker.lower(), TIMEFRAME_DIRECTORIES[timeframe])
+
 def load_csv_data(ticker: str, start_date: str, end_date: str, timeframe: str) -> tuple:
     """
     Load CSV data from local files instead of external APIs.
@@ -17,23 +39,11 @@ def load_csv_data(ticker: str, start_date: str, end_date: str, timeframe: str) -
         tuple: (dataframe, data_range_info)
     """
     
-    # Map frontend timeframes to directory names
-    timeframe_map = {
-        '1m': '1m',
-        '5m': '5m', 
-        '15m': '15m',
-        '30m': '30m',
-        '1h': '1h',
-        '4h': '4h',
-        '1d': '1d'
-    }
-    
-    if timeframe not in timeframe_map:
-        raise ValueError(f"Unsupported timeframe: {timeframe}. Supported: {list(timeframe_map.keys())}")
+    if timeframe not in TIMEFRAME_DIRECTORIES:
+        raise ValueError(f"Unsupported timeframe: {timeframe}. Supported: {list(TIMEFRAME_DIRECTORIES.keys())}")
     
     # Construct path to CSV files - use path relative to backend directory
-    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    csv_dir = os.path.join(backend_dir, 'data', 'csv', ticker.lower(), timeframe_map[timeframe])
+    csv_dir = csv_dataset_dir(ticker, timeframe)
     
     if not os.path.exists(csv_dir):
         raise ValueError(f"CSV directory not found: {csv_dir}")
@@ -105,6 +115,70 @@ def load_csv_data(ticker: str, start_date: str, end_date: str, timeframe: str) -
     
     return data, data_range_info
 
+def _edge_dates(csv_file: str) -> tuple:
+    """Timestamps of the first and last rows of a CSV file, read without parsing the rest."""
+    with open(csv_file, 'rb') as f:
+        first_line = f.readline()
+        f.seek(max(0, os.path.getsize(csv_file) - TAIL_BYTES))
+        last_line = [line for line in f.read().splitlines() if line.strip()][-1]
+    first, last = (pd.to_datetime(line.decode('utf-8').split('\t')[0]) for line in (first_line, last_line))
+    return min(first, last), max(first, last)
+
+def get_dataset_catalog(ticker: str, timeframe: str) -> dict:
+    """
+    Catalog metadata of a CSV dataset: its first and last timestamps, from the
+    first and last rows of each file (files are in time order). Entries are
+    cached until a file changes, so this costs a directory listing.
+    
+    Raises ValueError with the messages load_csv_data raises for a missing dataset.
+    
+    Returns:
+        dict: {'first': Timestamp, 'last': Timestamp, 'files': count}
+    """
+    if timeframe not in TIMEFRAME_DIRECTORIES:
+        raise ValueError(f"Unsupported timeframe: {timeframe}. Supported: {list(TIMEFRAME_DIRECTORIES.keys())}")
+    
+    csv_dir = csv_dataset_dir(ticker, timeframe)
+    if not os.path.exists(csv_dir):
+        raise ValueError(f"CSV directory not found: {csv_dir}")
+    
+    csv_files = glob.glob(os.path.join(csv_dir, '*.csv'))
+    if not csv_files:
+        raise ValueError(f"No CSV files found in {csv_dir}")
+    
+    signature = tuple(sorted((path, os.stat(path).st_mtime_ns, os.stat(path).st_size) for path in csv_files))
+    cached = _catalog.get(csv_dir)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    
+    edges = []
+    for csv_file in csv_files:
+        try:
+            edges.append(_edge_dates(csv_file))
+        except Exception:
+            continue  # load_csv_data skips unreadable files too
+    if not edges:
+        raise ValueError(f"Could not read any CSV files from {csv_dir}")
+    
+    entry = {
+        'first': min(first for first, _ in edges),
+        'last': max(last for _, last in edges),
+        'files': len(csv_files),
+    }
+    _catalog[csv_dir] = (signature, entry)
+    return entry
+
+def check_csv_coverage(ticker: str, start_date: str, end_date: str, timeframe: str) -> dict:
+    """
+    Raise the ValueError load_csv_data would raise for a request the catalog
+    can already rule out (no such dataset, or no rows in the date range),
+    without reading the data. Returns the catalog entry.
+    """
+    entry = get_dataset_catalog(ticker, timeframe)
+    if entry['last'] < pd.to_datetime(start_date) or entry['first'] > pd.to_datetime(end_date):
+        raise ValueError(f"No data found for {ticker} in the specified date range")
+    return entry
+
 def get_available_tickers() -> list:
     """Get list of available tickers from the data directory."""
     backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
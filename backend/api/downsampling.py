@@ -0,0 +1,125 @@
+# backend/api/downsampling.py
+"""
+Downsampling of equity curves for charts.
+
+A backtest has one equity point (and one date) per bar, but a chart is only
+a couple of thousand pixels wide. Results are therefore reduced to at most
+`max_points` points before they are sent to the browser, using
+Largest-Triangle-Three-Buckets: the interior points are split into equal
+buckets and each bucket keeps the point that forms the largest triangle with
+its neighbours, which keeps the visual shape of the curve.
+
+Classic LTTB anchors each bucket on the point picked in the previous bucket,
+which makes it sequential. Here each bucket is anchored on the average of the
+previous bucket instead, so every bucket is computed at once with numpy.
+The first and last points, the global high and low, and the peak and trough
+of the maximum drawdown are always kept, so the drawdown a chart shows is
+the drawdown of the backtest.
+"""
+import numpy as np
+
+DEFAULT_MAX_POINTS = 2000
+MIN_MAX_POINTS = 10
+MAX_MAX_POINTS = 20000
+
+
+def extrema_indices(values: np.ndarray) -> set:
+    """Positions of the high, the low and the peak and trough of the maximum drawdown."""
+    peaks = np.maximum.accumulate(values)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drawdowns = np.where(peaks > 0, (values - peaks) / peaks, 0.0)
+    trough = int(np.argmin(drawdowns))
+    peak = int(np.argmax(values[:trough + 1]))
+    return {int(np.argmax(values)), int(np.argmin(values)), peak, trough}
+
+
+def lttb_indices(values: np.ndarray, max_points: int) -> np.ndarray:
+    """Sorted positions of at most `max_points` points of `values` chosen by (bucket-averaged) LTTB."""
+    n = len(values)
+    if max_points >= n:
+        return np.arange(n)
+    if max_points < 3:
+        return np.array([0, n - 1][:max(max_points, 0)], dtype=int)
+
+    y = np.asarray(values, dtype=float)
+    x = np.arange(n, dtype=float)
+
+    # Interior points 1 .. n-2 in max_points - 2 contiguous, non-empty buckets
+    n_buckets = max_points - 2
+    edges = np.linspace(1, n - 1, n_buckets + 1).astype(int)
+    starts = edges[:-1]
+    counts = np.diff(edges)
+    bucket = np.repeat(np.arange(n_buckets), counts)
+
+    mean_x = np.add.reduceat(x[:n - 1], starts) / counts
+    mean_y = np.add.reduceat(y[:n - 1], starts) / counts
+
+    # Each bucket's triangle runs from the previous bucket's average to the next one's
+    anchor_x = np.concatenate([[x[0]], mean_x[:-1]])[bucket]
+    anchor_y = np.concatenate([[y[0]], mean_y[:-1]])[bucket]
+    next_x = np.concatenate([mean_x[1:], [x[-1]]])[bucket]
+    next_y = np.concatenate([mean_y[1:], [y[-1]]])[bucket]
+
+    interior_x = x[1:n - 1]
+    interior_y = y[1:n - 1]
+    areas = np.abs((anchor_x - next_x) * (interior_y - anchor_y) - (anchor_x - interior_x) * (next_y - anchor_y))
+
+    # Largest area per bucket: sort by bucket, then by area descending, and take each bucket's first
+    order = np.lexsort((-areas, bucket))
+    picked = order[starts - 1] + 1
+    return np.concatenate([[0], picked, [n - 1]])
+
+
+def downsample_indices(values, max_points: int) -> np.ndarray:
+    """Sorted positions of at most `max_points` points of a curve, always including its drawdown extrema."""
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    if n <= max_points:
+        return np.arange(n)
+
+    extrema = extrema_indices(values) - {0, n - 1}
+    picked = lttb_indices(values, max_points - len(extrema))
+    return np.union1d(picked, np.fromiter(extrema, dtype=int, count=len(extrema)))
+
+
+def downsample_plot_data(plot_data: dict, max_points: int) -> dict:
+    """
+    plot_data with at most `max_points` equity points and their dates. The
+    equity curve may have one more point than there are dates (a position
+    closed after the last bar); that last point is kept and stays undated.
+    """
+    equity_curve = plot_data.get('equity_curve') or []
+    if len(equity_curve) <= max_points:
+        return plot_data
+
+    dates = plot_data.get('dates') or []
+    indices = downsample_indices(equity_curve, max_points).tolist()
+    return {
+        **plot_data,
+        'equity_curve': [equity_curve[i] for i in indices],
+        'dates': [dates[i] for i in indices if i < len(dates)],
+    }
+
+
+def downsample_curves(curves: list, dates: list, max_points: int):
+    """
+    Downsample several equity curves over the same dates (e.g. the lanes of a
+    leverage sweep) to shared positions. Each curve picks max_points / len(curves)
+    points and the picks are merged. Returns (curves, dates).
+    """
+    if not curves or len(dates) <= max_points:
+        return curves, dates
+
+    budget = max(MIN_MAX_POINTS, max_points // len(curves))
+    indices = np.unique(np.concatenate([
+        downsample_indices(np.asarray(curve, dtype=float)[:len(dates)], budget) for curve in curves
+    ])).tolist()
+    # A curve may end with an undated point (see downsample_plot_data), which is kept
+    return [[curve[i] for i in indices] + list(curve[len(dates):]) for curve in curves], [dates[i] for i in indices]
+
+
+def downsample_results(results: dict, max_points: int) -> dict:
+    """A copy of a backtest result with its plot_data downsampled (the result itself is left untouched)."""
+    if not isinstance(results, dict) or 'plot_data' not in results:
+        return results
+    return {**results, 'plot_data': downsample_plot_data(results['plot_data'], max_points)}
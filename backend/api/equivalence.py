@@ -0,0 +1,319 @@
+# backend/api/equivalence.py
+"""
+Golden-result equivalence harness for alternative backtest engines.
+
+Any engine that replaces (or short-circuits) the reference pipeline in
+backtester.run_backtest must produce the same trades and equity curve. This
+module generates a randomized corpus of strategy configurations covering every
+operator, position sizing mode, stop loss type and take profit type, runs each
+one through two engines on windows of the shipped CSV datasets, and diffs the
+results within a numeric tolerance.
+
+An engine is any callable with the run_backtest signature:
+    engine(data_df, strategy_config, initial_cash, leverage) -> results dict
+"""
+import contextlib
+import io
+import random
+import re
+
+import numpy as np
+
+from .backtester import (
+    run_backtest, VALID_OPERATORS, VALID_INDICATORS, VALID_POSITION_SIZING_TYPES,
+    VALID_STOP_LOSS_TYPES, VALID_TAKE_PROFIT_TYPES, ATR_PERIODS,
+)
+from .pipeline import run_staged_backtest
+from .lanes import run_lane_backtest
+from .csv_data_loader import load_csv_data, get_available_tickers, get_available_timeframes
+
+# Column each strategy indicator is evaluated against (mirrors generate_signals)
+INDICATOR_COLUMNS = {
+    'RSI': 'rsi',
+    'MACD': 'macd_line',
+    'SMA': 'sma_20',
+    'EMA': 'ema_20',
+    'Bollinger_Bands': 'bb_middle',
+    'Stochastic': 'stoch_k',
+    'Williams_R': 'williams_r',
+    'ATR': 'atr',
+    'Volume': 'Volume',
+    'Close': 'Close',
+}
+
+
+# Trade fields compared verbatim; every other field is compared numerically
+EXACT_TRADE_FIELDS = ['Date', 'Type', 'Leverage', 'Exit Reason']
+
+ENGINES = {
+    'reference': run_backtest,
+    'staged': run_staged_backtest,
+    'lanes': run_lane_backtest,
+}
+
+
+def register_engine(name: str):
+    """Decorator registering a candidate engine under a name usable by the harness."""
+    def decorator(func):
+        ENGINES[name] = func
+        return func
+    return decorator
+
+
+def get_engine(name: str):
+    """Look up a registered engine by name."""
+    if name not in ENGINES:
+        raise ValueError(f"Unknown engine: {name}. Registered engines: {sorted(ENGINES)}")
+    return ENGINES[name]
+
+
+def _quantile(df, column: str, rng: random.Random, low: float = 0.05, high: float = 0.95) -> float:
+    """Pick a threshold inside the observed distribution of a column so conditions actually trigger."""
+    values = df[column].dropna().to_numpy(dtype=float)
+    if len(values) == 0:
+        return 0.0
+    return round(float(np.quantile(values, rng.uniform(low, high))), 4)
+
+
+def generate_random_strategy(rng: random.Random, df) -> dict:
+    """
+    Build a random but valid strategy configuration.
+
+    `df` must already contain indicator columns (see add_indicators_to_data);
+    thresholds are drawn from its quantiles so most strategies place trades.
+    """
+    conditions = []
+    for i in range(rng.randint(1, 3)):
+        indicator = rng.choice(VALID_INDICATORS)
+        op = rng.choice(VALID_OPERATORS)
+        column = INDICATOR_COLUMNS[indicator]
+        condition = {'id': str(i + 1), 'indicator': indicator, 'operator': op, 'period': 14}
+
+        if op in ['crosses_above', 'crosses_below']:
+            condition['compareIndicator'] = rng.choice(VALID_INDICATORS)
+        elif op in ['between', 'outside']:
+            low, high = sorted([_quantile(df, column, rng), _quantile(df, column, rng)])
+            condition['value'] = str(low)
+            condition['compareValue'] = str(high)
+        elif op in ['equals', 'not_equals']:
+            # Exact matches only ever hit on discrete values, so sample an observed one
+            values = df[column].dropna()
+            condition['value'] = str(values.iloc[rng.randrange(len(values))]) if len(values) else '0'
+        else:
+            condition['value'] = str(_quantile(df, column, rng))
+        conditions.append(condition)
+
+    close = df['Close']
+    typical_price = float(close.median())
+
+    sizing = rng.choice(VALID_POSITION_SIZING_TYPES)
+    entry_condition = {
+        'positionSizing': sizing,
+        'sizingValue': round(rng.uniform(1, 100), 2),
+        'maxPositionSize': round(rng.uniform(10, 100), 2),
+    }
+    if sizing == 'fixed_dollar':
+        entry_condition['sizingValue'] = round(rng.uniform(100, 20000), 2)
+    elif sizing == 'risk_based':
+        entry_condition['riskPerTrade'] = round(rng.uniform(0.5, 50), 2)
+    elif sizing == 'volatility_based':
+        entry_condition['volatilityPeriod'] = rng.choice(ATR_PERIODS)
+
+    exit_condition = {}
+    if rng.random() < 0.9:
+        sl_type = rng.choice(VALID_STOP_LOSS_TYPES)
+        stop_loss = {'type': sl_type, 'value': round(rng.uniform(0.5, 10), 2)}
+        if sl_type in ['fixed_dollar', 'trailing_dollar']:
+            stop_loss['value'] = round(typical_price * rng.uniform(0.005, 0.1), 4)
+        elif sl_type == 'atr_based':
+            stop_loss['value'] = round(rng.uniform(0.5, 4), 2)
+            stop_loss['atrPeriod'] = rng.choice(ATR_PERIODS)
+        elif sl_type == 'support_resistance':
+            stop_loss['supportResistanceLevel'] = _quantile(df, 'Close', rng)
+        exit_condition['stopLoss'] = stop_loss
+
+    if rng.random() < 0.9:
+        tp_type = rng.choice(VALID_TAKE_PROFIT_TYPES)
+        take_profit = {'type': tp_type, 'value': round(rng.uniform(0.5, 20), 2)}
+        if tp_type == 'fixed_dollar':
+            take_profit['value'] = round(typical_price * rng.uniform(0.005, 0.2), 4)
+        elif tp_type == 'risk_reward_ratio':
+            take_profit['riskRewardRatio'] = round(rng.uniform(0.5, 4), 2)
+        elif tp_type == 'indicator_based':
+            indicator = rng.choice(VALID_INDICATORS)
+            take_profit['indicator'] = indicator
+            take_profit['indicatorValue'] = str(_quantile(df, INDICATOR_COLUMNS[indicator], rng))
+        exit_condition['takeProfit'] = take_profit
+
+    return {
+        'conditions': conditions,
+        'logicalOperator': rng.choice(['AND', 'OR']),
+        'action': rng.choice(['LONG', 'SHORT']),
+        'entryCondition': entry_condition,
+        'exitCondition': exit_condition,
+    }
+
+
+def list_shipped_datasets() -> list:
+    """Every (ticker, timeframe) pair available in the CSV data directory."""
+    datasets = []
+    for ticker in sorted(get_available_tickers()):
+        for timeframe in sorted(get_available_timeframes(ticker)):
+            datasets.append((ticker, timeframe))
+    return datasets
+
+
+_NUMBER_RE = re.compile(r'([+-]?)\$?(\d[\d,]*(?:\.\d+)?)')
+
+
+def _parse_numbers(value) -> list:
+    """Extract signed numbers from display strings such as '-$1,234.56 (-1.23%)'."""
+    if isinstance(value, (int, float)):
+        return [float(value)]
+    return [
+        float(sign + digits.replace(',', ''))
+        for sign, digits in _NUMBER_RE.findall(str(value))
+    ]
+
+
+def _values_match(expected, actual, rtol: float, atol: float) -> bool:
+    expected_numbers = _parse_numbers(expected)
+    actual_numbers = _parse_numbers(actual)
+    if not expected_numbers and not actual_numbers:
+        return str(expected) == str(actual)
+    if len(expected_numbers) != len(actual_numbers):
+        return False
+    return bool(np.allclose(expected_numbers, actual_numbers, rtol=rtol, atol=atol))
+
+
+def compare_results(reference: dict, candidate: dict, rtol: float = 1e-7, atol: float = 0.011) -> list:
+    """
+    Diff two backtest result dicts. Returns a list of human readable mismatches
+    (empty when the results are equivalent).
+
+    The default `atol` allows one cent of drift in values the simulator rounds
+    to two decimals for display.
+    """
+    mismatches = []
+
+    if ('error' in reference) != ('error' in candidate):
+        mismatches.append(f"error: {reference.get('error')!r} != {candidate.get('error')!r}")
+        return mismatches
+    if 'error' in reference:
+        return mismatches
+
+    ref_stats = reference.get('stats', {})
+    cand_stats = candidate.get('stats', {})
+    for key in sorted(set(ref_stats) | set(cand_stats)):
+        if key not in ref_stats or key not in cand_stats:
+            mismatches.append(f"stats[{key!r}] missing on one side")
+        elif not _values_match(ref_stats[key], cand_stats[key], rtol, atol):
+            mismatches.append(f"stats[{key!r}]: {ref_stats[key]!r} != {cand_stats[key]!r}")
+
+    ref_plot = reference.get('plot_data', {})
+    cand_plot = candidate.get('plot_data', {})
+    if list(ref_plot.get('dates', [])) != list(cand_plot.get('dates', [])):
+        mismatches.append("plot_data['dates'] differ")
+
+    ref_equity = np.asarray(ref_plot.get('equity_curve', []), dtype=float)
+    cand_equity = np.asarray(cand_plot.get('equity_curve', []), dtype=float)
+    if ref_equity.shape != cand_equity.shape:
+        mismatches.append(f"equity_curve length: {len(ref_equity)} != {len(cand_equity)}")
+    elif not np.allclose(ref_equity, cand_equity, rtol=rtol, atol=atol):
+        bad = np.flatnonzero(~np.isclose(ref_equity, cand_equity, rtol=rtol, atol=atol))
+        mismatches.append(
+            f"equity_curve differs at {len(bad)} bars, first at {bad[0]}: "
+            f"{ref_equity[bad[0]]!r} != {cand_equity[bad[0]]!r}"
+        )
+
+    ref_trades = reference.get('trades', [])
+    cand_trades = candidate.get('trades', [])
+    if len(ref_trades) != len(cand_trades):
+        mismatches.append(f"trade count: {len(ref_trades)} != {len(cand_trades)}")
+    for i, (ref_trade, cand_trade) in enumerate(zip(ref_trades, cand_trades)):
+        for key in sorted(set(ref_trade) | set(cand_trade)):
+            expected, actual = ref_trade.get(key), cand_trade.get(key)
+            if key in EXACT_TRADE_FIELDS:
+                equal = expected == actual
+            else:
+                equal = _values_match(expected, actual, rtol, atol)
+            if not equal:
+                mismatches.append(f"trades[{i}][{key!r}]: {expected!r} != {actual!r}")
+                break
+        if len(mismatches) > 20:
+            break
+
+    return mismatches
+
+
+def _run_quietly(engine, data_df, config: dict, initial_cash: float, leverage: float) -> dict:
+    """Run an engine with its debug output swallowed."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            return engine(data_df.copy(), config, initial_cash, leverage)
+        except Exception as e:
+            return {'error': f'Engine raised: {str(e)}', 'stats': {}, 'plot_data': {'equity_curve': [], 'dates': []}, 'trades': []}
+
+
+def run_equivalence_suite(candidate: str, reference: str = 'reference', n_configs: int = 200,
+                          seed: int = 0, datasets: list = None, min_bars: int = 200,
+                          max_bars: int = 2000, rtol: float = 1e-7, atol: float = 0.011,
+                          progress=None) -> dict:
+    """
+    Run `n_configs` randomized strategies through both engines and diff the results.
+
+    Each case draws a dataset, a contiguous window of `min_bars`..`max_bars` bars,
+    a strategy configuration, an initial cash amount and a leverage. Returns a
+    report dict with the number of cases run and the details of every failure,
+    including the configuration needed to reproduce it.
+    """
+    from .indicators import add_indicators_to_data
+
+    reference_engine = get_engine(reference)
+    candidate_engine = get_engine(candidate)
+    rng = random.Random(seed)
+    datasets = datasets or list_shipped_datasets()
+    if not datasets:
+        raise ValueError("No datasets available for the equivalence suite")
+
+    frames = {}
+    failures = []
+    for case in range(n_configs):
+        ticker, timeframe = rng.choice(datasets)
+        if (ticker, timeframe) not in frames:
+            frames[(ticker, timeframe)], _ = load_csv_data(ticker, '1900-01-01', '2100-01-01', timeframe)
+        full = frames[(ticker, timeframe)]
+
+        n_bars = min(len(full), rng.randint(min_bars, max_bars))
+        start = rng.randint(0, len(full) - n_bars)
+        window = full.iloc[start:start + n_bars]
+
+        config = generate_random_strategy(rng, add_indicators_to_data(window))
+        initial_cash = rng.choice([1000, 10000, 25000, 100000])
+        leverage = rng.choice([1.0, 2.0, 5.0, 10.0])
+
+        expected = _run_quietly(reference_engine, window, config, initial_cash, leverage)
+        actual = _run_quietly(candidate_engine, window, config, initial_cash, leverage)
+        mismatches = compare_results(expected, actual, rtol=rtol, atol=atol)
+        if mismatches:
+            failures.append({
+                'case': case,
+                'ticker': ticker,
+                'timeframe': timeframe,
+                'start': window.index[0].strftime('%Y-%m-%d %H:%M'),
+                'end': window.index[-1].strftime('%Y-%m-%d %H:%M'),
+                'initial_cash': initial_cash,
+                'leverage': leverage,
+                'config': config,
+                'mismatches': mismatches,
+            })
+        if progress:
+            progress(case + 1, n_configs, len(failures))
+
+    return {
+        'reference': reference,
+        'candidate': candidate,
+        'cases': n_configs,
+        'seed': seed,
+        'failures': failures,
+    }
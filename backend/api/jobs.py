@@ -0,0 +1,345 @@
+# backend/api/jobs.py
+"""
+Database-backed backtest job queue.
+
+The web process only inserts a BacktestJob row and returns its id. Any number
+of run_backtest_workers processes, on any number of nodes, claim queued rows
+with SELECT ... FOR UPDATE SKIP LOCKED and execute them in a pool of local
+worker processes, so long backtests never tie up a gunicorn worker.
+
+The order jobs are claimed in is decided by scheduler.TierScheduler: per-tier
+queues, per-user concurrency caps and round-robin between users.
+
+Each node heartbeats the jobs it is running. A running job whose heartbeat goes
+stale (its node died) is put back in the queue by whichever node notices first,
+up to MAX_JOB_ATTEMPTS attempts. A node that was only slow finds out before it
+saves anything, so a requeued job is saved and counted once.
+
+A batch job runs one strategy over many ticker/timeframe datasets. It is
+scheduled like any other job, and its datasets are backtested one after the
+other by the worker process that claimed it.
+
+An optimization job searches a strategy's parameters, over a full grid or
+by successive halving (see backtest_service.execute_optimization), and a
+walk-forward job optimizes them fold by fold (execute_walk_forward); both
+record their report on the row.
+"""
+import contextlib
+import logging
+import multiprocessing
+import os
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework import status
+
+from .models import BacktestJob, BatchBacktestResult, UserProfile
+from .scheduler import TierScheduler
+from .backtest_service import (
+    BacktestError, backtest_request_hash, batch_request_hash, optimization_request_hash, execute_backtest,
+    execute_optimization, execute_walk_forward, backtest_dataset, admit_backtest, admit_batch, admit_optimization,
+    admit_walk_forward, reserved_backtest, split_results,
+)
+from .artifacts import encode_artifact
+from .worker_process import init_worker_process, run_job_in_worker
+
+logger = logging.getLogger(__name__)
+
+MAX_JOB_ATTEMPTS = 3
+HEARTBEAT_INTERVAL = 10  # seconds between heartbeats for in-flight jobs
+STALE_AFTER = 60  # seconds without a heartbeat before a running job is presumed dead
+
+
+def default_worker_id():
+    """Identify this worker node as host:pid."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def submit_backtest_job(user, strategy, params, kind='backtest'):
+    """
+    Queue a backtest for the given strategy, or with kind='batch' a batch
+    backtest (parameters from parse_batch_params), with kind='optimization'
+    a parameter search (parse_optimization_params) or with
+    kind='walk_forward' a walk-forward optimization (parse_walk_forward_params);
+    the configuration is snapshotted now.
+
+    The request is admitted first (daily limit, entitlements, dataset coverage,
+    configuration), raising the same BacktestError the synchronous endpoint
+    would, so a job that can only fail is never queued. If the user already
+    has an identical request queued or running, that job is returned instead
+    of queueing a duplicate. Returns (job, created).
+    """
+    if kind == 'batch':
+        admit_batch(user, params, strategy.configuration)
+        request_hash = batch_request_hash(strategy.configuration, params)
+    elif kind == 'optimization':
+        admit_optimization(user, params, strategy.configuration)
+        request_hash = optimization_request_hash(strategy.configuration, params)
+    elif kind == 'walk_forward':
+        admit_walk_forward(user, params, strategy.configuration)
+        request_hash = optimization_request_hash(strategy.configuration, params)
+    else:
+        admit_backtest(user, params, strategy.configuration)
+        request_hash = backtest_request_hash(strategy.configuration, params)
+    with transaction.atomic():
+        # Serialize submissions per user so two identical requests cannot both miss
+        UserProfile.objects.select_for_update().get(user=user)
+        existing = (
+            BacktestJob.objects.filter(user=user, request_hash=request_hash, status__in=['queued', 'running'])
+            .order_by('created_at')
+            .first()
+        )
+        if existing is not None:
+            logger.info("Coalesced backtest request for %s into job %s", user.username, existing.id)
+            return existing, False
+
+        job = BacktestJob.objects.create(
+            user=user,
+            kind=kind,
+            tier=user.profile.tier,
+            strategy_name=strategy.name,
+            configuration=strategy.configuration,
+            parameters=params,
+            request_hash=request_hash,
+        )
+    logger.info("Queued backtest job %s for %s", job.id, user.username)
+    return job, True
+
+
+def claim_job(job, worker_id):
+    """
+    Atomically move a queued job to 'running' for this worker. Returns the claimed
+    job, or None if another worker got it first or its user is at their
+    concurrency limit.
+
+    On Postgres, SKIP LOCKED lets concurrent workers on different nodes pass over
+    rows another node is claiming without blocking, and locking the user's profile
+    serializes claims for the same user so their concurrency limit holds across
+    nodes. Backends without row locks (the SQLite fallback) ignore
+    select_for_update, so the status-conditional UPDATE is what guarantees a job
+    is only ever claimed once.
+    """
+    with transaction.atomic():
+        locked = (
+            BacktestJob.objects.select_for_update(skip_locked=True)
+            .filter(id=job.id, status='queued')
+            .first()
+        )
+        if locked is None:
+            return None
+
+        profile = UserProfile.objects.select_for_update().get(user_id=locked.user_id)
+        running = BacktestJob.objects.filter(user_id=locked.user_id, status='running').count()
+        if running >= profile.get_backtest_concurrency_limit():
+            return None
+
+        now = timezone.now()
+        claimed = BacktestJob.objects.filter(id=locked.id, status='queued').update(
+            status='running',
+            worker_id=worker_id,
+            started_at=now,
+            heartbeat_at=now,
+            attempts=locked.attempts + 1,
+        )
+        if not claimed:
+            return None
+
+    locked.refresh_from_db()
+    return locked
+
+
+def claim_next_job(worker_id, scheduler):
+    """Claim the first job the scheduler offers that this worker can take (None if there is none)."""
+    for candidate in scheduler.candidates():
+        job = claim_job(candidate, worker_id)
+        if job is not None:
+            scheduler.charge(job.tier)
+            return job
+    return None
+
+
+def heartbeat(worker_id, job_ids):
+    """Mark this worker's in-flight jobs as alive."""
+    if not job_ids:
+        return 0
+    return BacktestJob.objects.filter(id__in=job_ids, worker_id=worker_id, status='running').update(
+        heartbeat_at=timezone.now()
+    )
+
+
+def requeue_stale_jobs(stale_after=STALE_AFTER):
+    """
+    Recover jobs whose worker stopped heartbeating: retry them, or fail them once
+    they have used up MAX_JOB_ATTEMPTS. Returns (requeued, failed) counts.
+    """
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    stale = BacktestJob.objects.filter(status='running', heartbeat_at__lt=cutoff)
+
+    requeued = stale.filter(attempts__lt=MAX_JOB_ATTEMPTS).update(
+        status='queued', worker_id='', started_at=None, heartbeat_at=None
+    )
+    failed = stale.filter(attempts__gte=MAX_JOB_ATTEMPTS).update(
+        status='failed',
+        error="Backtest worker stopped responding. Please try again.",
+        error_status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        finished_at=timezone.now(),
+    )
+    if requeued or failed:
+        logger.warning("Recovered stale backtest jobs: %s requeued, %s failed", requeued, failed)
+    return requeued, failed
+
+
+class JobReassigned(Exception):
+    """The job was requeued (presumed stale) while this worker was still running it."""
+
+
+def owned_job(job_id, worker_id, attempt):
+    """The job's row, as long as it is still running under this worker's claim (its attempt number)."""
+    rows = BacktestJob.objects.filter(id=job_id, status='running', attempts=attempt)
+    if worker_id is not None:
+        rows = rows.filter(worker_id=worker_id)
+    return rows
+
+
+def claim_holder(job_id, worker_id, attempt):
+    """
+    A context manager factory for saving a job's result: it raises JobReassigned
+    unless this worker still owns the job, and otherwise holds the job's row
+    for the rest of the transaction, so the job cannot be requeued while its
+    result is saved.
+    """
+    @contextlib.contextmanager
+    def hold_claim():
+        with transaction.atomic():
+            # Refreshing the heartbeat locks the row and keeps requeue_stale_jobs off it until the result is recorded
+            if not owned_job(job_id, worker_id, attempt).update(heartbeat_at=timezone.now()):
+                raise JobReassigned(f"Backtest job {job_id} was reassigned before its result was saved")
+            yield
+    return hold_claim
+
+
+def execute_job(job_id, worker_id=None):
+    """
+    Run a claimed job to completion and record the outcome on its row.
+
+    Results are only saved, and the backtest only counted against the daily
+    limit, while this worker still owns the job (see claim_holder); if the
+    job was requeued in the meantime the late result is dropped and the rerun
+    counts instead.
+    """
+    job = BacktestJob.objects.select_related('user', 'user__profile').get(id=job_id)
+    hold_claim = claim_holder(job_id, worker_id, job.attempts)
+    outcome = {'backtest': None, 'report': None, 'error': '', 'error_status': None}
+    try:
+        if job.kind == 'batch':
+            execute_batch(job, hold_claim)
+        elif job.kind in ('optimization', 'walk_forward'):
+            execute = execute_optimization if job.kind == 'optimization' else execute_walk_forward
+            outcome['report'], outcome['backtest'] = execute(
+                job.user, job.strategy_name, job.configuration, job.parameters, hold_claim
+            )
+        else:
+            results, backtest = execute_backtest(
+                job.user, job.strategy_name, job.configuration, job.parameters, hold_claim
+            )
+            outcome['backtest'] = backtest
+        outcome['status'] = 'completed'
+    except JobReassigned as e:
+        logger.warning("%s; dropping this result", e)
+        return None
+    except BacktestError as e:
+        outcome['status'] = 'failed'
+        outcome['error'] = e.message
+        outcome['error_status'] = e.status_code
+    except Exception as e:
+        outcome['status'] = 'failed'
+        outcome['error'] = f"Unexpected error: {str(e)}"
+        outcome['error_status'] = status.HTTP_500_INTERNAL_SERVER_ERROR
+
+    if not owned_job(job_id, worker_id, job.attempts).update(finished_at=timezone.now(), **outcome):
+        logger.warning("Backtest job %s was reassigned before it finished; dropping this result", job_id)
+        return None
+
+    logger.info("Backtest job %s finished with status %s", job_id, outcome['status'])
+    return outcome['status']
+
+
+def execute_batch(job, hold_claim=None):
+    """
+    Backtest a batch job's strategy on each of its datasets in turn, and store
+    each outcome as a BatchBacktestResult (inside `hold_claim()` if given; see
+    claim_holder) with its series compressed as they are in a BacktestArtifact.
+    The batch counts as one backtest, reserved against the daily limit before
+    it starts (see reserved_backtest). Raises BacktestError if the limit is
+    reached or every dataset failed.
+    """
+    with reserved_backtest(job.user):
+        params = job.parameters
+        rows = []
+        for ticker, timeframe in params['datasets']:
+            outcome = backtest_dataset(job.configuration, params, ticker, timeframe)
+            row = BatchBacktestResult(job=job, ticker=ticker, timeframe=timeframe, error=outcome.get('error', ''))
+            if 'results' in outcome:
+                row.results, heavy = split_results(outcome['results'])
+                row.encoding, row.payload = encode_artifact(heavy)
+                row.summary = outcome['summary']
+            rows.append(row)
+
+        with hold_claim() if hold_claim else transaction.atomic():
+            job.batch_results.all().delete()  # Left over from an earlier attempt
+            BatchBacktestResult.objects.bulk_create(rows)
+
+        if all(row.error for row in rows):
+            raise BacktestError(f"The strategy failed on every dataset: {rows[0].error}")
+
+    UserProfile.objects.filter(user=job.user).update(total_backtests=F('total_backtests') + 1)
+
+
+def _log_job_outcome(job_id):
+    def callback(future):
+        if future.exception() is not None:
+            logger.error("Worker crashed while running backtest job %s: %s", job_id, future.exception())
+    return callback
+
+
+def run_worker_pool(processes=2, poll_interval=1.0, drain=False, worker_id=None,
+                    heartbeat_interval=HEARTBEAT_INTERVAL, stale_after=STALE_AFTER):
+    """
+    Claim queued jobs and execute them on `processes` worker processes.
+
+    Runs until interrupted; with `drain=True` it returns once the queue is
+    empty and every dispatched job has finished. Returns the number of jobs
+    dispatched.
+    """
+    worker_id = worker_id or default_worker_id()
+    scheduler = TierScheduler()
+    context = multiprocessing.get_context('spawn')
+    in_flight = {}
+    dispatched = 0
+    last_heartbeat = 0.0
+
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context, initializer=init_worker_process) as pool:
+        while True:
+            in_flight = {future: job_id for future, job_id in in_flight.items() if not future.done()}
+
+            if time.monotonic() - last_heartbeat >= heartbeat_interval:
+                heartbeat(worker_id, list(in_flight.values()))
+                requeue_stale_jobs(stale_after)
+                last_heartbeat = time.monotonic()
+
+            job = claim_next_job(worker_id, scheduler) if len(in_flight) < processes else None
+            if job is None:
+                if drain and not in_flight:
+                    return dispatched
+                time.sleep(poll_interval)
+                continue
+
+            future = pool.submit(run_job_in_worker, job.id, worker_id)
+            future.add_done_callback(_log_job_outcome(job.id))
+            in_flight[future] = job.id
+            dispatched += 1
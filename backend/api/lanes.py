@@ -0,0 +1,575 @@
+# backend/api/lanes.py
+"""
+Lane simulation: several portfolios advanced through the same bars together.
+
+PortfolioSimulator trades one portfolio per pass over the data. LaneSimulator
+keeps the portfolio state (cash, shares, entry price, ...) as arrays with one
+element per lane and updates every lane with numpy operations, so N
+backtests on the same data cost one pass instead of N.
+
+A lane is a whole strategy: its own column of the (n_bars x N) signal
+matrix, its own exit and sizing rules, cash and leverage. Lanes whose rules
+have the same shape (say, fixed_percentage stop losses with different
+values) are checked together, with the values held in per-lane arrays. A
+leverage sweep is lanes that differ only in leverage; a grid search batch is
+lanes that differ in their parameters.
+
+Each lane reproduces PortfolioSimulator exactly; the 'lanes' engine is
+registered with the equivalence harness to check that.
+"""
+import numpy as np
+import pandas as pd
+
+from .backtester import (
+    DEFAULT_ENTRY_CONDITION, DEFAULT_EXIT_CONDITION, check_backtest_inputs, simulation_config,
+    volatility_sizing_factor, format_simulation_results, format_dates, backtest_failure, simulation_failure,
+)
+from .monte_carlo import run_monte_carlo, trade_returns
+from .pipeline import prepare_signals
+
+DEFAULT_SWEEP_LEVERAGES = [1.0, 2.0, 5.0, 10.0]
+MAX_SWEEP_LEVERAGES = 10
+
+# Take profit indicators (mirrors should_exit_position_enhanced)
+TAKE_PROFIT_INDICATOR_COLUMNS = {
+    'RSI': 'rsi',
+    'MACD': 'macd_line',
+    'SMA': 'sma_20',
+    'EMA': 'ema_20',
+    'Bollinger_Bands': 'bb_middle',
+    'Stochastic': 'stoch_k',
+    'Williams_R': 'williams_r',
+    'ATR': 'atr',
+    'Volume': 'Volume',
+    'Close': 'Close'
+}
+
+
+def _column(df, column):
+    """
+    A column as an array. `df` may also be a list with one aligned frame per
+    lane, giving an (n_bars x n_lanes) array, or None if any frame lacks it.
+    """
+    if isinstance(df, (list, tuple)):
+        if not all(column in frame.columns for frame in df):
+            return None
+        return np.column_stack([frame[column].to_numpy(dtype=float) for frame in df])
+    return df[column].to_numpy(dtype=float) if column in df.columns else None
+
+
+def _lane_values(column, index, lanes):
+    """A column's value at bar `index`: one number for all lanes, or one per lane of `lanes`."""
+    value = column[index]
+    return value[lanes] if np.ndim(value) else value
+
+
+def _indicator_target(take_profit):
+    try:
+        return float(take_profit.get('indicatorValue', '70'))
+    except (ValueError, TypeError):
+        return None
+
+
+def _group_lanes(conditions, shape):
+    """Group lane indices by the shape of their condition. Returns {shape: {lane: condition}}."""
+    groups = {}
+    for lane, condition in enumerate(conditions):
+        groups.setdefault(shape(condition), {})[lane] = condition
+    return groups
+
+
+def exit_rule_shape(exit_condition: dict) -> tuple:
+    """What an exit condition checks, without its thresholds."""
+    stop_loss = exit_condition.get('stopLoss') if 'stopLoss' in exit_condition else None
+    take_profit = exit_condition.get('takeProfit') if 'takeProfit' in exit_condition else None
+
+    stop_loss_shape = None
+    if stop_loss is not None:
+        kind = stop_loss.get('type', 'fixed_percentage')
+        stop_loss_shape = (kind, stop_loss.get('atrPeriod', 14) if kind == 'atr_based' else None)
+
+    take_profit_shape = None
+    if take_profit is not None:
+        kind = take_profit.get('type', 'fixed_percentage')
+        detail = None
+        if kind == 'risk_reward_ratio':
+            # Only a fixed_percentage stop loss defines the risk
+            detail = stop_loss is not None and stop_loss.get('type') == 'fixed_percentage'
+        elif kind == 'indicator_based':
+            detail = (take_profit.get('indicator', 'RSI'), _indicator_target(take_profit) is not None)
+        take_profit_shape = (kind, detail)
+
+    return stop_loss_shape, take_profit_shape
+
+
+class ExitRule:
+    """should_exit_position_enhanced for the open positions of lanes whose exit conditions share a shape."""
+
+    def __init__(self, exit_conditions: dict, df: pd.DataFrame, n_lanes: int):
+        """`exit_conditions` maps each lane in the group to its exit condition."""
+        self.stop_loss_shape, self.take_profit_shape = exit_rule_shape(next(iter(exit_conditions.values())))
+        self.stop_loss_value = np.zeros(n_lanes)
+        self.support_level = np.zeros(n_lanes)
+        self.take_profit_value = np.zeros(n_lanes)
+        self.risk_reward_ratio = np.zeros(n_lanes)
+        self.risk_pct = np.zeros(n_lanes)
+        self.indicator_target = np.zeros(n_lanes)
+        self.reasons = {}  # lane -> (long stop reason, short stop reason, take profit reason)
+
+        self.atr = None
+        if self.stop_loss_shape is not None and self.stop_loss_shape[0] == 'atr_based':
+            self.atr = _column(df, f"atr_{self.stop_loss_shape[1]}")
+        self.indicator_column = None
+        if self.take_profit_shape is not None and self.take_profit_shape[0] == 'indicator_based':
+            indicator, target_valid = self.take_profit_shape[1]
+            if target_valid:
+                self.indicator_column = _column(df, TAKE_PROFIT_INDICATOR_COLUMNS.get(indicator, 'Close'))
+
+        for lane, exit_condition in exit_conditions.items():
+            self.reasons[lane] = self._add_lane(lane, exit_condition)
+
+    def _add_lane(self, lane, exit_condition):
+        stop_reasons = ('', '')
+        if self.stop_loss_shape is not None:
+            stop_loss = exit_condition['stopLoss']
+            kind = self.stop_loss_shape[0]
+            value = stop_loss.get('value', 5)
+            level = stop_loss.get('supportResistanceLevel', 0)
+            if kind == 'support_resistance':
+                self.support_level[lane] = level
+                stop_reasons = (f"Support Level: ${level}", f"Resistance Level: ${level}")
+            elif kind in ('fixed_percentage', 'fixed_dollar', 'trailing_percentage', 'atr_based'):
+                self.stop_loss_value[lane] = value
+                reason = {
+                    'fixed_percentage': f"Stop Loss: {value}%",
+                    'fixed_dollar': f"Stop Loss: ${value}",
+                    'trailing_percentage': f"Trailing Stop: {value}%",
+                    'atr_based': f"ATR Stop: {value}x ATR",
+                }[kind]
+                stop_reasons = (reason, reason)
+
+        take_profit_reason = ''
+        if self.take_profit_shape is not None:
+            take_profit = exit_condition['takeProfit']
+            kind = self.take_profit_shape[0]
+            value = take_profit.get('value', 10)
+            if kind == 'fixed_percentage':
+                self.take_profit_value[lane] = value
+                take_profit_reason = f"Take Profit: {value}%"
+            elif kind == 'fixed_dollar':
+                self.take_profit_value[lane] = value
+                take_profit_reason = f"Take Profit: ${value}"
+            elif kind == 'risk_reward_ratio':
+                ratio = take_profit.get('riskRewardRatio', 2)
+                if self.take_profit_shape[1]:
+                    self.risk_reward_ratio[lane] = ratio
+                    self.risk_pct[lane] = exit_condition['stopLoss'].get('value', 5)
+                take_profit_reason = f"Risk:Reward {ratio}:1"
+            elif kind == 'indicator_based':
+                if self.indicator_column is not None:
+                    self.indicator_target[lane] = _indicator_target(take_profit)
+                take_profit_reason = f"{take_profit.get('indicator', 'RSI')} > {take_profit.get('indicatorValue', '70')}"
+
+        return stop_reasons + (take_profit_reason,)
+
+    def check(self, index: int, price, lanes: np.ndarray, entry_price: np.ndarray, is_long: np.ndarray):
+        """
+        Return (stop_hit, take_profit_hit) masks for the positions of `lanes`,
+        entered at `entry_price`. `price` is one price or one per lane of `lanes`.
+        """
+        stop_hit = np.zeros(len(lanes), dtype=bool)
+        take_profit_hit = np.zeros(len(lanes), dtype=bool)
+
+        if self.stop_loss_shape is not None:
+            kind = self.stop_loss_shape[0]
+            value = self.stop_loss_value[lanes]
+            if kind == 'fixed_percentage':
+                loss_pct = np.where(is_long, ((entry_price - price) / entry_price) * 100, ((price - entry_price) / entry_price) * 100)
+                stop_hit = loss_pct >= value
+            elif kind == 'fixed_dollar':
+                stop_hit = np.where(is_long, entry_price - price, price - entry_price) >= value
+            elif kind == 'trailing_percentage':
+                # The reference tracks the extreme price from entry only
+                highest = np.where(price > entry_price, price, entry_price)
+                lowest = np.where(price < entry_price, price, entry_price)
+                drop_pct = ((highest - price) / highest) * 100
+                rise_pct = ((price - lowest) / lowest) * 100
+                stop_hit = np.where(is_long, drop_pct, rise_pct) >= value
+            elif kind == 'atr_based':
+                if self.atr is not None:
+                    atr_value = _lane_values(self.atr, index, lanes)
+                    stop_hit = np.where(
+                        is_long, price <= entry_price - (atr_value * value), price >= entry_price + (atr_value * value)
+                    ) & ~np.isnan(atr_value)
+            elif kind == 'support_resistance':
+                level = self.support_level[lanes]
+                stop_hit = np.where(is_long, price <= level, price >= level)
+
+        if self.take_profit_shape is not None:
+            kind = self.take_profit_shape[0]
+            value = self.take_profit_value[lanes]
+            if kind == 'fixed_percentage':
+                profit_pct = np.where(is_long, ((price - entry_price) / entry_price) * 100, ((entry_price - price) / entry_price) * 100)
+                take_profit_hit = profit_pct >= value
+            elif kind == 'fixed_dollar':
+                take_profit_hit = np.where(is_long, price - entry_price, entry_price - price) >= value
+            elif kind == 'risk_reward_ratio':
+                if self.take_profit_shape[1]:
+                    target_profit = (entry_price * (self.risk_pct[lanes] / 100)) * self.risk_reward_ratio[lanes]
+                    take_profit_hit = np.where(is_long, price >= entry_price + target_profit, price <= entry_price - target_profit)
+            elif kind == 'indicator_based':
+                if self.indicator_column is not None:
+                    indicator_value = _lane_values(self.indicator_column, index, lanes)
+                    take_profit_hit = (indicator_value > self.indicator_target[lanes]) & ~np.isnan(indicator_value)
+
+        return stop_hit, take_profit_hit
+
+    def reason(self, lane: int, is_long: bool, take_profit_hit: bool) -> str:
+        """Exit reason reported for a lane's position; a take profit overrides the stop loss."""
+        long_stop, short_stop, take_profit = self.reasons[lane]
+        if take_profit_hit:
+            return take_profit
+        return long_stop if is_long else short_stop
+
+
+def position_sizing_shape(entry_condition: dict) -> tuple:
+    """How an entry condition sizes positions, without its amounts."""
+    sizing_type = entry_condition.get('positionSizing', 'fixed_percentage')
+    # The reference only looks up the volatility ATR when positionSizing is set explicitly
+    volatility_period = None
+    if entry_condition.get('positionSizing') == 'volatility_based':
+        volatility_period = entry_condition.get('volatilityPeriod', 20)
+    return sizing_type, volatility_period
+
+
+class PositionSizer:
+    """calculate_position_size for lanes whose entry conditions share a sizing shape."""
+
+    def __init__(self, entry_conditions: dict, df: pd.DataFrame, n_lanes: int):
+        """`entry_conditions` maps each lane in the group to its entry condition."""
+        self.sizing_type, volatility_period = position_sizing_shape(next(iter(entry_conditions.values())))
+        self.sizing_value = np.zeros(n_lanes)
+        self.atr = _column(df, f"atr_{volatility_period}") if volatility_period is not None else None
+
+        for lane, entry_condition in entry_conditions.items():
+            if self.sizing_type == 'risk_based':
+                self.sizing_value[lane] = entry_condition.get('riskPerTrade', 1)
+            else:
+                self.sizing_value[lane] = entry_condition.get('sizingValue', 2)
+
+    def sizes(self, index: int, current_price, lanes: np.ndarray, cash) -> np.ndarray:
+        """Base position value for each of `lanes`, given its cash and price (one for all lanes or one per lane)."""
+        value = self.sizing_value[lanes]
+        if self.sizing_type in ('fixed_percentage', 'risk_based'):
+            return cash * (value / 100)
+        elif self.sizing_type == 'fixed_dollar':
+            return value.copy()
+        elif self.sizing_type == 'kelly_criterion':
+            return cash * 0.25
+        elif self.sizing_type == 'volatility_based':
+            atr_value = _lane_values(self.atr, index, lanes) if self.atr is not None else None
+            if np.ndim(current_price) == 0 and np.ndim(atr_value) == 0:
+                return cash * (value / 100) * volatility_sizing_factor(current_price, atr_value)
+            prices = np.broadcast_to(current_price, (len(lanes),))
+            atr_values = [None] * len(lanes) if atr_value is None else np.broadcast_to(atr_value, (len(lanes),))
+            factors = np.array([volatility_sizing_factor(price, atr) for price, atr in zip(prices, atr_values)])
+            return cash * (value / 100) * factors
+        return cash * 0.02
+
+
+class LaneSimulator:
+    """Simulates N strategy lanes over the same bars in a single pass."""
+
+    def __init__(self, df: pd.DataFrame, signals, initial_cash, leverages,
+                 exit_conditions=None, entry_conditions=None):
+        """
+        `signals` is one signal Series shared by every lane or a list with one
+        per lane; `leverages` has one value per lane and `initial_cash` is one
+        number or one per lane. `exit_conditions` and `entry_conditions` are one
+        condition shared by every lane or a list with one per lane.
+        """
+        self.df = df
+        self.n_lanes = len(leverages)
+        self.initial_cash = np.broadcast_to(np.asarray(initial_cash, dtype=float), (self.n_lanes,)).copy()
+        # Clamp leverage between 1x and 10x, keeping the values for display as given
+        self.leverages = [max(1.0, min(10.0, leverage)) for leverage in leverages]
+        self.exit_conditions = self._per_lane(exit_conditions, DEFAULT_EXIT_CONDITION)
+        self.entry_conditions = self._per_lane(entry_conditions, DEFAULT_ENTRY_CONDITION)
+
+        if isinstance(signals, pd.Series):
+            signals = [signals] * self.n_lanes
+        signal_values = np.column_stack([lane_signals.to_numpy() for lane_signals in signals])
+        self.entry_signal = (signal_values == 'LONG') | (signal_values == 'SHORT')
+        self.long_signal = signal_values == 'LONG'
+
+        self.trades = [[] for _ in range(self.n_lanes)]
+        self.margin_calls = np.zeros(self.n_lanes, dtype=int)
+        self.equity_curves = None
+        self.final_equity = {}  # lane -> equity after closing a position left open at the end
+
+    def _per_lane(self, conditions, default):
+        if conditions is None or isinstance(conditions, dict):
+            return [conditions if conditions is not None else default] * self.n_lanes
+        return [condition if condition is not None else default for condition in conditions]
+
+    def run(self):
+        """Run every lane and return a list of results, one per lane, formatted like run_backtest."""
+        try:
+            self.simulate()
+        except Exception as e:
+            return [simulation_failure(e) for _ in range(self.n_lanes)]
+        dates = format_dates(self.df.index)
+        return [self.lane_results(lane, dates) for lane in range(self.n_lanes)]
+
+    def lane_results(self, lane: int, dates: list = None) -> dict:
+        return format_simulation_results(
+            self.df.index, self.equity_curve(lane), self.trades[lane], self.initial_cash[lane], self.leverages[lane],
+            dates=dates
+        )
+
+    def equity_curve(self, lane: int) -> list:
+        curve = self.equity_curves[lane].tolist()
+        if lane in self.final_equity:
+            curve.append(self.final_equity[lane])
+        return curve
+
+    def _record(self, lanes, date, trade_types, price, portfolio, pnl=None, pnl_pct=None, position_size=None, exit_reasons=None):
+        for n, lane in enumerate(lanes):
+            self.trades[lane].append({
+                'date': date,
+                'type': trade_types[n],
+                'price': price,
+                'portfolio': float(portfolio[n]),
+                'pnl': None if pnl is None else float(pnl[n]),
+                'pnl_pct': None if pnl_pct is None else float(pnl_pct[n]),
+                'position_size': None if position_size is None else float(position_size[n]),
+                'exit_reason': exit_reasons[n] if exit_reasons is not None else ''
+            })
+
+    def _rules(self, conditions, shape, rule_class):
+        """One rule per condition shape, with the mask of the lanes it covers."""
+        rules = []
+        for members in _group_lanes(conditions, shape).values():
+            mask = np.zeros(self.n_lanes, dtype=bool)
+            mask[list(members)] = True
+            rules.append((mask, rule_class(members, self.df, self.n_lanes)))
+        return rules
+
+    def simulate(self):
+        """Advance every lane through the bars, filling equity_curves and trades."""
+        n = self.n_lanes
+        close = self.df['Close'].to_numpy(dtype=float)
+        dates = self.df.index
+        leverage = np.asarray(self.leverages, dtype=float)
+        exit_rules = self._rules(self.exit_conditions, exit_rule_shape, ExitRule)
+        sizers = self._rules(self.entry_conditions, position_sizing_shape, PositionSizer)
+
+        cash = self.initial_cash.copy()
+        original_cash = self.initial_cash.copy()
+        shares = np.zeros(n)
+        base_value = np.zeros(n)
+        entry_price = np.zeros(n)
+        in_position = np.zeros(n, dtype=bool)
+        is_long = np.zeros(n, dtype=bool)
+        curves = np.empty((n, len(close)))
+
+        def close_positions(lanes, price):
+            """Close the given lanes at `price`; returns the P&L of each."""
+            lane_long = is_long[lanes]
+            pnl = np.where(lane_long, (price - entry_price[lanes]) * shares[lanes], (entry_price[lanes] - price) * shares[lanes])
+            cash[lanes] = np.where(lane_long, cash[lanes] + (base_value[lanes] + pnl), cash[lanes] - shares[lanes] * price)
+            original_cash[lanes] = np.where(lane_long, cash[lanes], original_cash[lanes] + pnl)
+            shares[lanes] = 0.0
+            base_value[lanes] = 0.0
+            in_position[lanes] = False
+            return pnl
+
+        def price_change_pct(lanes, price):
+            return np.where(
+                is_long[lanes],
+                ((price - entry_price[lanes]) / entry_price[lanes]) * 100,
+                ((entry_price[lanes] - price) / entry_price[lanes]) * 100,
+            )
+
+        def trade_types(lanes, prefix=''):
+            return [f"{prefix}LONG" if long else f"{prefix}SHORT" for long in is_long[lanes]]
+
+        for i in range(len(close)):
+            price = close[i]
+
+            if np.isnan(price) or price <= 0:
+                unrealized = np.where(is_long, (price - entry_price) * shares, (entry_price - price) * shares)
+                curves[:, i] = np.where(
+                    in_position,
+                    np.where(is_long, cash + base_value + unrealized, cash + unrealized),
+                    cash
+                )
+                continue
+
+            open_before = in_position & (shares != 0)
+
+            signalled = self.entry_signal[i]
+            if signalled.any():
+                entering_mask = signalled & ~in_position & (cash > 0)
+                if entering_mask.any():
+                    base = np.zeros(n)
+                    for group_mask, sizer in sizers:
+                        members = np.flatnonzero(entering_mask & group_mask)
+                        if len(members):
+                            base[members] = sizer.sizes(i, price, members, cash[members])
+
+                    entering = np.flatnonzero(entering_mask)
+                    lane_cash = cash[entering]
+                    base = base[entering]
+                    base = np.where(base > lane_cash, lane_cash * 0.95, base)
+                    leveraged = base * leverage[entering]
+                    long_entry = self.long_signal[i, entering]
+
+                    cash[entering] = np.where(long_entry, lane_cash - base, lane_cash + leveraged)
+                    shares[entering] = leveraged / price
+                    base_value[entering] = base
+                    entry_price[entering] = price
+                    in_position[entering] = True
+                    is_long[entering] = long_entry
+
+                    display = np.where(long_entry, cash[entering] + base, original_cash[entering])
+                    self._record(entering, dates[i], trade_types(entering), price, display, position_size=leveraged)
+
+            if open_before.any():
+                exiting = []
+                reasons = []
+                for group_mask, rule in exit_rules:
+                    checking = np.flatnonzero(open_before & group_mask)
+                    if not len(checking):
+                        continue
+                    stop_hit, take_profit_hit = rule.check(i, price, checking, entry_price[checking], is_long[checking])
+                    hit = stop_hit | take_profit_hit
+                    for lane, take_profit in zip(checking[hit], take_profit_hit[hit]):
+                        exiting.append(lane)
+                        reasons.append(rule.reason(lane, bool(is_long[lane]), bool(take_profit)))
+
+                if exiting:
+                    exiting = np.asarray(exiting)
+                    pct = price_change_pct(exiting, price)
+                    types = trade_types(exiting, 'EXIT ')
+                    pnl = close_positions(exiting, price)
+                    # Short exits report the portfolio plus the trade's P&L, as the reference does
+                    display = np.where(is_long[exiting], cash[exiting], original_cash[exiting] + pnl)
+                    self._record(exiting, dates[i], types, price, display, pnl, pct, exit_reasons=reasons)
+
+            if in_position.any():
+                unrealized = np.where(is_long, (price - entry_price) * shares, (entry_price - price) * shares)
+                equity = np.where(
+                    in_position,
+                    np.where(is_long, cash + base_value + unrealized, original_cash + unrealized),
+                    cash
+                )
+            else:
+                equity = cash.copy()
+
+            # Margin call: force out of any lane whose equity is gone
+            wiped = equity <= 0
+            if wiped.any():
+                called = np.flatnonzero(wiped & in_position & (shares != 0))
+                if len(called):
+                    types = trade_types(called, 'MARGIN CALL ')
+                    pnl = close_positions(called, price)
+                    self.margin_calls[called] += 1
+                    self._record(called, dates[i], types, price, cash[called], pnl,
+                                 exit_reasons=['Margin Call'] * len(called))
+                equity = np.where(wiped, np.maximum(0, cash), equity)
+
+            curves[:, i] = equity
+
+        # Close any remaining open positions when data runs out
+        still_open = np.flatnonzero(in_position & (shares != 0))
+        if len(still_open):
+            final_price = close[-1]
+            pct = price_change_pct(still_open, final_price)
+            types = trade_types(still_open, 'EXIT ')
+            long_exit = is_long[still_open].copy()
+            # Unlike other exits, the reference reports this one before updating original_cash
+            pnl = np.where(
+                long_exit,
+                (final_price - entry_price[still_open]) * shares[still_open],
+                (entry_price[still_open] - final_price) * shares[still_open]
+            )
+            short_display = original_cash[still_open] + pnl
+            close_positions(still_open, final_price)
+            display = np.where(long_exit, cash[still_open], short_display)
+            self._record(still_open, dates[-1], types, final_price, display, pnl, pct,
+                         exit_reasons=['Data Finished'] * len(still_open))
+            for lane in still_open:
+                self.final_equity[int(lane)] = float(cash[lane])
+
+        self.equity_curves = curves
+
+
+def run_lane_backtest(data_df, strategy_config, initial_cash, leverage=1.0):
+    """A single-lane LaneSimulator with the run_backtest signature (for the equivalence harness)."""
+    check_backtest_inputs(data_df, strategy_config, initial_cash)
+    try:
+        df_with_indicators, signals, _ = prepare_signals(data_df, strategy_config)
+        conditions = simulation_config(strategy_config)
+        simulator = LaneSimulator(df_with_indicators, signals, initial_cash, [leverage],
+                                  conditions['exitCondition'], conditions['entryCondition'])
+        return simulator.run()[0]
+    except Exception as e:
+        return backtest_failure(f'Backtest failed: {str(e)}')
+
+
+def run_strategy_batch(df_with_indicators, signals, strategy_configs, initial_cash, leverage=1.0):
+    """
+    Backtest several strategies on one indicator frame in a single pass.
+
+    `signals` holds the generate_signals output of each configuration. Returns
+    one run_backtest-style result per configuration, in order. A failure in
+    any lane fails every lane, so callers wanting per-strategy errors should
+    re-run the batch one strategy at a time.
+    """
+    conditions = [simulation_config(config) for config in strategy_configs]
+    simulator = LaneSimulator(
+        df_with_indicators, signals, initial_cash, [leverage] * len(strategy_configs),
+        [condition['exitCondition'] for condition in conditions],
+        [condition['entryCondition'] for condition in conditions]
+    )
+    return simulator.run()
+
+
+def run_leverage_sweep(data_df, strategy_config, initial_cash, leverages, data_key=None):
+    """
+    Backtest one strategy at several leverages in a single pass.
+
+    Returns {'dates', 'lanes', 'results'}: `lanes` holds the leverage, stats,
+    equity curve and margin call count of each lane, and `results` the full
+    run_backtest-style result of each lane (in the same order), with a
+    'monte_carlo' analysis as run_staged_backtest adds.
+    """
+    check_backtest_inputs(data_df, strategy_config, initial_cash)
+    try:
+        df_with_indicators, signals, _ = prepare_signals(data_df, strategy_config, data_key)
+        conditions = simulation_config(strategy_config)
+        simulator = LaneSimulator(df_with_indicators, signals, initial_cash, leverages,
+                                  conditions['exitCondition'], conditions['entryCondition'])
+        results = simulator.run()
+    except Exception as e:
+        return backtest_failure(f'Backtest failed: {str(e)}')
+
+    for lane, lane_results in enumerate(results):
+        if 'error' in lane_results:
+            return lane_results
+        lane_results['monte_carlo'] = run_monte_carlo(trade_returns(simulator.trades[lane]), initial_cash)
+
+    return {
+        'dates': results[0]['plot_data']['dates'],
+        'lanes': [
+            {
+                'leverage': simulator.leverages[lane],
+                'stats': lane_results['stats'],
+                'equity_curve': lane_results['plot_data']['equity_curve'],
+                'margin_calls': int(simulator.margin_calls[lane]),
+            }
+            for lane, lane_results in enumerate(results)
+        ],
+        'results': results,
+    }
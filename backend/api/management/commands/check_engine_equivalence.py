@@ -0,0 +1,61 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from api.equivalence import ENGINES, run_equivalence_suite
+
+class Command(BaseCommand):
+    help = 'Diff a candidate backtest engine against the reference engine on randomized strategies'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--candidate', default='reference', help=f"Engine under test ({', '.join(sorted(ENGINES))})")
+        parser.add_argument('--reference', default='reference', help='Engine treated as the golden result')
+        parser.add_argument('--configs', type=int, default=200, help='Number of randomized strategy configurations')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for reproducible corpora')
+        parser.add_argument('--min-bars', type=int, default=200, help='Minimum bars per dataset window')
+        parser.add_argument('--max-bars', type=int, default=2000, help='Maximum bars per dataset window')
+        parser.add_argument('--rtol', type=float, default=1e-7, help='Relative tolerance for numeric values')
+        parser.add_argument('--atol', type=float, default=0.011, help='Absolute tolerance for numeric values')
+        parser.add_argument('--report', help='Write the full JSON report to this path')
+
+    def handle(self, *args, **options):
+        def progress(done, total, failed):
+            if done % 25 == 0 or done == total:
+                self.stdout.write(f"{done}/{total} cases, {failed} failing")
+
+        try:
+            report = run_equivalence_suite(
+                candidate=options['candidate'],
+                reference=options['reference'],
+                n_configs=options['configs'],
+                seed=options['seed'],
+                min_bars=options['min_bars'],
+                max_bars=options['max_bars'],
+                rtol=options['rtol'],
+                atol=options['atol'],
+                progress=progress,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options['report']:
+            with open(options['report'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Report written to {options['report']}")
+
+        failures = report['failures']
+        for failure in failures[:10]:
+            self.stdout.write(
+                f"Case {failure['case']}: {failure['ticker']} {failure['timeframe']} "
+                f"{failure['start']} -> {failure['end']}, cash {failure['initial_cash']}, leverage {failure['leverage']}x"
+            )
+            for mismatch in failure['mismatches'][:5]:
+                self.stdout.write(f"    {mismatch}")
+
+        if failures:
+            raise CommandError(
+                f"{len(failures)} of {report['cases']} cases differ between "
+                f"'{report['reference']}' and '{report['candidate']}'"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"All {report['cases']} cases match between '{report['reference']}' and '{report['candidate']}'"))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from api.jobs import run_worker_pool, default_worker_id, HEARTBEAT_INTERVAL, STALE_AFTER
+
+class Command(BaseCommand):
+    help = (
+        'Claim queued backtest jobs and execute them on a pool of local worker processes. '
+        'Run one instance per node against the same Postgres to scale out; set DATABASE_URL '
+        '(a throwaway Postgres, or sqlite:///db.sqlite3 for a single node) to try it locally.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2, help='Number of worker processes')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--drain', action='store_true', help='Exit once the queue is empty')
+        parser.add_argument('--worker-id', default=None, help='Name this node reports on claimed jobs (default host:pid)')
+        parser.add_argument('--heartbeat-interval', type=float, default=HEARTBEAT_INTERVAL, help='Seconds between heartbeats')
+        parser.add_argument('--stale-after', type=float, default=STALE_AFTER, help='Seconds without a heartbeat before a job is retried')
+
+    def handle(self, *args, **options):
+        worker_id = options['worker_id'] or default_worker_id()
+        self.stdout.write(f"Starting {options['processes']} backtest worker processes as {worker_id}")
+        try:
+            dispatched = run_worker_pool(
+                processes=options['processes'],
+                poll_interval=options['poll_interval'],
+                drain=options['drain'],
+                worker_id=worker_id,
+                heartbeat_interval=options['heartbeat_interval'],
+                stale_after=options['stale_after'],
+            )
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping backtest workers")
+            return
+
+        self.stdout.write(self.style.SUCCESS(f"Queue drained after {dispatched} jobs"))
@@ -0,0 +1,94 @@
+# backend/api/middleware.py
+"""
+Negotiated compression of API responses.
+
+Backtest results and chart data are large, repetitive JSON (the same keys and
+similar numbers over and over), which compresses to a fraction of its size.
+CompressionMiddleware compresses responses of at least MIN_COMPRESS_BYTES:
+
+- with brotli when the client accepts 'br' and the brotli package is
+  installed (smaller than gzip for JSON at a similar cost);
+- otherwise with gzip, through Django's GZipMiddleware.
+
+Streaming responses (NDJSON results, binary chart data) are gzipped chunk by
+chunk with a sync flush after each one. Django's own streaming gzip only
+emits what the compressor happens to have ready, so the first lines of a
+stream (the stats a client shows first) could wait behind the rest of it.
+
+Small responses are sent as they are, since compressing them saves fewer
+bytes than it costs.
+"""
+import re
+import zlib
+
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+MIN_COMPRESS_BYTES = 1024
+
+# Quality 5 of 11: most of brotli's gain on JSON, at about gzip's speed
+BROTLI_QUALITY = 5
+
+ACCEPTS_BROTLI = re.compile(r'\bbr\b')
+ACCEPTS_GZIP = re.compile(r'\bgzip\b')
+
+# zlib window bits asking for a gzip header and trailer
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def flushed_gzip_sequence(sequence):
+    """Gzip a sequence of byte chunks, flushing after each so every chunk can be decoded on arrival."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, GZIP_WBITS)
+    for chunk in sequence:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """Compress large responses with brotli or gzip, whichever the client accepts."""
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        if response.streaming and not response.is_async:
+            return self.compress_stream(request, response)
+        if not response.streaming and len(response.content) < MIN_COMPRESS_BYTES:
+            return response
+
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if brotli is None or response.streaming or not ACCEPTS_BROTLI.search(accept_encoding):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed = brotli.compress(response.content, quality=BROTLI_QUALITY)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = 'br'
+        # The compressed body differs byte for byte, so a strong ETag no longer holds (as in GZipMiddleware)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+    def compress_stream(self, request, response):
+        """Gzip a streaming response one flushed chunk at a time (see flushed_gzip_sequence)."""
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if not ACCEPTS_GZIP.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+            return response
+
+        response.streaming_content = flushed_gzip_sequence(response.streaming_content)
+        # The compressed size is only known once the stream has ended
+        del response.headers['Content-Length']
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = 'gzip'
+        return response
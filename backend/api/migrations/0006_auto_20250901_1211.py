@@ -29,6 +29,21 @@ def reverse_check_duplicate_emails(apps, schema_editor):
     pass
 
 
+def add_email_unique_constraint(apps, schema_editor):
+    """
+    Add the unique constraint on Postgres, with the same SQL this migration
+    originally ran. Other backends (the SQLite database the test suite and
+    local worker testing use) don't support ALTER TABLE ... ADD CONSTRAINT.
+    """
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("ALTER TABLE auth_user ADD CONSTRAINT auth_user_email_unique UNIQUE (email);")
+
+
+def drop_email_unique_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("ALTER TABLE auth_user DROP CONSTRAINT IF EXISTS auth_user_email_unique;")
+
+
 class Migration(migrations.Migration):
 
     dependencies = [
@@ -38,8 +53,5 @@ class Migration(migrations.Migration):
 
     operations = [
         migrations.RunPython(check_duplicate_emails, reverse_check_duplicate_emails),
-        migrations.RunSQL(
-            "ALTER TABLE auth_user ADD CONSTRAINT auth_user_email_unique UNIQUE (email);",
-            reverse_sql="ALTER TABLE auth_user DROP CONSTRAINT IF EXISTS auth_user_email_unique;"
-        ),
+        migrations.RunPython(add_email_unique_constraint, drop_email_unique_constraint),
     ]
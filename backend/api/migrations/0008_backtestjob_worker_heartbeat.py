@@ -0,0 +1,36 @@
+# Generated by Django 4.2.23 on 2026-10-19 08:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_backtestjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backtestjob',
+            name='attempts',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='backtestjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='backtestjob',
+            name='worker_id',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='backtestjob',
+            index=models.Index(fields=['status', 'created_at'], name='api_backtes_status_27660b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='backtestjob',
+            index=models.Index(fields=['status', 'heartbeat_at'], name='api_backtes_status_2ebf4b_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.23 on 2026-10-19 08:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_backtestjob_worker_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backtestjob',
+            name='tier',
+            field=models.CharField(choices=[('free', 'Free'), ('pro', 'Pro'), ('premium', 'Premium')], default='free', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='backtestjob',
+            index=models.Index(fields=['status', 'tier', 'created_at'], name='api_backtes_status_5f09ff_idx'),
+        ),
+    ]
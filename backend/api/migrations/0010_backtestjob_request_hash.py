@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-19 08:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_backtestjob_tier'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backtestjob',
+            name='request_hash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+    ]
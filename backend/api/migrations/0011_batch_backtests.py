@@ -0,0 +1,36 @@
+# Generated by Django 4.2.23 on 2026-10-19 08:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_backtestjob_request_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backtestjob',
+            name='kind',
+            field=models.CharField(choices=[('backtest', 'Backtest'), ('batch', 'Batch')], default='backtest', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='BatchBacktestResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticker', models.CharField(max_length=10)),
+                ('timeframe', models.CharField(max_length=10)),
+                ('summary', models.JSONField(blank=True, null=True)),
+                ('results', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='batch_results', to='api.backtestjob')),
+            ],
+            options={
+                'ordering': ['ticker', 'timeframe'],
+                'unique_together': {('job', 'ticker', 'timeframe')},
+            },
+        ),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 4.2.23 on 2026-10-19 08:46
+
+import json
+import zlib
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+HEAVY_RESULT_KEYS = ('plot_data', 'trades')
+
+
+def parse_stat(value):
+    try:
+        return float(str(value).replace(',', '').replace('$', ''))
+    except (TypeError, ValueError):
+        return None
+
+
+def max_drawdown_pct(equity_curve):
+    worst, peak = 0.0, None
+    for equity in equity_curve:
+        peak = equity if peak is None else max(peak, equity)
+        if peak > 0:
+            worst = min(worst, (equity - peak) / peak * 100)
+    return round(worst, 2) if equity_curve else None
+
+
+def split_backtest_results(apps, schema_editor):
+    """Fill the summary columns and move the equity curve and trades of existing backtests into artifacts."""
+    Backtest = apps.get_model('api', 'Backtest')
+    BacktestArtifact = apps.get_model('api', 'BacktestArtifact')
+
+    for backtest in Backtest.objects.all().iterator():
+        results = backtest.results or {}
+        stats = results.get('stats') or {}
+        heavy = {key: results[key] for key in HEAVY_RESULT_KEYS if key in results}
+        trade_count = stats.get('# Trades', 0)
+
+        backtest.return_pct = parse_stat(stats.get('Return [%]'))
+        backtest.final_equity = parse_stat(stats.get('Equity Final [$]'))
+        backtest.trade_count = trade_count if isinstance(trade_count, int) else 0
+        backtest.max_drawdown = max_drawdown_pct((results.get('plot_data') or {}).get('equity_curve', []))
+        backtest.results = {key: value for key, value in results.items() if key not in HEAVY_RESULT_KEYS}
+        backtest.save()
+
+        BacktestArtifact.objects.create(
+            backtest=backtest,
+            encoding='json+zlib',
+            payload=zlib.compress(json.dumps(heavy, separators=(',', ':')).encode('utf-8')),
+        )
+
+
+def merge_backtest_results(apps, schema_editor):
+    """Put the equity curve and trades back into Backtest.results (json+zlib artifacts only)."""
+    Backtest = apps.get_model('api', 'Backtest')
+    BacktestArtifact = apps.get_model('api', 'BacktestArtifact')
+
+    for artifact in BacktestArtifact.objects.filter(encoding='json+zlib').iterator():
+        backtest = Backtest.objects.get(pk=artifact.backtest_id)
+        backtest.results = {**backtest.results, **json.loads(zlib.decompress(bytes(artifact.payload)).decode('utf-8'))}
+        backtest.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_batch_backtests'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BacktestArtifact',
+            fields=[
+                ('backtest', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='artifact', serialize=False, to='api.backtest')),
+                ('encoding', models.CharField(max_length=20)),
+                ('payload', models.BinaryField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='backtest',
+            name='final_equity',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='backtest',
+            name='max_drawdown',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='backtest',
+            name='return_pct',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='backtest',
+            name='trade_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(split_backtest_results, merge_backtest_results),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.23 on 2026-10-19 08:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_backtest_artifacts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BacktestChartTile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.PositiveSmallIntegerField()),
+                ('start_minute', models.BigIntegerField()),
+                ('end_minute', models.BigIntegerField()),
+                ('series', models.CharField(max_length=50)),
+                ('payload', models.BinaryField()),
+                ('backtest', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chart_tiles', to='api.backtest')),
+            ],
+            options={
+                'ordering': ['level', 'start_minute'],
+                'unique_together': {('backtest', 'level', 'start_minute')},
+            },
+        ),
+    ]
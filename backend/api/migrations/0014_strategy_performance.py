@@ -0,0 +1,51 @@
+# Generated by Django 4.2.23 on 2026-10-19 08:58
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Max, Q, Sum
+
+
+def fill_strategy_performance(apps, schema_editor):
+    """Total up the backtests saved before the totals were kept."""
+    Backtest = apps.get_model('api', 'Backtest')
+    StrategyPerformance = apps.get_model('api', 'StrategyPerformance')
+
+    totals = Backtest.objects.values('user_id', 'strategy_name').annotate(
+        backtest_count=Count('id'),
+        return_count=Count('return_pct'),
+        win_count=Count('id', filter=Q(return_pct__gt=0)),
+        total_return=Sum('return_pct'),
+        best_return=Max('return_pct'),
+    )
+    StrategyPerformance.objects.bulk_create([
+        StrategyPerformance(**{**row, 'total_return': row['total_return'] or 0.0}) for row in totals
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0013_backtest_chart_tiles'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StrategyPerformance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('strategy_name', models.CharField(max_length=100)),
+                ('backtest_count', models.IntegerField(default=0)),
+                ('return_count', models.IntegerField(default=0)),
+                ('win_count', models.IntegerField(default=0)),
+                ('total_return', models.FloatField(default=0.0)),
+                ('best_return', models.FloatField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='strategy_performance', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'strategy_name')},
+            },
+        ),
+        migrations.RunPython(fill_strategy_performance, migrations.RunPython.noop),
+    ]
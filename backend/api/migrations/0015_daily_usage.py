@@ -0,0 +1,48 @@
+# Generated by Django 4.2.23 on 2026-10-19 09:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+
+def fill_todays_usage(apps, schema_editor):
+    """Count today's backtests and completed batch jobs, as the daily limit did before the counters."""
+    Backtest = apps.get_model('api', 'Backtest')
+    BacktestJob = apps.get_model('api', 'BacktestJob')
+    DailyUsage = apps.get_model('api', 'DailyUsage')
+
+    today = timezone.localdate()
+    counts = {}
+    for user_id in Backtest.objects.filter(created_at__date=today).values_list('user_id', flat=True):
+        counts[user_id] = counts.get(user_id, 0) + 1
+    batches = BacktestJob.objects.filter(kind='batch', status='completed', finished_at__date=today)
+    for user_id in batches.values_list('user_id', flat=True):
+        counts[user_id] = counts.get(user_id, 0) + 1
+    DailyUsage.objects.bulk_create([
+        DailyUsage(user_id=user_id, day=today, backtests=count) for user_id, count in counts.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0014_strategy_performance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('backtests', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_usage', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'day')},
+            },
+        ),
+        migrations.RunPython(fill_todays_usage, migrations.RunPython.noop),
+    ]
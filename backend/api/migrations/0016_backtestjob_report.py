@@ -0,0 +1,23 @@
+# Generated by Django 4.2.23 on 2026-10-19 09:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_daily_usage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backtestjob',
+            name='report',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='backtestjob',
+            name='kind',
+            field=models.CharField(choices=[('backtest', 'Backtest'), ('batch', 'Batch'), ('optimization', 'Optimization')], default='backtest', max_length=12),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-19 09:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_backtestjob_report'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='backtestjob',
+            name='kind',
+            field=models.CharField(choices=[('backtest', 'Backtest'), ('batch', 'Batch'), ('optimization', 'Optimization'), ('walk_forward', 'Walk-forward')], default='backtest', max_length=12),
+        ),
+    ]
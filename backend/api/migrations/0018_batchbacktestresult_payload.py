@@ -0,0 +1,23 @@
+# Generated by Django 4.2.23 on 2026-10-19 09:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_backtestjob_walk_forward'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='batchbacktestresult',
+            name='encoding',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='batchbacktestresult',
+            name='payload',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.23 on 2026-10-19 10:05
+
+from django.core.management import call_command
+from django.db import migrations
+
+
+def create_backtest_cache_table(apps, schema_editor):
+    """
+    Create the table of the shared 'backtests' cache (see CACHES in settings),
+    so deployments that run migrations need no separate createcachetable step.
+    Does nothing if the table already exists.
+    """
+    call_command('createcachetable', 'backtest_cache', database=schema_editor.connection.alias, verbosity=0)
+
+
+def drop_backtest_cache_table(apps, schema_editor):
+    schema_editor.execute(f"DROP TABLE IF EXISTS {schema_editor.quote_name('backtest_cache')}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_batchbacktestresult_payload'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_backtest_cache_table, drop_backtest_cache_table),
+    ]
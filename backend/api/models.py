@@ -1,11 +1,16 @@
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models import F, Max, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 import uuid
 from datetime import timedelta
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 
+from .artifacts import decode_artifact
+
 class UserProfile(models.Model):
     TIER_CHOICES = [
         ('free', 'Free'),
@@ -40,6 +45,33 @@ class UserProfile(models.Model):
         }
         return limits.get(self.tier, 3)
     
+    def get_backtest_concurrency_limit(self):
+        """Get the maximum number of this user's backtest jobs that may run at once"""
+        limits = {
+            'free': 1,
+            'pro': 2,
+            'premium': 3,
+        }
+        return limits.get(self.tier, 1)
+    
+    def get_optimization_grid_limit(self):
+        """Get the maximum number of parameter combinations in one optimization run"""
+        limits = {
+            'free': 25,
+            'pro': 200,
+            'premium': 1000,
+        }
+        return limits.get(self.tier, 25)
+    
+    def get_batch_dataset_limit(self):
+        """Get the maximum number of ticker/timeframe datasets in one batch backtest"""
+        limits = {
+            'free': 4,
+            'pro': 30,
+            'premium': 100,
+        }
+        return limits.get(self.tier, 4)
+    
     def get_allowed_timeframes(self):
         """Get the allowed timeframes for this tier"""
         limits = {
@@ -108,7 +140,11 @@ class Backtest(models.Model):
     timeframe = models.CharField(max_length=10)
     initial_cash = models.DecimalField(max_digits=12, decimal_places=2)
     leverage = models.DecimalField(max_digits=3, decimal_places=1)
-    results = models.JSONField()  # Store all backtest results
+    results = models.JSONField()  # Stats and other small sections; the series are in the artifact
+    return_pct = models.FloatField(null=True, blank=True)
+    final_equity = models.FloatField(null=True, blank=True)
+    trade_count = models.IntegerField(default=0)
+    max_drawdown = models.FloatField(null=True, blank=True)  # Negative percentage
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -116,6 +152,18 @@ class Backtest(models.Model):
         
     def __str__(self):
         return f"{self.strategy_name} on {self.ticker} ({self.start_date} to {self.end_date})"
+
+    def heavy_results(self):
+        """The heavy sections of the results (equity curve, dates, trades) from the artifact, if there is one"""
+        try:
+            artifact = self.artifact
+        except BacktestArtifact.DoesNotExist:
+            return {}
+        return artifact.load()
+
+    def full_results(self):
+        """The complete results, with the equity curve and trades loaded from the artifact"""
+        return {**self.results, **self.heavy_results()}
     
     def get_pnl(self):
         """Extract P&L from results"""
@@ -133,4 +181,205 @@ class Backtest(models.Model):
         """Extract final equity from results"""
         if self.results and 'stats' in self.results:
             return self.results['stats'].get('Equity Final [$]', 'N/A')
-        return 'N/A'
\ No newline at end of file
+        return 'N/A'
+
+
+class BacktestArtifact(models.Model):
+    """The heavy sections of a backtest's results (equity curve, dates, trades), compressed and read on demand."""
+    backtest = models.OneToOneField(Backtest, on_delete=models.CASCADE, primary_key=True, related_name="artifact")
+    encoding = models.CharField(max_length=20)  # How payload is encoded (see artifacts)
+    payload = models.BinaryField()
+
+    def __str__(self):
+        return f"Artifact of backtest {self.backtest_id} ({self.encoding}, {len(self.payload)} bytes)"
+
+    def load(self):
+        return decode_artifact(self.encoding, self.payload)
+
+
+class BacktestChartTile(models.Model):
+    """One tile of a backtest's multi-resolution chart pyramid (see pyramid)."""
+    backtest = models.ForeignKey(Backtest, on_delete=models.CASCADE, related_name="chart_tiles")
+    level = models.PositiveSmallIntegerField()  # 0 is one bucket per bar
+    start_minute = models.BigIntegerField()  # Epoch minute of the tile's first bucket
+    end_minute = models.BigIntegerField()  # Epoch minute of the tile's last bucket
+    series = models.CharField(max_length=50)  # Comma-separated series names, in storage order
+    payload = models.BinaryField()
+
+    class Meta:
+        ordering = ['level', 'start_minute']
+        unique_together = [('backtest', 'level', 'start_minute')]
+
+    def __str__(self):
+        return f"Level {self.level} tile of backtest {self.backtest_id} from minute {self.start_minute}"
+
+    @property
+    def series_names(self):
+        return self.series.split(',')
+
+
+class StrategyPerformance(models.Model):
+    """
+    Running totals of one user's saved backtests of one strategy, for the
+    dashboard. Kept up to date as backtests are saved and pruned (see the
+    Backtest signal receivers below), so the dashboard reads a few rows
+    instead of every backtest.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="strategy_performance")
+    strategy_name = models.CharField(max_length=100)
+    backtest_count = models.IntegerField(default=0)  # Saved backtests, with or without a return
+    return_count = models.IntegerField(default=0)  # Saved backtests with a return
+    win_count = models.IntegerField(default=0)  # Saved backtests with a positive return
+    total_return = models.FloatField(default=0.0)  # Sum of their returns, in percent
+    best_return = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        unique_together = [('user', 'strategy_name')]
+
+    def __str__(self):
+        return f"{self.strategy_name} by {self.user_id}: {self.backtest_count} backtests"
+
+    @classmethod
+    def record(cls, backtest):
+        """Add a newly saved backtest to its strategy's totals."""
+        try:
+            with transaction.atomic():
+                cls.objects.get_or_create(user_id=backtest.user_id, strategy_name=backtest.strategy_name)
+        except IntegrityError:
+            pass  # Created by a concurrent save
+
+        return_pct = backtest.return_pct
+        changes = {'backtest_count': F('backtest_count') + 1}
+        if return_pct is not None:
+            changes.update(
+                return_count=F('return_count') + 1,
+                win_count=F('win_count') + (1 if return_pct > 0 else 0),
+                total_return=F('total_return') + return_pct,
+                best_return=Greatest(Coalesce(F('best_return'), Value(return_pct)), Value(return_pct)),
+            )
+        cls.objects.filter(user_id=backtest.user_id, strategy_name=backtest.strategy_name).update(**changes)
+
+    @classmethod
+    def forget(cls, backtest):
+        """Remove a deleted backtest from its strategy's totals."""
+        rows = cls.objects.filter(user_id=backtest.user_id, strategy_name=backtest.strategy_name)
+        return_pct = backtest.return_pct
+        changes = {'backtest_count': F('backtest_count') - 1}
+        if return_pct is not None:
+            changes.update(
+                return_count=F('return_count') - 1,
+                win_count=F('win_count') - (1 if return_pct > 0 else 0),
+                total_return=F('total_return') - return_pct,
+            )
+        rows.update(**changes)
+        rows.filter(backtest_count__lte=0).delete()
+
+        # A maximum cannot be decremented: when the best backtest goes, the next best is looked up
+        if return_pct is not None and rows.filter(best_return__lte=return_pct).exists():
+            remaining = Backtest.objects.filter(user_id=backtest.user_id, strategy_name=backtest.strategy_name)
+            rows.update(best_return=remaining.aggregate(best=Max('return_pct'))['best'])
+
+    @property
+    def avg_return(self):
+        return self.total_return / self.return_count if self.return_count else 0
+
+    @property
+    def win_rate(self):
+        return self.win_count / self.return_count * 100 if self.return_count else None
+
+
+@receiver(post_save, sender=Backtest)
+def record_strategy_performance(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        StrategyPerformance.record(instance)
+
+
+@receiver(post_delete, sender=Backtest)
+def forget_strategy_performance(sender, instance, **kwargs):
+    StrategyPerformance.forget(instance)
+
+
+class DailyUsage(models.Model):
+    """How many backtests a user has run on one day, counted atomically (see quota)."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="daily_usage")
+    day = models.DateField()
+    backtests = models.IntegerField(default=0)  # A batch backtest counts as one
+
+    class Meta:
+        unique_together = [('user', 'day')]
+
+    def __str__(self):
+        return f"{self.user_id} on {self.day}: {self.backtests} backtests"
+
+
+class BacktestJob(models.Model):
+    """A queued backtest request, claimed and executed by run_backtest_workers on any node."""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    KIND_CHOICES = [
+        ('backtest', 'Backtest'),
+        ('batch', 'Batch'),
+        ('optimization', 'Optimization'),
+        ('walk_forward', 'Walk-forward'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="backtest_jobs")
+    kind = models.CharField(max_length=12, choices=KIND_CHOICES, default='backtest')  # A batch runs one strategy over many datasets
+    tier = models.CharField(max_length=10, choices=UserProfile.TIER_CHOICES, default='free')  # Queue the job is scheduled in
+    strategy_name = models.CharField(max_length=100)
+    configuration = models.JSONField()  # Snapshot of the strategy at submission time
+    parameters = models.JSONField()  # ticker, start_date, end_date, timeframe, cash, leverage (datasets for a batch)
+    request_hash = models.CharField(max_length=64, blank=True, default='', db_index=True)  # Identical requests share a hash
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued', db_index=True)
+    error = models.TextField(blank=True, default='')
+    error_status = models.IntegerField(null=True, blank=True)  # HTTP status the error maps to
+    backtest = models.ForeignKey(Backtest, on_delete=models.SET_NULL, null=True, blank=True, related_name="jobs")
+    report = models.JSONField(null=True, blank=True)  # An optimization's ranking, or a walk-forward's folds
+    worker_id = models.CharField(max_length=255, blank=True, default='')  # host:pid of the node running it
+    attempts = models.IntegerField(default=0)  # Times a worker has claimed this job
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']  # Oldest first, the order workers pick them up
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['status', 'tier', 'created_at']),
+            models.Index(fields=['status', 'heartbeat_at']),
+        ]
+
+    def __str__(self):
+        return f"Job {self.id} ({self.status}) for {self.user.username}"
+
+
+class BatchBacktestResult(models.Model):
+    """The outcome of one ticker/timeframe dataset of a batch backtest job."""
+    job = models.ForeignKey(BacktestJob, on_delete=models.CASCADE, related_name="batch_results")
+    ticker = models.CharField(max_length=10)
+    timeframe = models.CharField(max_length=10)
+    summary = models.JSONField(null=True, blank=True)  # Headline statistics for the summary matrix
+    results = models.JSONField(null=True, blank=True)  # Stats and other small sections; the series are in payload
+    encoding = models.CharField(max_length=20, blank=True, default='')  # How payload is encoded (see artifacts)
+    payload = models.BinaryField(null=True, blank=True)  # The heavy sections, compressed like a BacktestArtifact
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['ticker', 'timeframe']
+        unique_together = [('job', 'ticker', 'timeframe')]
+
+    def __str__(self):
+        return f"{self.ticker} {self.timeframe} for job {self.job_id}"
+
+    def full_results(self):
+        """The complete results, with the equity curve and trades decompressed from the payload"""
+        if self.payload is None:
+            return self.results
+        return {**self.results, **decode_artifact(self.encoding, self.payload)}
@@ -0,0 +1,614 @@
+# backend/api/optimizer.py
+"""
+Grid search, successive halving and walk-forward optimization of strategy parameters.
+
+A grid maps parameter paths in the strategy configuration (for example
+"exitCondition.stopLoss.value" or "conditions.0.value") to the values to try.
+Every combination is backtested against the same indicator frame: the data is
+loaded and the indicators computed once, then shipped once to each worker
+process, which reuses signals between combinations that only differ in their
+exit or sizing rules and simulates up to LANE_BATCH_SIZE combinations at a
+time as lanes of one LaneSimulator. Only summary statistics come back, ranked.
+
+Successive halving samples candidates from the grid (randomly or by Latin
+hypercube) instead of trying every combination: all candidates are backtested
+on a short prefix of the data, the best 1/eta of them move on to a prefix eta
+times longer, and so on until the survivors are backtested on the full range.
+Each rung costs about as much as a few full backtests, so large spaces are
+searched in bounded time. Prefixes are slices of the same indicator frame.
+
+Walk-forward optimization splits the data into rolling (or anchored) train
+windows, each followed by a test window. Each fold grid-searches its train
+window and backtests the winner on its test window; folds run in parallel
+on worker processes, each holding its own copy of the indicator frame
+(pickled to it once when the pool starts). The test windows are
+stitched into one out-of-sample result, each fold starting from the equity
+the previous one ended with: rescaled when the winner's position sizing
+scales with cash, simulated again from that equity when it does not.
+
+Indicator periods other than the ATR periods are fixed by
+add_indicators_to_data, so the ATR periods of atr_based stop losses and
+volatility_based sizing are the only periods that can be searched.
+
+This module must not import Django models: it is imported by spawned worker
+processes.
+"""
+import contextlib
+import copy
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .backtester import (
+    ATR_PERIODS, PortfolioSimulator, generate_signals, is_cash_invariant, signal_config, simulation_config,
+    simulate_portfolio, validate_strategy_config, format_simulation_results,
+)
+from .lanes import run_strategy_batch
+
+# Configuration paths a grid may vary, as regular expressions
+OPTIMIZABLE_PARAMETERS = [
+    r'conditions\.\d+\.value',
+    r'conditions\.\d+\.compareValue',
+    r'entryCondition\.sizingValue',
+    r'entryCondition\.riskPerTrade',
+    r'entryCondition\.volatilityPeriod',
+    r'exitCondition\.stopLoss\.value',
+    r'exitCondition\.stopLoss\.atrPeriod',
+    r'exitCondition\.takeProfit\.value',
+    r'exitCondition\.takeProfit\.riskRewardRatio',
+    r'exitCondition\.takeProfit\.indicatorValue',
+]
+PERIOD_PARAMETERS = ['entryCondition.volatilityPeriod', 'exitCondition.stopLoss.atrPeriod']
+
+RANKABLE_STATS = ['Return [%]', 'Equity Final [$]', 'Max. Drawdown [%]', '# Trades']
+MAX_VALUES_PER_PARAMETER = 100
+MIN_PARALLEL_COMBINATIONS = 16  # Smaller grids are not worth starting worker processes for
+LANE_BATCH_SIZE = 64  # Combinations simulated together in one pass
+
+SEARCH_METHODS = ['grid', 'halving']
+SAMPLING_METHODS = ['random', 'latin_hypercube']
+DEFAULT_HALVING_SAMPLES = 81
+DEFAULT_HALVING_ETA = 3
+MIN_RUNG_BARS = 200  # Shorter prefixes are mostly indicator warm-up
+
+DEFAULT_WALK_FORWARD_FOLDS = 4
+MAX_WALK_FORWARD_FOLDS = 20
+DEFAULT_TRAIN_RATIO = 3.0  # Train window length in test windows
+MIN_WINDOW_BARS = 50
+
+# Per-worker state, set by _init_worker
+_worker_df = None
+_worker_signals = {}
+
+
+def expand_values(name, spec):
+    """Values to try for one parameter: a list, or a {"start", "stop", "step"} range (stop inclusive)."""
+    if isinstance(spec, dict):
+        try:
+            start, stop, step = float(spec['start']), float(spec['stop']), float(spec['step'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"Range for '{name}' needs numeric 'start', 'stop' and 'step'.")
+        if step <= 0 or stop < start:
+            raise ValueError(f"Range for '{name}' must have a positive step and stop >= start.")
+        count = int(np.floor((stop - start) / step + 1e-9)) + 1
+        if count > MAX_VALUES_PER_PARAMETER:
+            raise ValueError(f"Range for '{name}' has {count} values; the limit is {MAX_VALUES_PER_PARAMETER}.")
+        values = [round(start + i * step, 10) for i in range(count)]
+    elif isinstance(spec, (list, tuple)):
+        values = list(spec)
+    else:
+        raise ValueError(f"Values for '{name}' must be a list or a range.")
+
+    if not values:
+        raise ValueError(f"No values given for '{name}'.")
+    if len(values) > MAX_VALUES_PER_PARAMETER:
+        raise ValueError(f"'{name}' has {len(values)} values; the limit is {MAX_VALUES_PER_PARAMETER}.")
+
+    try:
+        values = [float(value) for value in values]
+    except (TypeError, ValueError):
+        raise ValueError(f"Values for '{name}' must be numbers.")
+    values = [int(value) if value.is_integer() else value for value in values]
+
+    if name in PERIOD_PARAMETERS:
+        invalid = [value for value in values if value not in ATR_PERIODS]
+        if invalid:
+            raise ValueError(f"'{name}' must be one of the ATR periods {ATR_PERIODS}, got {invalid}.")
+    return values
+
+
+def parse_parameter_grid(parameters):
+    """Validate a grid specification. Returns a list of (path, values) in request order."""
+    if not isinstance(parameters, dict) or not parameters:
+        raise ValueError("Parameters must be a non-empty object mapping parameter paths to values.")
+
+    grid = []
+    for name, spec in parameters.items():
+        if re.fullmatch(r'conditions\.\d+\.period', name):
+            raise ValueError(
+                f"'{name}' cannot be optimized: condition indicators use fixed periods. "
+                f"Only {' and '.join(PERIOD_PARAMETERS)} select a period."
+            )
+        if not any(re.fullmatch(pattern, name) for pattern in OPTIMIZABLE_PARAMETERS):
+            raise ValueError(f"'{name}' cannot be optimized.")
+        grid.append((name, expand_values(name, spec)))
+    return grid
+
+
+def grid_size(grid):
+    size = 1
+    for _, values in grid:
+        size *= len(values)
+    return size
+
+
+def set_parameter(config, path, value):
+    """Set a dotted path such as 'conditions.0.value' in a configuration."""
+    parts = path.split('.')
+    target = config
+    for part in parts[:-1]:
+        try:
+            target = target[int(part)] if isinstance(target, list) else target[part]
+        except (KeyError, IndexError, TypeError, ValueError):
+            raise ValueError(f"The strategy has no '{path}' to optimize.")
+    if not isinstance(target, dict):
+        raise ValueError(f"The strategy has no '{path}' to optimize.")
+    target[parts[-1]] = value
+
+
+def build_combinations(base_config, parameter_sets):
+    """Apply each parameter set to a copy of `base_config`. Returns a list of (parameters, config)."""
+    combinations = []
+    for parameters in parameter_sets:
+        config = copy.deepcopy(base_config)
+        for name, value in parameters.items():
+            set_parameter(config, name, value)
+        validate_strategy_config(config)
+        combinations.append((parameters, config))
+    return combinations
+
+
+def build_grid(base_config, grid):
+    """Every combination of the grid applied to `base_config`. Returns a list of (parameters, config)."""
+    names = [name for name, _ in grid]
+    parameter_sets = [dict(zip(names, values)) for values in itertools.product(*(values for _, values in grid))]
+    return build_combinations(base_config, parameter_sets)
+
+
+def sample_grid(grid, samples, sampling='latin_hypercube', seed=0):
+    """
+    Up to `samples` distinct parameter sets drawn from the grid (all of them if
+    the grid is that small). Latin hypercube sampling spreads each parameter's
+    draws evenly over its values; random sampling draws them independently.
+    """
+    if sampling not in SAMPLING_METHODS:
+        raise ValueError(f"Unknown sampling '{sampling}'. Choose one of: {', '.join(SAMPLING_METHODS)}.")
+
+    names = [name for name, _ in grid]
+    if samples >= grid_size(grid):
+        return [dict(zip(names, values)) for values in itertools.product(*(values for _, values in grid))]
+
+    rng = np.random.default_rng(seed)
+    seen = set()
+    picked = []
+    for _ in range(100):  # Redraw duplicates a bounded number of times
+        count = samples - len(picked)
+        if count <= 0:
+            break
+        if sampling == 'random':
+            columns = [rng.integers(len(values), size=count) for _, values in grid]
+        else:
+            columns = [((rng.permutation(count) + rng.random(count)) / count * len(values)).astype(int) for _, values in grid]
+        for indices in zip(*columns):
+            indices = tuple(int(index) for index in indices)
+            if indices not in seen:
+                seen.add(indices)
+                picked.append(indices)
+
+    return [
+        {name: values[index] for (name, values), index in zip(grid, indices)}
+        for indices in picked[:samples]
+    ]
+
+
+def halving_schedule(n_candidates, n_bars, eta=DEFAULT_HALVING_ETA, min_bars=MIN_RUNG_BARS):
+    """
+    (candidates, bars) for each rung of successive halving: every rung keeps
+    1/eta of the candidates and gives them eta times more bars, the last rung
+    using all `n_bars`. Rungs that would be shorter than `min_bars` are dropped.
+    """
+    rungs = 0
+    while eta ** (rungs + 1) <= n_candidates and n_bars / eta ** (rungs + 1) >= min_bars:
+        rungs += 1
+
+    schedule = []
+    candidates = n_candidates
+    for rung in range(rungs + 1):
+        schedule.append((candidates, int(n_bars / eta ** (rungs - rung))))
+        candidates = max(1, -(-candidates // eta))
+    return schedule
+
+
+def max_drawdown_pct(equity_curve):
+    """Largest peak-to-trough decline of an equity curve, as a (negative) percentage."""
+    equity = np.asarray(equity_curve, dtype=float)
+    if len(equity) == 0:
+        return 0.0
+    peaks = np.maximum.accumulate(equity)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drawdowns = np.where(peaks > 0, (equity - peaks) / peaks * 100, 0.0)
+    return float(np.nanmin(drawdowns))
+
+
+def summarize_results(results):
+    """Numeric summary statistics of one backtest result."""
+    stats = results['stats']
+    return {
+        'Return [%]': float(stats['Return [%]']),
+        'Equity Final [$]': float(stats['Equity Final [$]'].replace(',', '')),
+        'Max. Drawdown [%]': round(max_drawdown_pct(results['plot_data']['equity_curve']), 2),
+        '# Trades': stats['# Trades'],
+    }
+
+
+def memoized_signals(df_with_indicators, signal_memo, config):
+    """generate_signals, reused between configurations with the same signal inputs."""
+    key = json.dumps(signal_config(config), sort_keys=True, default=str)
+    signals = signal_memo.get(key)
+    if signals is None:
+        signals = generate_signals(df_with_indicators, config)
+        signal_memo[key] = signals
+    return signals
+
+
+def summarize_or_error(results):
+    if 'error' in results:
+        return {'error': results['error']}
+    return summarize_results(results)
+
+
+def evaluate_config(df_with_indicators, signal_memo, config, cash, leverage):
+    """Backtest one configuration on a prepared indicator frame; returns its summary or an error."""
+    signals = memoized_signals(df_with_indicators, signal_memo, config)
+    return summarize_or_error(simulate_portfolio(df_with_indicators, signals, config, cash, leverage))
+
+
+def evaluate_batch(df_with_indicators, signal_memo, configs, cash, leverage):
+    """
+    Backtest several configurations as lanes of one simulation; returns their
+    summaries or errors. If the batch fails, each configuration is evaluated on
+    its own so only the failing ones report an error.
+    """
+    if len(configs) == 1:
+        return [evaluate_config(df_with_indicators, signal_memo, configs[0], cash, leverage)]
+    try:
+        signals = [memoized_signals(df_with_indicators, signal_memo, config) for config in configs]
+        batch = run_strategy_batch(df_with_indicators, signals, configs, cash, leverage)
+        if not any('error' in results for results in batch):
+            return [summarize_results(results) for results in batch]
+    except Exception:
+        pass
+    return [evaluate_config(df_with_indicators, signal_memo, config, cash, leverage) for config in configs]
+
+
+def _batches(items):
+    return [items[i:i + LANE_BATCH_SIZE] for i in range(0, len(items), LANE_BATCH_SIZE)]
+
+
+def _init_worker(df_with_indicators):
+    global _worker_df, _worker_signals
+    _worker_df = df_with_indicators
+    _worker_signals = {}
+    # The simulator logs every bar; nobody reads a worker's stdout
+    sys.stdout = open(os.devnull, 'w')
+
+
+def _evaluate_chunk(chunk, cash, leverage, n_bars=None):
+    frame = _worker_df if n_bars is None else _worker_df.iloc[:n_bars]
+    signal_memo = _worker_signals.setdefault(n_bars, {})
+    evaluated = []
+    for batch in _batches(chunk):
+        summaries = evaluate_batch(frame, signal_memo, [config for _, config in batch], cash, leverage)
+        evaluated.extend((index, summary) for (index, _), summary in zip(batch, summaries))
+    return evaluated
+
+
+@contextlib.contextmanager
+def _worker_pool(df_with_indicators, processes, n_configs):
+    """
+    Worker processes each holding a copy of the indicator frame (pickled once
+    per process), or None when the search is too small to parallelize.
+    """
+    if processes <= 1 or n_configs < MIN_PARALLEL_COMBINATIONS:
+        yield None
+        return
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context,
+                             initializer=_init_worker, initargs=(df_with_indicators,)) as pool:
+        yield pool
+
+
+def _evaluate_all(df_with_indicators, configs, cash, leverage, pool=None, processes=1, n_bars=None):
+    """Summaries of `configs` backtested on the first `n_bars` bars (all of them if None)."""
+    if pool is None or len(configs) < MIN_PARALLEL_COMBINATIONS:
+        frame = df_with_indicators if n_bars is None else df_with_indicators.iloc[:n_bars]
+        signal_memo = {}
+        with contextlib.redirect_stdout(io.StringIO()):
+            summaries = []
+            for batch in _batches(configs):
+                summaries.extend(evaluate_batch(frame, signal_memo, batch, cash, leverage))
+            return summaries
+
+    # Keep combinations that share signals in the same chunk so each worker reuses them
+    indexed = sorted(enumerate(configs), key=lambda item: json.dumps(signal_config(item[1]), sort_keys=True, default=str))
+    chunk_size = max(1, -(-len(indexed) // (processes * 4)))
+    chunks = [indexed[i:i + chunk_size] for i in range(0, len(indexed), chunk_size)]
+
+    summaries = [None] * len(configs)
+    for evaluated in pool.map(_evaluate_chunk, chunks, itertools.repeat(cash), itertools.repeat(leverage),
+                              itertools.repeat(n_bars)):
+        for index, summary in evaluated:
+            summaries[index] = summary
+    return summaries
+
+
+def _check_rank_by(rank_by):
+    if rank_by not in RANKABLE_STATS:
+        raise ValueError(f"Cannot rank by '{rank_by}'. Choose one of: {', '.join(RANKABLE_STATS)}.")
+
+
+def run_grid_search(df_with_indicators, combinations, cash, leverage, rank_by='Return [%]', processes=1):
+    """
+    Evaluate every (parameters, config) combination and rank them by `rank_by`
+    (highest first; drawdowns are negative, so the shallowest ranks first).
+    Returns a list of {'rank', 'parameters', 'stats'} rows; failed combinations
+    come last with an 'error' instead of stats.
+    """
+    _check_rank_by(rank_by)
+
+    configs = [config for _, config in combinations]
+    with _worker_pool(df_with_indicators, processes, len(configs)) as pool:
+        summaries = _evaluate_all(df_with_indicators, configs, cash, leverage, pool, processes)
+
+    rows = []
+    for (parameters, config), summary in zip(combinations, summaries):
+        if 'error' in summary:
+            rows.append({'parameters': parameters, 'error': summary['error']})
+        else:
+            rows.append({'parameters': parameters, 'stats': summary})
+
+    rows.sort(key=lambda row: (0, -row['stats'][rank_by]) if 'stats' in row else (1, 0))
+    for rank, row in enumerate(rows, start=1):
+        row['rank'] = rank
+    return rows
+
+
+def run_halving_search(df_with_indicators, combinations, cash, leverage, rank_by='Return [%]',
+                       eta=DEFAULT_HALVING_ETA, processes=1):
+    """
+    Successive halving over (parameters, config) combinations, ranking by
+    `rank_by` at every rung. Returns (rows, rungs): `rows` lists every
+    combination with the rung it reached, the bars it was last backtested on
+    and its stats there, the survivors of the last rung (backtested on the
+    full range) first; `rungs` describes each rung's candidates and bars.
+    """
+    _check_rank_by(rank_by)
+    if eta < 2:
+        raise ValueError("Eta must be at least 2.")
+
+    schedule = halving_schedule(len(combinations), len(df_with_indicators), eta)
+    alive = list(range(len(combinations)))
+    rows = {}
+    rungs = []
+
+    with _worker_pool(df_with_indicators, processes, len(combinations)) as pool:
+        for rung, (_, bars) in enumerate(schedule):
+            configs = [combinations[index][1] for index in alive]
+            summaries = _evaluate_all(df_with_indicators, configs, cash, leverage, pool, processes, n_bars=bars)
+
+            scored = []
+            for index, summary in zip(alive, summaries):
+                row = {'parameters': combinations[index][0], 'rung': rung, 'bars': bars}
+                if 'error' in summary:
+                    row['error'] = summary['error']
+                else:
+                    row['stats'] = summary
+                    scored.append(index)
+                rows[index] = row
+            rungs.append({'rung': rung, 'bars': bars, 'candidates': len(alive)})
+
+            scored.sort(key=lambda index: -rows[index]['stats'][rank_by])
+            if rung + 1 == len(schedule) or not scored:
+                break
+            alive = scored[:schedule[rung + 1][0]]
+
+    ranked = sorted(
+        rows.values(),
+        key=lambda row: (-row['rung'], 0, -row['stats'][rank_by]) if 'stats' in row else (-row['rung'], 1, 0)
+    )
+    for rank, row in enumerate(ranked, start=1):
+        row['rank'] = rank
+    return ranked, rungs
+
+
+def walk_forward_windows(n_bars, folds=DEFAULT_WALK_FORWARD_FOLDS, train_ratio=DEFAULT_TRAIN_RATIO, anchored=False):
+    """
+    (train_start, train_end, test_start, test_end) bar positions of each fold.
+    The test windows tile the end of the data; train windows have
+    `train_ratio` test windows' worth of bars, or start at the first bar
+    when `anchored`.
+    """
+    if folds < 1 or folds > MAX_WALK_FORWARD_FOLDS:
+        raise ValueError(f"Folds must be between 1 and {MAX_WALK_FORWARD_FOLDS}.")
+    if train_ratio <= 0:
+        raise ValueError("The train ratio must be positive.")
+
+    test_bars = int(n_bars // (folds + train_ratio))
+    train_bars = n_bars - folds * test_bars
+    if test_bars < MIN_WINDOW_BARS:
+        raise ValueError(
+            f"{n_bars} bars are not enough for {folds} folds: each test window needs at least {MIN_WINDOW_BARS} bars. "
+            f"Use fewer folds or a longer date range."
+        )
+
+    windows = []
+    for fold in range(folds):
+        test_start = train_bars + fold * test_bars
+        train_start = 0 if anchored else test_start - train_bars
+        windows.append((train_start, test_start, test_start, test_start + test_bars))
+    return windows
+
+
+def simulate_test_window(df_with_indicators, window, config, cash, leverage):
+    """Simulate a config on a fold's test window starting from `cash`. Returns the simulator."""
+    test_start, test_end = window[2], window[3]
+    test = df_with_indicators.iloc[test_start:test_end]
+    conditions = simulation_config(config)
+    simulator = PortfolioSimulator(
+        test, generate_signals(test, config), cash, leverage,
+        conditions['exitCondition'], conditions['entryCondition']
+    )
+    simulator.simulate()
+    return simulator
+
+
+def evaluate_fold(df_with_indicators, window, combinations, cash, leverage, rank_by):
+    """
+    Grid-search one fold's train window and simulate the winner on its test
+    window. Returns the winner's index and train summary with the raw test
+    simulation, or an error.
+    """
+    train_start, train_end, test_start, test_end = window
+    train = df_with_indicators.iloc[train_start:train_end]
+    configs = [config for _, config in combinations]
+
+    signal_memo = {}
+    summaries = []
+    for batch in _batches(configs):
+        summaries.extend(evaluate_batch(train, signal_memo, batch, cash, leverage))
+
+    scored = [index for index, summary in enumerate(summaries) if 'error' not in summary]
+    if not scored:
+        return {'error': f"Every parameter combination failed on the train window: {summaries[0]['error']}"}
+    best = max(scored, key=lambda index: summaries[index][rank_by])
+
+    try:
+        simulator = simulate_test_window(df_with_indicators, window, configs[best], cash, leverage)
+    except Exception as e:
+        return {'error': f"The test window backtest failed: {str(e)}"}
+
+    return {
+        'best': best,
+        'train_stats': summaries[best],
+        'equity_curve': simulator.equity_curve,
+        'trades': simulator.trades,
+        'leverage': simulator.leverage,
+    }
+
+
+def _evaluate_fold(window, combinations, cash, leverage, rank_by):
+    return evaluate_fold(_worker_df, window, combinations, cash, leverage, rank_by)
+
+
+def _window_dates(window_index):
+    return {'start': window_index[0].strftime('%Y-%m-%d %H:%M'), 'end': window_index[-1].strftime('%Y-%m-%d %H:%M')}
+
+
+def _window_curve(curve, bars):
+    if len(curve) > bars:
+        # A position left open is closed at the end of the window; carry the cash it leaves
+        curve = curve[:bars - 1] + [curve[-1]]
+    return curve
+
+
+def _scale_trade(trade, scale):
+    scaled = dict(trade, portfolio=trade['portfolio'] * scale)
+    for field in ('pnl', 'position_size'):
+        if scaled[field] is not None:
+            scaled[field] = scaled[field] * scale
+    return scaled
+
+
+def run_walk_forward(df_with_indicators, combinations, cash, leverage, rank_by='Return [%]',
+                     folds=DEFAULT_WALK_FORWARD_FOLDS, train_ratio=DEFAULT_TRAIN_RATIO, anchored=False, processes=1):
+    """
+    Walk-forward optimization of (parameters, config) combinations.
+
+    Returns {'folds', 'results'}: for each fold its windows, the winning
+    parameters and their train and test summaries (at `cash`), and the
+    stitched out-of-sample backtest in run_backtest's format.
+
+    Each fold of the stitched backtest starts from the equity the previous
+    one ended with. For a winner whose sizing scales with cash (see
+    is_cash_invariant) the fold's test run at `cash` is rescaled to that
+    equity; any other winner (fixed_dollar sizing trades the same amount
+    whatever the equity) is simulated again on its test window starting
+    from that equity, one fold after the other.
+    """
+    _check_rank_by(rank_by)
+    windows = walk_forward_windows(len(df_with_indicators), folds, train_ratio, anchored)
+
+    with _worker_pool(df_with_indicators, min(processes, len(windows)), len(windows) * len(combinations)) as pool:
+        if pool is None:
+            with contextlib.redirect_stdout(io.StringIO()):
+                outcomes = [
+                    evaluate_fold(df_with_indicators, window, combinations, cash, leverage, rank_by) for window in windows
+                ]
+        else:
+            outcomes = list(pool.map(
+                _evaluate_fold, windows, itertools.repeat(combinations), itertools.repeat(cash),
+                itertools.repeat(leverage), itertools.repeat(rank_by)
+            ))
+
+    index = df_with_indicators.index
+    fold_rows = []
+    equity_curve = []
+    trades = []
+    capital = cash
+    for fold, (window, outcome) in enumerate(zip(windows, outcomes), start=1):
+        if 'error' in outcome:
+            raise ValueError(f"Fold {fold}: {outcome['error']}")
+
+        train_start, train_end, test_start, test_end = window
+        test_index = index[test_start:test_end]
+        curve = _window_curve(outcome['equity_curve'], len(test_index))
+
+        test_results = format_simulation_results(test_index, outcome['equity_curve'], outcome['trades'], cash, leverage)
+        if 'error' in test_results:
+            raise ValueError(f"Fold {fold}: {test_results['error']}")
+        fold_rows.append({
+            'fold': fold,
+            'train': _window_dates(index[train_start:train_end]),
+            'test': _window_dates(test_index),
+            'parameters': combinations[outcome['best']][0],
+            'train_stats': outcome['train_stats'],
+            'test_stats': summarize_results(test_results),
+        })
+
+        scale = capital / cash
+        config = combinations[outcome['best']][1]
+        if capital > 0 and not is_cash_invariant(config):
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    simulator = simulate_test_window(df_with_indicators, window, config, capital, leverage)
+            except Exception as e:
+                raise ValueError(f"Fold {fold}: The test window backtest failed: {str(e)}")
+            curve = _window_curve(simulator.equity_curve, len(test_index))
+            fold_trades = simulator.trades
+            scale = 1.0
+        else:
+            fold_trades = outcome['trades']
+
+        equity_curve.extend(equity * scale for equity in curve)
+        trades.extend(_scale_trade(trade, scale) for trade in fold_trades)
+        capital = curve[-1] * scale
+
+    results = format_simulation_results(index[windows[0][2]:], equity_curve, trades, cash, outcomes[0]['leverage'])
+    return {'folds': fold_rows, 'results': results}
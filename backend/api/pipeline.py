@@ -0,0 +1,170 @@
+# backend/api/pipeline.py
+"""
+The backtest as a chain of memoized stages:
+
+    data -> indicators -> signals -> simulation/stats
+
+Each stage is cached under a key built from only the inputs it depends on:
+
+- data:        ticker, timeframe and date range (see market_data_key)
+- indicators:  the data key
+- signals:     the indicators key plus conditions, logicalOperator and action
+- simulation:  the signals key plus entry/exit conditions and leverage. When
+               positions are sized as a fraction of the portfolio the equity
+               path scales linearly with cash, so the simulation is run once
+               at NORMALIZED_CASH and rescaled for each requested cash amount.
+               fixed_dollar strategies are simulated for every request.
+- stats:       formatted from the simulation for each request, with a Monte
+               Carlo analysis of its trades (see monte_carlo); the full result
+               is also cached per request by backtest_service.
+
+Editing a stop loss therefore only re-runs the simulation, changing leverage
+reuses the signals as well, and changing only cash is a cache hit. Cached
+frames and records are shared between callers and must not be modified.
+"""
+import hashlib
+import json
+import logging
+
+import pandas as pd
+from django.conf import settings
+
+from .backtester import (
+    PortfolioSimulator, check_backtest_inputs, prepare_indicators, generate_signals,
+    signal_config, simulation_config, is_cash_invariant, format_simulation_results,
+    backtest_failure, simulation_failure,
+)
+from .monte_carlo import run_monte_carlo, trade_returns
+from .result_cache import ResultCache, DEFAULT_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+data_cache = ResultCache(getattr(settings, 'BACKTEST_DATA_CACHE_BYTES', 64 * 1024 * 1024), DEFAULT_CACHE_TTL)
+indicator_cache = ResultCache(getattr(settings, 'BACKTEST_INDICATOR_CACHE_BYTES', 128 * 1024 * 1024), DEFAULT_CACHE_TTL)
+signal_cache = ResultCache(getattr(settings, 'BACKTEST_SIGNAL_CACHE_BYTES', 32 * 1024 * 1024), DEFAULT_CACHE_TTL)
+simulation_cache = ResultCache(getattr(settings, 'BACKTEST_SIMULATION_CACHE_BYTES', 64 * 1024 * 1024), DEFAULT_CACHE_TTL)
+
+# Cash that cash-invariant simulations are run and cached at
+NORMALIZED_CASH = 1.0
+
+
+def stage_key(stage, *parts):
+    """SHA-256 key for a stage from the (JSON-serializable) inputs it depends on."""
+    encoded = json.dumps([stage, *parts], sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def market_data_key(ticker, start_date, end_date, timeframe):
+    """Key of the data stage for a market data request."""
+    return stage_key('data', str(ticker).strip().upper(), str(timeframe), str(start_date), str(end_date))
+
+
+def data_fingerprint(data_df):
+    """Key of the data stage for a DataFrame that did not come from the data cache."""
+    hashed = pd.util.hash_pandas_object(data_df, index=True).values
+    return stage_key('frame', list(data_df.columns), hashlib.sha256(hashed.tobytes()).hexdigest())
+
+
+def frame_size(frame):
+    """Memory used by a DataFrame or Series, for cache accounting."""
+    usage = frame.memory_usage(index=True)
+    return int(usage.sum()) if hasattr(usage, 'sum') else int(usage)
+
+
+def cached_stage(cache, key, compute, size=frame_size):
+    """Return the cached value for `key`, computing and caching it on a miss."""
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, size=size(value))
+    return value
+
+
+def prepare_cached_indicators(data_df, data_key=None):
+    """Run (or reuse) the indicator stage. Returns (df_with_indicators, indicators_key)."""
+    data_key = data_key or data_fingerprint(data_df)
+    indicators_key = stage_key('indicators', data_key)
+    df_with_indicators = cached_stage(indicator_cache, indicators_key, lambda: prepare_indicators(data_df))
+    return df_with_indicators, indicators_key
+
+
+def prepare_signals(data_df, strategy_config, data_key=None):
+    """Run (or reuse) the indicator and signal stages. Returns (df_with_indicators, signals, signals_key)."""
+    df_with_indicators, indicators_key = prepare_cached_indicators(data_df, data_key)
+
+    signals_key = stage_key('signals', indicators_key, signal_config(strategy_config))
+    signals = cached_stage(signal_cache, signals_key, lambda: generate_signals(df_with_indicators, strategy_config))
+
+    return df_with_indicators, signals, signals_key
+
+
+def simulation_size(simulation):
+    """Approximate memory used by a cached simulation."""
+    return 32 * len(simulation['equity_curve']) + 400 * len(simulation['trades'])
+
+
+def record_simulation(df_with_indicators, signals, strategy_config, initial_cash, leverage, quiet=False):
+    """Simulate a strategy, keeping the unformatted equity curve and trade records."""
+    conditions = simulation_config(strategy_config)
+    simulator = PortfolioSimulator(
+        df_with_indicators, signals, initial_cash, leverage,
+        conditions['exitCondition'], conditions['entryCondition'], quiet=quiet
+    )
+    simulator.simulate()
+    return {
+        'equity_curve': simulator.equity_curve,
+        'trades': simulator.trades,
+        'leverage': simulator.leverage,
+    }
+
+
+def normalized_simulation(df_with_indicators, signals, strategy_config, leverage):
+    """Simulate a cash-invariant strategy at NORMALIZED_CASH, quietly (its dollar amounts are not any request's)."""
+    return record_simulation(df_with_indicators, signals, strategy_config, NORMALIZED_CASH, leverage, quiet=True)
+
+
+def run_staged_backtest(data_df, strategy_config, initial_cash, leverage=1.0, data_key=None):
+    """
+    Same results as backtester.run_backtest, reusing cached indicators,
+    signals and cash-normalized simulations, plus a 'monte_carlo' analysis.
+    `data_key` identifies the data (market_data_key); if omitted the frame is
+    fingerprinted.
+    """
+    logger.debug("Staged backtest of %s with $%.2f cash at %sx leverage", strategy_config, initial_cash, leverage)
+
+    check_backtest_inputs(data_df, strategy_config, initial_cash)
+
+    try:
+        df_with_indicators, signals, signals_key = prepare_signals(data_df, strategy_config, data_key)
+
+        try:
+            if is_cash_invariant(strategy_config):
+                simulation_key = stage_key('simulation', signals_key, simulation_config(strategy_config), float(leverage))
+                simulation = cached_stage(
+                    simulation_cache, simulation_key,
+                    lambda: normalized_simulation(df_with_indicators, signals, strategy_config, leverage),
+                    size=simulation_size
+                )
+                scale = initial_cash / NORMALIZED_CASH
+            else:
+                simulation = record_simulation(df_with_indicators, signals, strategy_config, initial_cash, leverage)
+                scale = 1.0
+        except Exception as e:
+            return simulation_failure(e)
+
+        results = format_simulation_results(
+            df_with_indicators.index, simulation['equity_curve'], simulation['trades'],
+            initial_cash, simulation['leverage'], scale=scale
+        )
+        if 'error' not in results:
+            results['monte_carlo'] = run_monte_carlo(trade_returns(simulation['trades']), initial_cash)
+        return results
+
+    except Exception as e:
+        return backtest_failure(f'Backtest failed: {str(e)}')
+
+
+def clear_stage_caches():
+    """Drop every cached stage (e.g. after market data files are replaced)."""
+    for cache in (data_cache, indicator_cache, signal_cache, simulation_cache):
+        cache.clear()
@@ -0,0 +1,264 @@
+# backend/api/portfolio.py
+"""
+Multi-asset portfolio backtests: one strategy traded on several tickers at
+once, sharing a single pot of cash.
+
+The tickers' bars are aligned onto the union of their timestamps, so a 24/7
+crypto pair, a stock that only trades in sessions and an FX pair can share
+one timeline. Indicators and signals are computed per asset on its own bars
+(through the cached pipeline stages) and then aligned; an asset can only be
+traded on bars where it has data, and in between its open position is
+marked at its last close.
+
+MultiAssetSimulator keeps one position slot per asset, held in arrays like
+the lanes of LaneSimulator, and updates all assets with numpy operations on
+each bar. Unlike lanes, the assets are not independent portfolios:
+
+- entries are sized from the shared cash, and when the assets entering on a
+  bar ask for more than the available cash they are scaled down together to
+  95% of it;
+- long and short positions both set aside their (unleveraged) size as margin,
+  which is returned together with the P&L on exit;
+- equity is cash plus the margin and unrealized P&L of every open position,
+  and a margin call closes every position at once.
+
+The same exit rules and position sizing as single-asset backtests apply,
+using the ExitRule and PositionSizer of lanes with one lane per asset.
+"""
+import numpy as np
+import pandas as pd
+
+from .backtester import (
+    DEFAULT_ENTRY_CONDITION, DEFAULT_EXIT_CONDITION, check_backtest_inputs, simulation_config,
+    format_simulation_results, backtest_failure, simulation_failure,
+)
+from .lanes import ExitRule, PositionSizer
+from .pipeline import prepare_signals
+
+MIN_PORTFOLIO_ASSETS = 2
+MAX_PORTFOLIO_ASSETS = 10
+
+# Share of the cash that entries on one bar may use when they ask for more than there is
+CASH_BUFFER = 0.95
+
+
+def align_assets(frames: list, signals: list):
+    """
+    Align per-asset indicator frames and signals onto the union of their
+    timestamps. Bars an asset has no data for get NaN columns and a HOLD signal.
+    Returns (index, aligned_frames, aligned_signals).
+    """
+    index = frames[0].index
+    for frame in frames[1:]:
+        index = index.union(frame.index)
+
+    aligned_frames = [frame.reindex(index) for frame in frames]
+    aligned_signals = [asset_signals.reindex(index, fill_value='HOLD') for asset_signals in signals]
+    return index, aligned_frames, aligned_signals
+
+
+class MultiAssetSimulator:
+    """Simulates one strategy over several aligned assets with shared cash."""
+
+    def __init__(self, frames: list, signals: list, tickers: list, initial_cash: float, leverage: float = 1.0,
+                 exit_condition: dict = None, entry_condition: dict = None):
+        """`frames` and `signals` are aligned (see align_assets), one per ticker."""
+        self.frames = frames
+        self.index = frames[0].index
+        self.tickers = list(tickers)
+        self.n_assets = len(tickers)
+        self.initial_cash = float(initial_cash)
+        self.leverage = float(leverage)
+        self.exit_condition = exit_condition if exit_condition is not None else DEFAULT_EXIT_CONDITION
+        self.entry_condition = entry_condition if entry_condition is not None else DEFAULT_ENTRY_CONDITION
+
+        signal_values = np.column_stack([asset_signals.to_numpy() for asset_signals in signals])
+        self.entry_signal = (signal_values == 'LONG') | (signal_values == 'SHORT')
+        self.long_signal = signal_values == 'LONG'
+
+        self.close = np.column_stack([frame['Close'].to_numpy(dtype=float) for frame in frames])
+        # Last known close of each asset, for valuing positions between its bars
+        self.mark = pd.DataFrame(self.close).ffill().to_numpy()
+
+        self.trades = []
+        self.equity_curve = []
+        self.margin_calls = 0
+
+    def simulate(self):
+        """Advance every asset through the aligned bars, filling equity_curve and trades."""
+        n = self.n_assets
+        exit_conditions = {asset: self.exit_condition for asset in range(n)}
+        entry_conditions = {asset: self.entry_condition for asset in range(n)}
+        # Every asset shares one condition, so a single rule of each kind covers them all
+        exit_rule = ExitRule(exit_conditions, self.frames, n)
+        sizer = PositionSizer(entry_conditions, self.frames, n)
+
+        cash = self.initial_cash
+        shares = np.zeros(n)
+        margin = np.zeros(n)
+        entry_price = np.zeros(n)
+        in_position = np.zeros(n, dtype=bool)
+        is_long = np.zeros(n, dtype=bool)
+        curve = np.empty(len(self.index))
+
+        def position_pnl(assets, price):
+            return np.where(is_long[assets], price - entry_price[assets], entry_price[assets] - price) * shares[assets]
+
+        def equity_at(mark):
+            held = np.flatnonzero(in_position)
+            return cash + float(np.sum(margin[held] + position_pnl(held, mark[held])))
+
+        def close_positions(assets, price):
+            """Close the given assets at `price`; returns (pnl, pnl_pct) and frees their margin."""
+            nonlocal cash
+            pnl = position_pnl(assets, price)
+            pct = np.where(is_long[assets], price - entry_price[assets], entry_price[assets] - price) / entry_price[assets] * 100
+            cash += float(np.sum(margin[assets] + pnl))
+            shares[assets] = 0.0
+            margin[assets] = 0.0
+            in_position[assets] = False
+            return pnl, pct
+
+        def trade_types(assets, prefix=''):
+            return [f"{prefix}LONG" if long else f"{prefix}SHORT" for long in is_long[assets]]
+
+        for i in range(len(self.index)):
+            price = self.close[i]
+            mark = self.mark[i]
+            tradable = ~np.isnan(price) & (price > 0)
+            open_before = np.flatnonzero(in_position & tradable)
+
+            entering = np.flatnonzero(self.entry_signal[i] & ~in_position & tradable)
+            if len(entering) and cash > 0:
+                base = np.zeros(len(entering))
+                base[:] = sizer.sizes(i, price[entering], entering, cash)
+                requested = float(base.sum())
+                if requested > cash:
+                    base = base * (cash * CASH_BUFFER / requested)
+                cash -= float(base.sum())
+                long_entry = self.long_signal[i, entering]
+                shares[entering] = base * self.leverage / price[entering]
+                margin[entering] = base
+                entry_price[entering] = price[entering]
+                in_position[entering] = True
+                is_long[entering] = long_entry
+                self._record(entering, i, trade_types(entering), price[entering], equity_at(mark),
+                             position_size=base * self.leverage)
+
+            if len(open_before):
+                stop_hit, take_profit_hit = exit_rule.check(
+                    i, price[open_before], open_before, entry_price[open_before], is_long[open_before]
+                )
+                hit = stop_hit | take_profit_hit
+                if hit.any():
+                    exiting = open_before[hit]
+                    reasons = [
+                        exit_rule.reason(asset, bool(is_long[asset]), bool(take_profit))
+                        for asset, take_profit in zip(exiting, take_profit_hit[hit])
+                    ]
+                    types = trade_types(exiting, 'EXIT ')
+                    pnl, pct = close_positions(exiting, price[exiting])
+                    self._record(exiting, i, types, price[exiting], equity_at(mark), pnl, pct, exit_reasons=reasons)
+
+            equity = equity_at(mark)
+
+            # Margin call: the shared equity is gone, so every position is closed
+            if equity <= 0:
+                if in_position.any():
+                    called = np.flatnonzero(in_position)
+                    types = trade_types(called, 'MARGIN CALL ')
+                    pnl, _ = close_positions(called, mark[called])
+                    self.margin_calls += 1
+                    self._record(called, i, types, mark[called], cash, pnl, exit_reasons=['Margin Call'] * len(called))
+                equity = max(0.0, cash)
+
+            curve[i] = equity
+
+        # Close any remaining open positions at their last close when data runs out
+        still_open = np.flatnonzero(in_position)
+        if len(still_open):
+            final_mark = self.mark[-1]
+            types = trade_types(still_open, 'EXIT ')
+            pnl, pct = close_positions(still_open, final_mark[still_open])
+            self._record(still_open, len(self.index) - 1, types, final_mark[still_open], cash, pnl, pct,
+                         exit_reasons=['Data Finished'] * len(still_open))
+
+        self.equity_curve = curve.tolist()
+
+    def _record(self, assets, index, trade_types, prices, portfolio, pnl=None, pnl_pct=None, position_size=None,
+                exit_reasons=None):
+        for n, asset in enumerate(assets):
+            self.trades.append({
+                'date': self.index[index],
+                'ticker': self.tickers[asset],
+                'type': trade_types[n],
+                'price': float(prices[n]),
+                'portfolio': float(portfolio),
+                'pnl': None if pnl is None else float(pnl[n]),
+                'pnl_pct': None if pnl_pct is None else float(pnl_pct[n]),
+                'position_size': None if position_size is None else float(position_size[n]),
+                'exit_reason': exit_reasons[n] if exit_reasons is not None else ''
+            })
+
+    def asset_breakdown(self) -> list:
+        """Closed trades, realized P&L and win rate of each asset."""
+        breakdown = []
+        for ticker in self.tickers:
+            closed = [trade['pnl'] for trade in self.trades if trade['ticker'] == ticker and trade['pnl'] is not None]
+            wins = sum(1 for pnl in closed if pnl > 0)
+            breakdown.append({
+                'ticker': ticker,
+                'trades': len(closed),
+                'pnl': round(sum(closed), 2),
+                'win_rate': round(wins / len(closed) * 100, 2) if closed else None,
+            })
+        return breakdown
+
+    def results(self) -> dict:
+        """The portfolio result formatted like run_backtest, with a ticker on each trade and a per-asset breakdown."""
+        results = format_simulation_results(
+            self.index, self.equity_curve, self.trades, self.initial_cash, self.leverage
+        )
+        if 'error' in results:
+            return results
+        for formatted, trade in zip(results['trades'], self.trades):
+            formatted['Ticker'] = trade['ticker']
+        results['stats']['Assets'] = ', '.join(self.tickers)
+        results['stats']['Margin Calls'] = self.margin_calls
+        results['assets'] = self.asset_breakdown()
+        return results
+
+
+def run_portfolio_backtest(datasets: dict, strategy_config: dict, initial_cash: float, leverage: float = 1.0,
+                           data_keys: dict = None):
+    """
+    Backtest one strategy on several assets with shared cash.
+
+    `datasets` maps each ticker to its OHLCV frame and `data_keys` optionally
+    to its market_data_key, so cached indicators and signals are reused.
+    """
+    data_keys = data_keys or {}
+    for data_df in datasets.values():
+        check_backtest_inputs(data_df, strategy_config, initial_cash)
+
+    try:
+        tickers = list(datasets)
+        frames, signals = [], []
+        for ticker in tickers:
+            df_with_indicators, asset_signals, _ = prepare_signals(datasets[ticker], strategy_config, data_keys.get(ticker))
+            frames.append(df_with_indicators)
+            signals.append(asset_signals)
+        _, frames, signals = align_assets(frames, signals)
+
+        conditions = simulation_config(strategy_config)
+        simulator = MultiAssetSimulator(
+            frames, signals, tickers, initial_cash, leverage,
+            conditions['exitCondition'], conditions['entryCondition']
+        )
+        try:
+            simulator.simulate()
+        except Exception as e:
+            return simulation_failure(e)
+        return simulator.results()
+    except Exception as e:
+        return backtest_failure(f'Backtest failed: {str(e)}')
@@ -0,0 +1,119 @@
+# backend/api/pyramid.py
+"""
+Multi-resolution chart pyramids of saved backtests.
+
+Downsampling a whole equity curve to a couple of thousand points (see
+downsampling) loses the detail a user wants when zooming into a month of a
+ten-year backtest. Each saved backtest therefore keeps a pyramid of its
+equity curve and of the close prices it traded:
+
+- level 0 has one bucket per bar;
+- each following level merges PYRAMID_FACTOR buckets of the one below, until
+  a level has at most PYRAMID_FACTOR buckets (so even the smallest point
+  budget has a level that fits).
+
+A bucket keeps, for every series, its lowest and highest value and the
+minute each occurred at, so any level still shows every spike and drawdown
+in full. Levels are cut into tiles of TILE_BUCKETS buckets (BacktestChartTile
+rows) so a zoom request only reads the few tiles that overlap its window at
+the level whose bucket count fits its point budget: the response size and the
+data read stay the same for any backtest length.
+
+Times are epoch minutes, like the artifact dates (see artifacts).
+"""
+import zlib
+
+import numpy as np
+
+PYRAMID_FACTOR = 4
+TILE_BUCKETS = 1024
+
+# Series a pyramid can hold, in the order they are stored
+PYRAMID_SERIES = ('equity', 'close')
+
+
+def bucket_dtype(series_names):
+    """Structured dtype of one bucket: its first minute, and the low and high (with their minutes) of each series."""
+    fields = [('start', '<i8')]
+    for name in series_names:
+        fields += [(f'{name}_low', '<f8'), (f'{name}_low_at', '<i8'), (f'{name}_high', '<f8'), (f'{name}_high_at', '<i8')]
+    return np.dtype(fields)
+
+
+def base_level(minutes, series: dict) -> np.ndarray:
+    """Level 0: one bucket per bar. `series` maps names (in PYRAMID_SERIES order) to per-bar values."""
+    level = np.empty(len(minutes), dtype=bucket_dtype(series))
+    level['start'] = minutes
+    for name, values in series.items():
+        level[f'{name}_low'] = level[f'{name}_high'] = values
+        level[f'{name}_low_at'] = level[f'{name}_high_at'] = minutes
+    return level
+
+
+def coarser_level(level: np.ndarray, series_names) -> np.ndarray:
+    """Merge every PYRAMID_FACTOR consecutive buckets of a level into one."""
+    n_buckets = -(-len(level) // PYRAMID_FACTOR)
+    padded = np.empty(n_buckets * PYRAMID_FACTOR, dtype=level.dtype)
+    padded[:len(level)] = level
+    padded[len(level):] = level[-1]  # Repeating the last bucket leaves lows and highs unchanged
+    groups = padded.reshape(n_buckets, PYRAMID_FACTOR)
+
+    merged = np.empty(n_buckets, dtype=level.dtype)
+    merged['start'] = groups['start'][:, 0]
+    for name in series_names:
+        for side, pick in (('low', np.nanargmin), ('high', np.nanargmax)):
+            values = groups[f'{name}_{side}']
+            # A group of NaNs (a series with no data in that stretch) stays NaN
+            empty = np.isnan(values).all(axis=1)
+            chosen = pick(np.where(empty[:, None], 0.0, values), axis=1)[:, None]
+            merged[f'{name}_{side}'] = np.where(empty, np.nan, np.take_along_axis(values, chosen, axis=1)[:, 0])
+            merged[f'{name}_{side}_at'] = np.take_along_axis(groups[f'{name}_{side}_at'], chosen, axis=1)[:, 0]
+    return merged
+
+
+def build_pyramid(minutes, series: dict) -> list:
+    """Every level of the pyramid, finest first."""
+    series_names = list(series)
+    levels = [base_level(minutes, series)]
+    while len(levels[-1]) > PYRAMID_FACTOR:
+        levels.append(coarser_level(levels[-1], series_names))
+    return levels
+
+
+def pyramid_tiles(levels: list):
+    """Yield (level, start_minute, end_minute, payload) for every tile of a pyramid."""
+    for number, level in enumerate(levels):
+        for offset in range(0, len(level), TILE_BUCKETS):
+            tile = level[offset:offset + TILE_BUCKETS]
+            yield number, int(tile['start'][0]), int(tile['start'][-1]), zlib.compress(tile.tobytes())
+
+
+def decode_tile(payload, series_names) -> np.ndarray:
+    return np.frombuffer(zlib.decompress(bytes(payload)), dtype=bucket_dtype(series_names))
+
+
+def level_for_budget(bars: int, max_points: int) -> int:
+    """The finest level at which `bars` level-0 buckets give at most `max_points` points (two per bucket)."""
+    level = 0
+    while 2 * -(-bars // PYRAMID_FACTOR ** level) > max_points:
+        level += 1
+    return level
+
+
+def window_points(buckets: np.ndarray, series_names, start_minute: int, end_minute: int) -> dict:
+    """
+    The points of each series in the buckets starting within [start_minute,
+    end_minute]: its low and high in time order, once where they coincide.
+    Returns {name: (minutes, values)}.
+    """
+    inside = buckets[(buckets['start'] >= start_minute) & (buckets['start'] <= end_minute)]
+    points = {}
+    for name in series_names:
+        minutes = np.concatenate([inside[f'{name}_low_at'], inside[f'{name}_high_at']])
+        values = np.concatenate([inside[f'{name}_low'], inside[f'{name}_high']])
+        # A coarse bucket starting in the window can have its low or high after it
+        keep = ~np.isnan(values) & (minutes <= end_minute)
+        minutes, values = minutes[keep], values[keep]
+        minutes, first = np.unique(minutes, return_index=True)
+        points[name] = (minutes, values[first])
+    return points
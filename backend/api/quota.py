@@ -0,0 +1,81 @@
+# backend/api/quota.py
+"""
+Daily backtest quotas.
+
+Each user has one DailyUsage row per day holding the number of backtests
+run that day, instead of counting the day's Backtest and BacktestJob rows
+on every request:
+
+- usage_today reads the count through a per-process cache with a short TTL,
+  so the check made before loading any data usually costs no query;
+- consume_backtest counts a backtest with a single conditional
+  UPDATE ... SET backtests = backtests + 1 WHERE backtests < limit, so two
+  concurrent requests for the last backtest of the day cannot both succeed.
+  A backtest is counted when its run is admitted, before any data is
+  loaded, and refund_backtest gives it back if the run fails.
+
+A stale cached count lets a request through to the conditional update, which
+has the final say; a request refused on a count that a refund has since
+lowered is refused at most QUOTA_CACHE_TTL seconds too long in one process.
+"""
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DailyUsage
+from .result_cache import ResultCache
+
+QUOTA_CACHE_TTL = getattr(settings, 'BACKTEST_QUOTA_CACHE_TTL', 5)  # seconds
+QUOTA_CACHE_ENTRIES = 10000
+
+# Cached usage counts, one "byte" per entry
+usage_cache = ResultCache(max_bytes=QUOTA_CACHE_ENTRIES, ttl=QUOTA_CACHE_TTL)
+
+
+def usage_key(user_id, day):
+    return f"{user_id}:{day.isoformat()}"
+
+
+def usage_today(user) -> int:
+    """Backtests the user has run today, possibly up to QUOTA_CACHE_TTL seconds old."""
+    day = timezone.localdate()
+    key = usage_key(user.id, day)
+    used = usage_cache.get(key)
+    if used is None:
+        used = DailyUsage.objects.filter(user=user, day=day).values_list('backtests', flat=True).first() or 0
+        usage_cache.set(key, used, size=1)
+    return used
+
+
+def consume_backtest(user, limit=None, day=None) -> bool:
+    """
+    Count one backtest for the user on `day` (today by default), unless that
+    would exceed `limit` (None counts it regardless). Returns whether it was
+    counted.
+    """
+    day = day or timezone.localdate()
+    try:
+        with transaction.atomic():
+            DailyUsage.objects.get_or_create(user=user, day=day)
+    except IntegrityError:
+        pass  # Created by a concurrent request
+
+    rows = DailyUsage.objects.filter(user=user, day=day)
+    if limit is not None:
+        rows = rows.filter(backtests__lt=limit)
+    counted = rows.update(backtests=F('backtests') + 1) > 0
+
+    key = usage_key(user.id, day)
+    if counted:
+        usage_cache.discard(key)
+    else:
+        usage_cache.set(key, limit, size=1)
+    return counted
+
+
+def refund_backtest(user, day=None):
+    """Give back a backtest counted by consume_backtest (for a run that failed)."""
+    day = day or timezone.localdate()
+    DailyUsage.objects.filter(user=user, day=day, backtests__gt=0).update(backtests=F('backtests') - 1)
+    usage_cache.discard(usage_key(user.id, day))
@@ -0,0 +1,40 @@
+# backend/api/renderers.py
+"""
+JSON rendering of API responses with orjson.
+
+Backtest results carry tens of thousands of floats (equity curves, trades,
+sweep lanes), which DRF's JSONRenderer encodes through the standard library
+json module. orjson encodes them several times faster and serializes NumPy
+arrays and scalars natively, so an engine can hand arrays to a response
+without converting them to lists first.
+
+The output matches JSONRenderer: datetimes, Decimals, querysets and the other
+types DRF knows are still formatted by DRF's encoder, and NaN and infinity
+(which strict JSON cannot hold) become null. Without orjson installed, or
+when a client asks for indented output, rendering falls back to JSONRenderer.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+ORJSON_OPTIONS = (
+    orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    if orjson is not None else 0
+)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer encoding with orjson when it is available."""
+
+    encoder_default = JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(data, default=self.encoder_default, option=ORJSON_OPTIONS)
@@ -0,0 +1,248 @@
+# backend/api/result_cache.py
+"""
+Result caching and request coalescing for backtests.
+
+- canonical_request_hash: a stable key for (strategy configuration, ticker,
+  timeframe, start, end, cash, leverage), independent of dict key order.
+- ResultCache: a thread-safe LRU cache bounded by total byte size, with a TTL.
+- SingleFlight: concurrent callers in one process asking for the same key
+  wait for one computation instead of each running it.
+- SharedSingleFlight: the same across processes and nodes (gunicorn workers,
+  backtest workers), through a Django cache they all share.
+
+Cached values are shared between callers and must be treated as read-only.
+"""
+import hashlib
+import json
+import logging
+import os
+import pickle
+import socket
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_BYTES = getattr(settings, 'BACKTEST_RESULT_CACHE_BYTES', 64 * 1024 * 1024)
+DEFAULT_CACHE_TTL = getattr(settings, 'BACKTEST_RESULT_CACHE_TTL', 15 * 60)
+
+# The Django cache SharedSingleFlight coordinates through (see CACHES in settings)
+SHARED_CACHE_ALIAS = 'backtests'
+# Seconds a leader may hold a key before the callers waiting on it run it themselves
+SHARED_LOCK_TIMEOUT = getattr(settings, 'BACKTEST_SHARED_LOCK_TIMEOUT', 120)
+SHARED_POLL_INTERVAL = 0.25  # seconds between checks for another process's result
+
+_UNAVAILABLE = object()
+
+
+def canonical_request_hash(strategy_config, ticker, timeframe, start_date, end_date, cash, leverage):
+    """SHA-256 of a canonical JSON encoding of everything that determines a backtest's result."""
+    payload = {
+        'strategy': strategy_config,
+        'ticker': str(ticker).strip().upper(),
+        'timeframe': str(timeframe),
+        'start_date': str(start_date),
+        'end_date': str(end_date),
+        'cash': float(cash),
+        'leverage': float(leverage),
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def estimate_size(value):
+    """Approximate in-memory footprint of a cached value in bytes."""
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return len(repr(value))
+
+
+class ResultCache:
+    """LRU cache evicting least recently used entries once `max_bytes` is exceeded."""
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES, ttl=DEFAULT_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (value, size, expires_at)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value for `key`, or None if absent or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, size, expires_at = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, size=None):
+        """Cache `value`; values larger than the whole cache are not stored."""
+        size = estimate_size(value) if size is None else size
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, time.monotonic() + self.ttl)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+
+    def discard(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.total_bytes -= size
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one execution."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> {'event', 'result', 'error'}
+
+    def do(self, key, func):
+        """Run `func()` unless a call for `key` is already in flight, in which case wait for its result."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = {'event': threading.Event(), 'result': None, 'error': None}
+                self._calls[key] = call
+
+        if not leader:
+            call['event'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result']
+
+        try:
+            call['result'] = func()
+            return call['result']
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call['event'].set()
+
+
+class SharedSingleFlight:
+    """
+    Coalesce calls for the same key across every process sharing a Django cache.
+
+    The first caller takes a lock entry with cache.add (atomic in the shared
+    backends) and runs the computation; its result is stored, compressed, for
+    `ttl` seconds. Callers in other processes poll for that result instead of
+    running it again, and take over if the lock is released without a result
+    or held past `lock_timeout`. Within a process, callers are first coalesced
+    by a SingleFlight, so each process polls once per key.
+
+    If the cache cannot be reached, calls run unshared rather than fail.
+    """
+
+    def __init__(self, alias=SHARED_CACHE_ALIAS, ttl=DEFAULT_CACHE_TTL, lock_timeout=SHARED_LOCK_TIMEOUT,
+                 poll_interval=SHARED_POLL_INTERVAL):
+        self.alias = alias
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self._local = SingleFlight()
+
+    def do(self, key, func, share=None):
+        """
+        Run `func()` unless another process is already running it for `key`
+        (or has just run it), in which case wait for its result. Only results
+        for which `share(result)` is true are handed to other processes.
+        """
+        return self._local.do(key, lambda: self._do(key, func, share))
+
+    def _do(self, key, func, share):
+        result_key, lock_key = f"result:{key}", f"lock:{key}"
+        result = self._fetch(result_key)
+        if result is not None:
+            return result
+
+        deadline = time.monotonic() + self.lock_timeout
+        token = f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+        while True:
+            acquired = self._cache_call('add', lock_key, token, self.lock_timeout)
+            if acquired is _UNAVAILABLE:
+                return func()
+            if acquired:
+                break
+            time.sleep(self.poll_interval)
+            result = self._fetch(result_key)
+            if result is not None:
+                return result
+            if time.monotonic() > deadline:
+                logger.warning("Backtest %s is still locked after %ss; running it here", key[:12], self.lock_timeout)
+                return func()
+
+        try:
+            # The previous leader may have finished between the first check and the lock
+            result = self._fetch(result_key)
+            if result is not None:
+                return result
+            result = func()
+            if share is None or share(result):
+                payload = zlib.compress(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL), 1)
+                self._cache_call('set', result_key, payload, self.ttl)
+            return result
+        finally:
+            self._cache_call('delete', lock_key)
+
+    def _fetch(self, result_key):
+        payload = self._cache_call('get', result_key)
+        if payload is None or payload is _UNAVAILABLE:
+            return None
+        return pickle.loads(zlib.decompress(payload))
+
+    def _cache_call(self, method, *args):
+        """Call a method of the shared cache, or return _UNAVAILABLE if it fails."""
+        try:
+            return getattr(caches[self.alias], method)(*args)
+        except Exception as e:
+            logger.warning("Shared backtest cache unavailable (%s): %s", method, e)
+            return _UNAVAILABLE
+
+
+backtest_result_cache = ResultCache()
+backtest_single_flight = SharedSingleFlight()
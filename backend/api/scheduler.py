@@ -0,0 +1,122 @@
+# backend/api/scheduler.py
+"""
+Tier-aware scheduling for queued backtest jobs.
+
+Every tier has its own queue. Workers pick the next tier by stride scheduling
+with TIER_WEIGHTS, so premium jobs are served most often but pro and free
+queues always keep moving. Within a tier, users are served round-robin (each
+user's oldest job first), and a user's jobs are skipped while they already
+have get_backtest_concurrency_limit() jobs running. One user submitting many
+15m runs therefore only ever occupies their own share of the workers.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import Count, Min, Avg, F
+from django.utils import timezone
+
+from .models import BacktestJob, UserProfile
+
+TIER_WEIGHTS = {
+    'premium': 4,
+    'pro': 2,
+    'free': 1,
+}
+
+# How many queued jobs per tier are considered when picking the next one
+CANDIDATE_WINDOW = 200
+
+
+def running_jobs_by_user():
+    """Number of running jobs for each user that has any."""
+    return dict(
+        BacktestJob.objects.filter(status='running')
+        .values_list('user_id')
+        .annotate(count=Count('id'))
+    )
+
+
+class TierScheduler:
+    """Chooses the order in which queued jobs are offered to a worker node."""
+
+    def __init__(self, weights=None, window=CANDIDATE_WINDOW):
+        self.weights = weights or TIER_WEIGHTS
+        self.window = window
+        # Stride scheduling: each tier advances its pass by 1/weight whenever it is served
+        self.passes = {tier: 0.0 for tier in self.weights}
+        self.idle = set()  # Tiers found empty during the last scan
+
+    def tier_order(self):
+        """Tiers from most to least entitled to the next worker slot."""
+        return sorted(self.passes, key=lambda tier: (self.passes[tier], -self.weights[tier]))
+
+    def charge(self, tier):
+        """Record that a job from `tier` was started."""
+        if tier not in self.passes:
+            return
+        # Idle tiers must not bank credit while the others are served, or they
+        # would monopolize the workers once they have jobs again
+        for idle_tier in self.idle:
+            self.passes[idle_tier] = max(self.passes[idle_tier], self.passes[tier])
+        self.passes[tier] += 1.0 / self.weights[tier]
+
+    def candidates(self):
+        """Yield queued jobs in the order a worker should try to claim them."""
+        running = running_jobs_by_user()
+        self.idle = set()
+
+        for tier in self.tier_order():
+            jobs = list(
+                BacktestJob.objects.filter(status='queued', tier=tier)
+                .select_related('user__profile')
+                .order_by('created_at')[:self.window]
+            )
+            if not jobs:
+                self.idle.add(tier)
+                continue
+
+            # Round-robin across users: a user's n-th queued job ranks behind
+            # every other user's (n-1)-th, counting the jobs they already run
+            position = defaultdict(int)
+            ranked = []
+            for job in jobs:
+                limit = job.user.profile.get_backtest_concurrency_limit()
+                if running.get(job.user_id, 0) >= limit:
+                    continue
+                rank = running.get(job.user_id, 0) + position[job.user_id]
+                position[job.user_id] += 1
+                ranked.append((rank, job.created_at, job))
+
+            for _, _, job in sorted(ranked, key=lambda item: (item[0], item[1])):
+                yield job
+
+
+def get_queue_stats(window_minutes=60):
+    """
+    Per-tier queue depth and wait times.
+
+    `oldest_wait_seconds` is how long the oldest queued job has been waiting;
+    `avg_wait_seconds` is the mean queue time of jobs started in the last
+    `window_minutes` minutes.
+    """
+    now = timezone.now()
+    since = now - timedelta(minutes=window_minutes)
+    stats = {}
+
+    for tier, _ in UserProfile.TIER_CHOICES:
+        jobs = BacktestJob.objects.filter(tier=tier)
+        queued = jobs.filter(status='queued').aggregate(count=Count('id'), oldest=Min('created_at'))
+        running = jobs.filter(status='running').count()
+        recent_wait = (
+            jobs.filter(started_at__gte=since)
+            .aggregate(wait=Avg(F('started_at') - F('created_at')))['wait']
+        )
+
+        stats[tier] = {
+            'queued': queued['count'],
+            'running': running,
+            'oldest_wait_seconds': round((now - queued['oldest']).total_seconds(), 1) if queued['oldest'] else 0,
+            'avg_wait_seconds': round(recent_wait.total_seconds(), 1) if recent_wait else 0,
+        }
+
+    return stats
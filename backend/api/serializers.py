@@ -1,6 +1,6 @@
 from django.contrib.auth.models import User
 from rest_framework import serializers
-from .models import Strategy, Backtest, UserProfile, EmailVerification
+from .models import Strategy, Backtest, UserProfile, EmailVerification, BacktestJob
 
 class UserProfileSerializer(serializers.ModelSerializer):
     tier = serializers.CharField(read_only=True)
@@ -93,5 +93,16 @@ class StrategySerializer(serializers.ModelSerializer):
 class BacktestSerializer(serializers.ModelSerializer):
     class Meta:
         model = Backtest
-        fields = ['id', 'strategy_name', 'ticker', 'start_date', 'end_date', 'timeframe', 'initial_cash', 'leverage', 'results', 'created_at']
-        read_only_fields = ['user']
\ No newline at end of file
+        fields = ['id', 'strategy_name', 'ticker', 'start_date', 'end_date', 'timeframe', 'initial_cash', 'leverage', 'results',
+                  'return_pct', 'final_equity', 'trade_count', 'max_drawdown', 'created_at']
+        read_only_fields = ['user']
+
+
+class BacktestJobSerializer(serializers.ModelSerializer):
+    job_id = serializers.UUIDField(source='id', read_only=True)
+    backtest_id = serializers.IntegerField(source='backtest.id', read_only=True, default=None)
+
+    class Meta:
+        model = BacktestJob
+        fields = ['job_id', 'kind', 'status', 'strategy_name', 'parameters', 'error', 'backtest_id', 'created_at', 'started_at', 'finished_at']
+        read_only_fields = fields
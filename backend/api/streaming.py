@@ -0,0 +1,89 @@
+# backend/api/streaming.py
+"""
+NDJSON streaming of backtest results.
+
+A long intraday backtest has hundreds of thousands of equity points and
+thousands of trades. Returned as one JSON document, the whole result is
+rendered into a single string next to the result itself before the first
+byte is sent. In streaming mode (stream=ndjson) the result is sent as
+newline-delimited JSON instead, one line at a time:
+
+    {"type": "stats", "stats": {...}, ...}
+    {"type": "series", "equity_points": n, "trade_count": m}
+    {"type": "equity","offset": 0, "dates": [...], "equity_curve": [...]}
+    ...
+    {"type": "trades", "offset": 0, "trades": [...]}
+    ...
+    {"type": "end"}
+
+The stats line comes first, so a client can show the headline numbers while
+the curve and trades are still arriving, and only one chunk is rendered at a
+time. For a saved backtest the stats line is sent before the artifact is
+even decompressed (see artifacts). An error after the response has started
+is reported as a final {"type": "error", "error": ...} line.
+"""
+import logging
+
+from .renderers import FastJSONRenderer
+
+logger = logging.getLogger(__name__)
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+STREAM_MODE = 'ndjson'
+
+# Points per equity line and trades per trades line
+EQUITY_CHUNK_POINTS = 10000
+TRADE_CHUNK_SIZE = 1000
+
+
+def wants_stream(data) -> bool:
+    """Whether a request asks for NDJSON streaming (stream=ndjson)."""
+    return data.get('stream') == STREAM_MODE
+
+
+def ndjson_line(data) -> bytes:
+    return FastJSONRenderer().render(data) + b'\n'
+
+
+def equity_lines(plot_data: dict):
+    """The equity curve and its dates in chunks. The curve may end with one undated point (see downsampling)."""
+    equity_curve = plot_data.get('equity_curve') or []
+    dates = plot_data.get('dates') or []
+    for offset in range(0, len(equity_curve), EQUITY_CHUNK_POINTS):
+        yield ndjson_line({
+            'type': 'equity',
+            'offset': offset,
+            'dates': dates[offset:offset + EQUITY_CHUNK_POINTS],
+            'equity_curve': equity_curve[offset:offset + EQUITY_CHUNK_POINTS],
+        })
+
+
+def trade_lines(trades: list):
+    for offset in range(0, len(trades), TRADE_CHUNK_SIZE):
+        yield ndjson_line({'type': 'trades', 'offset': offset, 'trades': trades[offset:offset + TRADE_CHUNK_SIZE]})
+
+
+def result_lines(light: dict, load_heavy, header: dict = None):
+    """
+    Yield a result as NDJSON lines. `light` holds the stats and the other
+    light sections (see artifacts.split_results); `load_heavy` returns the
+    heavy sections and is only called once the stats line is out. `header`
+    adds fields (e.g. the backtest id) to the stats line.
+    """
+    try:
+        yield ndjson_line({'type': 'stats', **(header or {}), **light})
+        heavy = load_heavy()
+        plot_data = heavy.get('plot_data') or {}
+        trades = heavy.get('trades') or []
+        yield ndjson_line({
+            'type': 'series',
+            'equity_points': len(plot_data.get('equity_curve') or []),
+            'trade_count': len(trades),
+            **{key: value for key, value in plot_data.items() if key not in ('equity_curve', 'dates')},
+        })
+        yield from equity_lines(plot_data)
+        yield from trade_lines(trades)
+        yield ndjson_line({'type': 'end'})
+    except Exception as e:
+        logger.warning("Streaming backtest results failed: %s", e)
+        yield ndjson_line({'type': 'error', 'error': f"Unexpected error: {str(e)}"})
@@ -0,0 +1,78 @@
+# backend/api/tests/fixtures.py
+"""Users, strategies and requests shared by the API tests."""
+import contextlib
+import io
+import logging
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.models import BacktestJob, Strategy
+
+RSI_STRATEGY = {
+    'conditions': [{'indicator': 'RSI', 'operator': 'less_than', 'value': '30'}],
+    'logicalOperator': 'AND',
+    'action': 'LONG',
+    'entryCondition': {'positionSizing': 'fixed_percentage', 'sizingValue': 50},
+    'exitCondition': {
+        'stopLoss': {'type': 'fixed_percentage', 'value': 5},
+        'takeProfit': {'type': 'fixed_percentage', 'value': 10},
+    },
+}
+
+
+def make_user(username='trader', tier='premium'):
+    user = User.objects.create_user(username=username, email=f'{username}@example.com', password='secret-password')
+    user.profile.tier = tier
+    user.profile.save()
+    return user
+
+
+def make_strategy(user, configuration=None, name='RSI dip'):
+    return Strategy.objects.create(user=user, name=name, configuration=configuration or RSI_STRATEGY)
+
+
+def make_job(user, age_seconds=0, **fields):
+    """A queued backtest job in the user's tier, created `age_seconds` ago."""
+    job = BacktestJob.objects.create(
+        user=user, tier=user.profile.tier, strategy_name='RSI dip', configuration=RSI_STRATEGY,
+        parameters={'ticker': 'BTCUSDT', 'timeframe': '4h', 'start_date': '2020-01-01', 'end_date': '2021-01-01',
+                    'cash': 10000, 'leverage': 1},
+        **fields
+    )
+    BacktestJob.objects.filter(id=job.id).update(created_at=timezone.now() - timedelta(seconds=age_seconds))
+    job.refresh_from_db()
+    return job
+
+
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def backtest_request(strategy, **overrides):
+    """A backtest of BTCUSDT 4h bars over 2020, from the CSV data in the repository."""
+    return {
+        'strategy_id': strategy.id,
+        'ticker': 'BTCUSDT',
+        'timeframe': '4h',
+        'start_date': '2020-01-01',
+        'end_date': '2021-01-01',
+        'cash': 10000,
+        'leverage': 1,
+        **overrides,
+    }
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the engine's debug output and the api logs."""
+    logging.disable(logging.CRITICAL)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        logging.disable(logging.NOTSET)
@@ -0,0 +1,68 @@
+# backend/api/tests/test_artifacts.py
+import json
+import zlib
+
+from django.test import SimpleTestCase
+
+from api.artifacts import (
+    COLUMNAR_ENCODING, JSON_ZLIB_ENCODING, encode_artifact, decode_artifact, encode_dates, decode_dates,
+    split_results, summary_fields, max_drawdown_pct,
+)
+
+DATES = ['2020-01-03 00:00', '2020-01-03 04:00', '2020-01-03 08:00', '2020-01-06 00:00', '2020-01-06 04:00']
+
+
+def heavy_sections():
+    return {
+        'plot_data': {'equity_curve': [10000.0, 10012.345678901234, 9950.5, 10100.25, 10200.0, 10210.0],
+                      'dates': DATES, 'drawdown': [0.0, -1.2]},
+        'trades': [
+            {'Date': DATES[1], 'Type': 'BUY LONG', 'Price': '$7,209.83', 'portfolio': 10012.3, 'pnl': None},
+            {'Date': DATES[3], 'Type': 'SELL LONG', 'Price': '$7,300.00', 'portfolio': 10100.25, 'pnl': 87.9,
+             'Exit Reason': 'Take Profit'},
+        ],
+    }
+
+
+class ArtifactEncodingTests(SimpleTestCase):
+    def test_columnar_round_trip_is_exact(self):
+        heavy = heavy_sections()
+        encoding, payload = encode_artifact(heavy)
+        self.assertEqual(encoding, COLUMNAR_ENCODING)
+        # The undated last equity point and the trade missing 'Exit Reason' survive as they were
+        self.assertEqual(decode_artifact(encoding, payload), heavy)
+
+    def test_empty_series_round_trip(self):
+        heavy = {'plot_data': {'equity_curve': [], 'dates': []}, 'trades': []}
+        self.assertEqual(decode_artifact(*encode_artifact(heavy)), heavy)
+
+    def test_json_zlib_artifacts_remain_readable(self):
+        heavy = heavy_sections()
+        payload = zlib.compress(json.dumps(heavy).encode('utf-8'))
+        self.assertEqual(decode_artifact(JSON_ZLIB_ENCODING, payload), heavy)
+
+    def test_unknown_encodings_are_refused(self):
+        with self.assertRaises(ValueError):
+            decode_artifact('pickle', b'')
+
+    def test_dates_are_stored_as_an_interval_and_its_gaps(self):
+        start, interval, gaps = encode_dates(DATES)
+        self.assertEqual(interval, 240)
+        self.assertEqual(gaps.tolist(), [[3, 3 * 24 * 60 - 480]])
+        self.assertEqual(decode_dates(start, interval, gaps, len(DATES)), DATES)
+        self.assertIsNone(encode_dates(['Jan 3, 2020']))
+
+
+class ResultSplitTests(SimpleTestCase):
+    def test_heavy_sections_are_split_from_the_summary(self):
+        results = {'stats': {'Return [%]': '2.00', 'Equity Final [$]': '10,200.00', '# Trades': 2}, **heavy_sections()}
+        light, heavy = split_results(results)
+        self.assertEqual(set(light), {'stats'})
+        self.assertEqual(set(heavy), {'plot_data', 'trades'})
+        self.assertEqual(summary_fields(results), {
+            'return_pct': 2.0, 'final_equity': 10200.0, 'trade_count': 2, 'max_drawdown': -0.62,
+        })
+
+    def test_max_drawdown_is_zero_for_a_rising_curve(self):
+        self.assertEqual(max_drawdown_pct([1.0, 2.0, 3.0]), 0.0)
+        self.assertIsNone(max_drawdown_pct([]))
@@ -0,0 +1,93 @@
+# backend/api/tests/test_chart_data.py
+import json
+import struct
+
+import numpy as np
+from django.test import TestCase
+
+from api.csv_data_loader import load_csv_data
+from api.pipeline import clear_stage_caches
+from api.tests.fixtures import api_client, make_strategy, make_user, quiet
+
+WINDOW = {
+    'ticker': 'BTCUSDT', 'timeframe': '4h', 'start_date': '2020-01-01', 'end_date': '2021-01-01',
+    'from': '2020-03-01', 'to': '2020-03-31',
+}
+
+
+class ChartDataViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        data, _ = load_csv_data('BTCUSDT', '2020-01-01', '2021-01-01', '4h')
+        cls.march = data.loc['2020-03-01':'2020-03-31 23:59']
+
+    def setUp(self):
+        clear_stage_caches()
+        self.user = make_user()
+        self.client = api_client(self.user)
+
+    def get(self, user=None, **params):
+        client = api_client(user) if user else self.client
+        with quiet():
+            return client.get('/api/chart-data/', {**WINDOW, **params})
+
+    def read_binary(self, response):
+        body = b''.join(response.streaming_content)
+        (header_length,) = struct.unpack('<I', body[:4])
+        header = json.loads(body[4:4 + header_length])
+        offset = 4 + header_length
+        times = np.frombuffer(body, dtype='<i8', count=header['rows'], offset=offset)
+        offset += times.nbytes
+        columns = {}
+        for column in header['columns']:
+            columns[column] = np.frombuffer(body, dtype=np.dtype(header['dtype']).newbyteorder('<'),
+                                            count=header['rows'], offset=offset)
+            offset += columns[column].nbytes
+        self.assertEqual(offset, len(body))
+        return header, times, columns
+
+    def test_a_window_returns_its_bars_column_by_column(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['rows'], response.data['step']), (len(self.march), 1))
+        self.assertEqual(list(response.data['columns']), ['Open', 'High', 'Low', 'Close', 'Volume'])
+        self.assertEqual(response.data['time'][0], int(self.march.index[0].timestamp()))
+        np.testing.assert_allclose(response.data['columns']['Close'], self.march['Close'].to_numpy())
+
+    def test_windows_over_the_budget_are_merged_into_candles(self):
+        response = self.get(max_points=50)
+        rows, step = response.data['rows'], response.data['step']
+        self.assertLessEqual(rows, 50)
+        self.assertEqual(step, -(-len(self.march) // 50))
+        columns = response.data['columns']
+        self.assertEqual(columns['Open'][0], self.march['Open'].iloc[0])
+        self.assertEqual(columns['High'][0], self.march['High'].iloc[:step].max())
+        self.assertEqual(columns['Low'][0], self.march['Low'].iloc[:step].min())
+        self.assertEqual(columns['Close'][0], self.march['Close'].iloc[step - 1])
+        self.assertAlmostEqual(columns['Volume'][0], self.march['Volume'].iloc[:step].sum())
+
+    def test_a_strategy_adds_the_indicators_its_conditions_use(self):
+        strategy = make_strategy(self.user)
+        response = self.get(strategy_id=strategy.id, columns='Close')
+        self.assertEqual(list(response.data['columns']), ['Close', 'rsi'])
+        self.assertEqual(len(response.data['columns']['rsi']), len(self.march))
+
+    def test_the_binary_encoding_holds_the_same_columns(self):
+        expected = self.get(columns='Close,rsi').data
+        response = self.get(columns='Close,rsi', encoding='binary', dtype='float64')
+        self.assertEqual(response['Content-Type'], 'application/octet-stream')
+        self.assertEqual(response['X-Chart-Columns'], 'Close,rsi')
+
+        header, times, columns = self.read_binary(response)
+        self.assertEqual(header['rows'], expected['rows'])
+        self.assertEqual(times.tolist(), expected['time'])
+        for column in ('Close', 'rsi'):
+            values = [None if np.isnan(value) else value for value in columns[column].tolist()]
+            self.assertEqual(values, expected['columns'][column])
+
+    def test_bad_requests_are_refused(self):
+        self.assertEqual(self.get(columns='Close,nope').status_code, 400)
+        self.assertEqual(self.get(**{'from': '2030-01-01', 'to': '2030-02-01'}).status_code, 400)
+        self.assertEqual(self.get(encoding='xml').status_code, 400)
+        self.assertEqual(self.get(strategy_id=999999).status_code, 404)
+        self.assertEqual(self.get(make_user('free', tier='free')).status_code, 403)
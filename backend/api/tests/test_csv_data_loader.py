@@ -0,0 +1,59 @@
+# backend/api/tests/test_csv_data_loader.py
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from api import csv_data_loader
+from api.backtest_service import BacktestError, check_dataset, load_market_data
+from api.csv_data_loader import check_csv_coverage, get_dataset_catalog, load_csv_data
+from api.tests.fixtures import quiet
+
+
+class DatasetCatalogTests(SimpleTestCase):
+    def test_catalog_spans_the_whole_dataset(self):
+        data, _ = load_csv_data('BTCUSDT', '1900-01-01', '2100-01-01', '4h')
+        entry = get_dataset_catalog('BTCUSDT', '4h')
+        self.assertEqual((entry['first'], entry['last']), (data.index.min(), data.index.max()))
+
+    def test_entries_are_cached_until_a_file_changes(self):
+        get_dataset_catalog('BTCUSDT', '4h')
+        with mock.patch.object(csv_data_loader, '_edge_dates', side_effect=AssertionError('files were read')):
+            get_dataset_catalog('BTCUSDT', '4h')
+
+        csv_dir = csv_data_loader.csv_dataset_dir('BTCUSDT', '4h')
+        signature, entry = csv_data_loader._catalog[csv_dir]
+        csv_data_loader._catalog[csv_dir] = (signature[1:], entry)
+        with mock.patch.object(csv_data_loader, '_edge_dates', wraps=csv_data_loader._edge_dates) as edge_dates:
+            self.assertEqual(get_dataset_catalog('BTCUSDT', '4h'), entry)
+        self.assertTrue(edge_dates.called)
+
+
+class CoverageCheckTests(SimpleTestCase):
+    def assert_same_error(self, ticker, start_date, end_date, timeframe):
+        with self.assertRaises(ValueError) as loaded:
+            load_csv_data(ticker, start_date, end_date, timeframe)
+        with self.assertRaises(ValueError) as checked:
+            check_csv_coverage(ticker, start_date, end_date, timeframe)
+        self.assertEqual(str(checked.exception), str(loaded.exception))
+
+    def test_ranges_with_data_pass(self):
+        entry = check_csv_coverage('BTCUSDT', '2020-01-01', '2021-01-01', '4h')
+        self.assertGreater(entry['files'], 0)
+
+    def test_ranges_without_data_fail_like_the_loader(self):
+        self.assert_same_error('BTCUSDT', '1990-01-01', '1990-06-01', '4h')
+        self.assert_same_error('BTCUSDT', '2090-01-01', '2090-06-01', '4h')
+
+    def test_missing_datasets_fail_like_the_loader(self):
+        self.assert_same_error('NOPE', '2020-01-01', '2021-01-01', '4h')
+        self.assert_same_error('BTCUSDT', '2020-01-01', '2021-01-01', '2h')
+
+    def test_admission_reports_the_error_the_pipeline_would(self):
+        for ticker, start_date, end_date in (('BTCUSDT', '1990-01-01', '1990-06-01'), ('NOPE', '2020-01-01', '2021-01-01')):
+            with self.subTest(ticker=ticker), quiet():
+                with self.assertRaises(BacktestError) as loaded:
+                    load_market_data(ticker, start_date, end_date, '4h')
+                with self.assertRaises(BacktestError) as checked:
+                    check_dataset(ticker, start_date, end_date, '4h')
+                self.assertEqual(checked.exception.message, loaded.exception.message)
+                self.assertEqual(checked.exception.status_code, loaded.exception.status_code)
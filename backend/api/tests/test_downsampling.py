@@ -0,0 +1,59 @@
+# backend/api/tests/test_downsampling.py
+import numpy as np
+from django.test import SimpleTestCase
+
+from api.downsampling import downsample_indices, downsample_plot_data, downsample_curves, lttb_indices
+
+
+def random_walk(n, seed=0):
+    return 10000 + np.cumsum(np.random.default_rng(seed).normal(0, 25, n))
+
+
+class LttbTests(SimpleTestCase):
+    def test_short_curves_are_kept_whole(self):
+        self.assertEqual(lttb_indices(np.arange(5.0), 10).tolist(), [0, 1, 2, 3, 4])
+        self.assertEqual(downsample_indices([1.0, 2.0], 10).tolist(), [0, 1])
+
+    def test_one_point_is_picked_per_bucket_between_the_ends(self):
+        indices = lttb_indices(random_walk(1000), 100)
+        self.assertEqual(len(indices), 100)
+        self.assertEqual((indices[0], indices[-1]), (0, 999))
+        self.assertTrue(np.all(np.diff(indices) > 0))
+
+    def test_spikes_are_picked(self):
+        values = np.zeros(1000)
+        values[503] = 50.0
+        self.assertIn(503, lttb_indices(values, 20).tolist())
+
+
+class DownsampleTests(SimpleTestCase):
+    def test_the_high_low_and_maximum_drawdown_are_kept(self):
+        curve = random_walk(5000, seed=3)
+        peaks = np.maximum.accumulate(curve)
+        trough = int(np.argmin((curve - peaks) / peaks))
+        peak = int(np.argmax(curve[:trough + 1]))
+
+        indices = downsample_indices(curve, 200)
+        self.assertLessEqual(len(indices), 200)
+        for position in (0, len(curve) - 1, int(np.argmax(curve)), int(np.argmin(curve)), peak, trough):
+            self.assertIn(position, indices.tolist())
+
+    def test_plot_data_keeps_an_undated_last_point(self):
+        curve = random_walk(3001).tolist()
+        dates = [f'd{n}' for n in range(3000)]
+        reduced = downsample_plot_data({'equity_curve': curve, 'dates': dates, 'other': 1}, 500)
+
+        self.assertLessEqual(len(reduced['equity_curve']), 500)
+        self.assertEqual(reduced['equity_curve'][-1], curve[-1])
+        self.assertEqual(len(reduced['dates']), len(reduced['equity_curve']) - 1)
+        self.assertEqual(reduced['other'], 1)
+
+    def test_curves_over_the_same_dates_share_their_positions(self):
+        dates = [f'd{n}' for n in range(4000)]
+        curves = [random_walk(4000, seed).tolist() for seed in (1, 2)]
+        reduced, reduced_dates = downsample_curves(curves, dates, 1000)
+
+        self.assertLessEqual(len(reduced_dates), 1000)
+        self.assertTrue(all(len(curve) == len(reduced_dates) for curve in reduced))
+        positions = [int(date[1:]) for date in reduced_dates]
+        self.assertEqual(reduced[1], [curves[1][n] for n in positions])
@@ -0,0 +1,54 @@
+# backend/api/tests/test_equivalence.py
+import copy
+
+from django.test import SimpleTestCase
+
+from api.backtester import run_backtest
+from api.csv_data_loader import load_csv_data
+from api.equivalence import ENGINES, compare_results, run_equivalence_suite
+from api.tests.fixtures import RSI_STRATEGY, quiet
+
+# A small fixed corpus: the full suite runs through `manage.py check_engine_equivalence`
+CORPUS = {'n_configs': 6, 'seed': 0, 'min_bars': 200, 'max_bars': 600}
+
+
+class EngineEquivalenceTests(SimpleTestCase):
+    def test_engines_match_the_reference(self):
+        for candidate in ENGINES:
+            if candidate == 'reference':
+                continue
+            with self.subTest(candidate=candidate), quiet():
+                report = run_equivalence_suite(candidate, **CORPUS)
+            self.assertEqual(report['cases'], CORPUS['n_configs'])
+            self.assertEqual(report['failures'], [], f"{candidate} differs from the reference")
+
+
+class CompareResultsTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        data, _ = load_csv_data('BTCUSDT', '2020-01-01', '2020-06-01', '4h')
+        with quiet():
+            cls.results = run_backtest(data, copy.deepcopy(RSI_STRATEGY), 10000, 1)
+
+    def perturbed(self):
+        return copy.deepcopy(self.results)
+
+    def test_identical_results_match(self):
+        self.assertEqual(compare_results(self.results, self.perturbed()), [])
+
+    def test_a_changed_equity_point_is_reported(self):
+        candidate = self.perturbed()
+        candidate['plot_data']['equity_curve'][-1] += 1.0
+        mismatches = compare_results(self.results, candidate)
+        self.assertEqual(len(mismatches), 1)
+        self.assertTrue(mismatches[0].startswith('equity_curve differs at 1 bars'))
+
+    def test_a_changed_stat_is_reported(self):
+        candidate = self.perturbed()
+        candidate['stats']['# Trades'] = -1
+        self.assertEqual(compare_results(self.results, candidate), [f"stats['# Trades']: {self.results['stats']['# Trades']!r} != -1"])
+
+    def test_an_error_on_one_side_is_reported(self):
+        mismatches = compare_results(self.results, {'error': 'Engine raised: boom'})
+        self.assertEqual(mismatches, ["error: None != 'Engine raised: boom'"])
@@ -0,0 +1,295 @@
+# backend/api/tests/test_jobs.py
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from api import backtest_service
+from api.backtest_service import BacktestError
+from api.jobs import (
+    MAX_JOB_ATTEMPTS, submit_backtest_job, claim_job, heartbeat, requeue_stale_jobs, execute_job,
+)
+from api.models import Backtest, BacktestJob, BatchBacktestResult, DailyUsage
+from api.quota import usage_cache
+from api.result_cache import backtest_result_cache
+from api.tests.fixtures import make_user, make_strategy, make_job, api_client, backtest_request, quiet
+
+
+def go_stale(job):
+    BacktestJob.objects.filter(id=job.id).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+
+
+class SubmitBacktestJobTests(TestCase):
+    def setUp(self):
+        usage_cache.clear()
+        self.user = make_user()
+        self.strategy = make_strategy(self.user)
+        self.params = backtest_request(self.strategy)
+
+    def test_identical_requests_share_a_job(self):
+        with quiet():
+            job, created = submit_backtest_job(self.user, self.strategy, self.params)
+            again, created_again = submit_backtest_job(self.user, self.strategy, self.params)
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(again.id, job.id)
+        self.assertEqual(job.tier, 'premium')
+
+    def test_requests_over_the_daily_limit_are_not_queued(self):
+        DailyUsage.objects.create(user=self.user, day=timezone.localdate(), backtests=100)
+        with self.assertRaises(BacktestError) as raised:
+            submit_backtest_job(self.user, self.strategy, self.params)
+        self.assertEqual(raised.exception.status_code, 429)
+        self.assertFalse(BacktestJob.objects.exists())
+
+    def test_requests_without_data_in_the_range_are_not_queued(self):
+        with self.assertRaises(BacktestError):
+            submit_backtest_job(self.user, self.strategy, dict(self.params, start_date='1990-01-01', end_date='1990-06-01'))
+        self.assertFalse(BacktestJob.objects.exists())
+
+    def test_requests_outside_the_tier_are_not_queued(self):
+        free_user = make_user('free', tier='free')
+        with self.assertRaises(BacktestError) as raised:
+            submit_backtest_job(free_user, make_strategy(free_user), self.params)
+        self.assertEqual(raised.exception.status_code, 403)
+        self.assertFalse(BacktestJob.objects.exists())
+
+
+class ClaimJobTests(TestCase):
+    def setUp(self):
+        self.user = make_user(tier='free')
+
+    def test_a_job_is_claimed_once(self):
+        job = make_job(self.user)
+        claimed = claim_job(job, 'node-a:1')
+        self.assertEqual((claimed.status, claimed.worker_id, claimed.attempts), ('running', 'node-a:1', 1))
+        self.assertIsNone(claim_job(job, 'node-b:1'))
+
+    def test_users_at_their_concurrency_limit_cannot_claim_more(self):
+        claim_job(make_job(self.user), 'node-a:1')
+        second = make_job(self.user)
+        self.assertIsNone(claim_job(second, 'node-a:1'))
+        second.refresh_from_db()
+        self.assertEqual(second.status, 'queued')
+
+    def test_heartbeats_only_touch_the_workers_own_jobs(self):
+        job = claim_job(make_job(self.user), 'node-a:1')
+        go_stale(job)
+        self.assertEqual(heartbeat('node-b:1', [job.id]), 0)
+        self.assertEqual(heartbeat('node-a:1', [job.id]), 1)
+        self.assertEqual(requeue_stale_jobs(), (0, 0))
+
+
+class RequeueStaleJobsTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+
+    def test_stale_jobs_are_requeued_until_they_run_out_of_attempts(self):
+        job = make_job(self.user)
+        for attempt in range(1, MAX_JOB_ATTEMPTS + 1):
+            claim_job(job, 'node-a:1')
+            go_stale(job)
+            expected = (1, 0) if attempt < MAX_JOB_ATTEMPTS else (0, 1)
+            with quiet():
+                self.assertEqual(requeue_stale_jobs(), expected)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.error_status), ('failed', MAX_JOB_ATTEMPTS, 500))
+
+    def test_fresh_jobs_are_left_running(self):
+        claim_job(make_job(self.user), 'node-a:1')
+        self.assertEqual(requeue_stale_jobs(), (0, 0))
+
+
+class ExecuteJobTests(TestCase):
+    def setUp(self):
+        usage_cache.clear()
+        backtest_result_cache.clear()
+        self.user = make_user()
+        self.strategy = make_strategy(self.user)
+        with quiet():
+            self.job, _ = submit_backtest_job(self.user, self.strategy, backtest_request(self.strategy))
+
+    def used(self):
+        return DailyUsage.objects.filter(user=self.user).values_list('backtests', flat=True).first() or 0
+
+    def test_a_claimed_job_runs_to_completion(self):
+        claim_job(self.job, 'node-a:1')
+        with quiet():
+            self.assertEqual(execute_job(self.job.id, 'node-a:1'), 'completed')
+        self.job.refresh_from_db()
+        self.assertIsNotNone(self.job.backtest)
+        self.assertEqual(self.used(), 1)
+
+    def test_a_worker_whose_job_was_requeued_saves_and_counts_nothing(self):
+        claim_job(self.job, 'node-a:1')
+        job = self.job
+
+        def requeue_and_reclaim(*args, **kwargs):
+            # The worker stalls: its job is requeued and claimed again, by the same node
+            go_stale(job)
+            requeue_stale_jobs()
+            claim_job(BacktestJob.objects.get(id=job.id), 'node-a:1')
+            return original(*args, **kwargs)
+
+        original = backtest_service.load_backtest_data
+        with quiet(), mock.patch.object(backtest_service, 'load_backtest_data', requeue_and_reclaim):
+            self.assertIsNone(execute_job(job.id, 'node-a:1'))
+        self.assertFalse(Backtest.objects.exists())
+        self.assertEqual(self.used(), 0)
+
+        with quiet():
+            self.assertEqual(execute_job(job.id, 'node-a:1'), 'completed')
+        self.assertEqual(Backtest.objects.count(), 1)
+        self.assertEqual(self.used(), 1)
+
+    def test_jobs_reaching_the_daily_limit_fail_without_running(self):
+        claim_job(self.job, 'node-a:1')
+        DailyUsage.objects.create(user=self.user, day=timezone.localdate(), backtests=100)
+        with quiet():
+            self.assertEqual(execute_job(self.job.id, 'node-a:1'), 'failed')
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.error_status, 429)
+        self.assertFalse(Backtest.objects.exists())
+
+
+class BatchJobTests(TestCase):
+    def setUp(self):
+        usage_cache.clear()
+        self.user = make_user()
+        self.client = api_client(self.user)
+
+    def run_batch(self, *datasets):
+        job = make_job(self.user, kind='batch')
+        job.parameters = {**job.parameters, 'datasets': [list(dataset) for dataset in datasets]}
+        job.save()
+        claim_job(job, 'node-a:1')
+        with quiet():
+            return job, execute_job(job.id, 'node-a:1')
+
+    def test_each_dataset_stores_its_stats_and_compressed_series(self):
+        job, status = self.run_batch(('BTCUSDT', '4h'), ('ETHUSDT', '1d'), ('NOPE', '4h'))
+        self.assertEqual(status, 'completed')
+        rows = {(row.ticker, row.timeframe): row for row in BatchBacktestResult.objects.filter(job=job)}
+        self.assertEqual(set(rows), {('BTCUSDT', '4h'), ('ETHUSDT', '1d'), ('NOPE', '4h')})
+        self.assertTrue(rows['NOPE', '4h'].error)
+        self.assertEqual(DailyUsage.objects.get(user=self.user).backtests, 1)
+
+        for key in (('BTCUSDT', '4h'), ('ETHUSDT', '1d')):
+            row = rows[key]
+            self.assertEqual(row.error, '')
+            self.assertIn('stats', row.results)
+            self.assertNotIn('plot_data', row.results)
+            full = row.full_results()
+            self.assertEqual(len(full['plot_data']['equity_curve']), len(full['plot_data']['dates']))
+            self.assertIn('trades', full)
+
+        drill_down = self.client.get(f"/api/backtest-jobs/{job.id}/result/BTCUSDT/4h/", {'max_points': 100})
+        self.assertEqual(drill_down.status_code, 200)
+        self.assertLessEqual(len(drill_down.data['plot_data']['equity_curve']), 100)
+
+    def test_batches_failing_on_every_dataset_fail(self):
+        job, status = self.run_batch(('NOPE', '4h'), ('NOPE', '1d'))
+        self.assertEqual(status, 'failed')
+        self.assertTrue(all(row.error for row in BatchBacktestResult.objects.filter(job=job)))
+        self.assertEqual(DailyUsage.objects.filter(user=self.user, backtests__gt=0).count(), 0)
+
+
+class OptimizationJobTests(TestCase):
+    def setUp(self):
+        usage_cache.clear()
+        backtest_result_cache.clear()
+        self.user = make_user()
+        self.client = api_client(self.user)
+        self.strategy = make_strategy(self.user)
+
+    def optimize(self, user=None, **overrides):
+        client = api_client(user) if user else self.client
+        strategy = make_strategy(user) if user else self.strategy
+        request = backtest_request(strategy, **{'parameters': {'conditions.0.value': [25, 30, 35]}, **overrides})
+        with quiet():
+            return client.post('/api/backtest/optimize/', request, format='json')
+
+    def run_job(self, job_id):
+        job = BacktestJob.objects.get(id=job_id)
+        claim_job(job, 'node-a:1')
+        with quiet():
+            return execute_job(job.id, 'node-a:1')
+
+    def test_grid_searches_are_queued_and_report_their_ranking(self):
+        response = self.optimize()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(BacktestJob.objects.get(id=response.data['job_id']).kind, 'optimization')
+        self.assertEqual(self.client.get(response.data['result_url']).status_code, 202)
+
+        self.assertEqual(self.run_job(response.data['job_id']), 'completed')
+        report = self.client.get(response.data['result_url'])
+        self.assertEqual(report.status_code, 200)
+        self.assertEqual((report.data['method'], report.data['evaluated']), ('grid', 3))
+        self.assertEqual([row['rank'] for row in report.data['results']], [1, 2, 3])
+        self.assertEqual(report.data['backtest_id'], Backtest.objects.get().id)
+        self.assertEqual(DailyUsage.objects.get(user=self.user).backtests, 1)
+
+    def test_successive_halving_is_queued_and_reports_its_rungs(self):
+        values = {'start': 20, 'stop': 40, 'step': 1}
+        response = self.optimize(parameters={'conditions.0.value': values}, method='halving', samples=9, eta=3)
+        self.assertEqual(response.status_code, 202)
+
+        self.assertEqual(self.run_job(response.data['job_id']), 'completed')
+        report = self.client.get(response.data['result_url']).data
+        self.assertEqual((report['method'], report['evaluated'], report['combinations']), ('halving', 9, 21))
+        self.assertEqual([rung['candidates'] for rung in report['rungs']], [9, 3, 1])
+
+    def test_different_searches_are_not_coalesced(self):
+        first = self.optimize()
+        again = self.optimize()
+        other = self.optimize(rank_by='# Trades')
+        self.assertTrue(again.data['coalesced'])
+        self.assertEqual(again.data['job_id'], first.data['job_id'])
+        self.assertNotEqual(other.data['job_id'], first.data['job_id'])
+
+    def test_searches_that_can_only_fail_are_not_queued(self):
+        self.assertEqual(self.optimize(rank_by='Sharpe').status_code, 400)
+        self.assertEqual(self.optimize(parameters={'conditions.0.period': [10, 20]}).status_code, 400)
+        free_user = make_user('free', tier='free')
+        too_big = {'conditions.0.value': list(range(20, 50))}
+        self.assertEqual(self.optimize(free_user, ticker='EURUSD', timeframe='1d', parameters=too_big).status_code, 403)
+        halving = {'parameters': too_big, 'method': 'halving', 'samples': 26}
+        self.assertEqual(self.optimize(free_user, ticker='EURUSD', timeframe='1d', **halving).status_code, 403)
+        self.assertFalse(BacktestJob.objects.exists())
+
+
+class WalkForwardJobTests(TestCase):
+    def setUp(self):
+        usage_cache.clear()
+        backtest_result_cache.clear()
+        self.user = make_user()
+        self.client = api_client(self.user)
+        self.strategy = make_strategy(self.user)
+
+    def walk_forward(self, **overrides):
+        request = backtest_request(self.strategy, **{'parameters': {'conditions.0.value': [25, 30, 35]}, 'folds': 3, **overrides})
+        with quiet():
+            return self.client.post('/api/backtest/walk-forward/', request, format='json')
+
+    def test_walk_forwards_are_queued_and_report_their_folds(self):
+        response = self.walk_forward()
+        self.assertEqual(response.status_code, 202)
+        job = BacktestJob.objects.get(id=response.data['job_id'])
+        self.assertEqual(job.kind, 'walk_forward')
+
+        claim_job(job, 'node-a:1')
+        with quiet():
+            self.assertEqual(execute_job(job.id, 'node-a:1'), 'completed')
+        report = self.client.get(response.data['result_url'], {'max_points': 100}).data
+        self.assertEqual(len(report['folds']), 3)
+        self.assertEqual(report['backtest_id'], Backtest.objects.get().id)
+        self.assertLessEqual(len(report['out_of_sample']['plot_data']['equity_curve']), 100)
+        self.assertNotIn('plot_data', BacktestJob.objects.get(id=job.id).report['out_of_sample'])
+
+    def test_walk_forwards_that_can_only_fail_are_not_queued(self):
+        self.assertEqual(self.walk_forward(folds=0).status_code, 400)
+        self.assertEqual(self.walk_forward(rank_by='Sharpe').status_code, 400)
+        self.assertEqual(self.walk_forward(parameters={'conditions.0.period': [10, 20]}).status_code, 400)
+        self.assertFalse(BacktestJob.objects.exists())
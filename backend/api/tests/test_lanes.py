@@ -0,0 +1,24 @@
+# backend/api/tests/test_lanes.py
+from django.test import SimpleTestCase
+
+from api.csv_data_loader import load_csv_data
+from api.lanes import run_leverage_sweep
+from api.pipeline import clear_stage_caches, run_staged_backtest
+from api.tests.fixtures import RSI_STRATEGY, quiet
+
+
+class LeverageSweepTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.data, _ = load_csv_data('BTCUSDT', '2020-01-01', '2021-01-01', '4h')
+
+    def test_each_lane_has_the_monte_carlo_analysis_of_a_single_backtest(self):
+        clear_stage_caches()
+        with quiet():
+            sweep = run_leverage_sweep(self.data, RSI_STRATEGY, 10000, [1.0, 3.0])
+        for leverage, lane_results in zip([1.0, 3.0], sweep['results']):
+            with self.subTest(leverage=leverage), quiet():
+                single = run_staged_backtest(self.data, RSI_STRATEGY, 10000, leverage)
+                self.assertIsNotNone(lane_results['monte_carlo'])
+                self.assertEqual(lane_results['monte_carlo'], single['monte_carlo'])
@@ -0,0 +1,53 @@
+# backend/api/tests/test_middleware.py
+import json
+import zlib
+
+from django.test import TestCase
+
+from api.middleware import GZIP_WBITS, flushed_gzip_sequence
+from api.tests.fixtures import make_user, make_strategy, api_client, backtest_request, quiet
+
+
+class FlushedGzipSequenceTests(TestCase):
+    def test_each_chunk_decodes_on_arrival(self):
+        chunks = [b'{"type":"stats"}\n', b'x' * 5000 + b'\n', b'{"type":"end"}\n']
+        decompressor = zlib.decompressobj(GZIP_WBITS)
+        compressed = list(flushed_gzip_sequence(iter(chunks)))
+
+        for chunk, original in zip(compressed, chunks):
+            self.assertEqual(decompressor.decompress(chunk), original)
+        decompressor.decompress(compressed[-1])
+        self.assertTrue(decompressor.eof)
+
+
+class StreamingCompressionTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.client = api_client(self.user)
+        self.strategy = make_strategy(self.user)
+
+    def test_first_gzip_chunk_of_an_ndjson_stream_is_the_stats_line(self):
+        with quiet():
+            response = self.client.post(
+                '/api/backtest/', backtest_request(self.strategy, stream='ndjson'), format='json',
+                HTTP_ACCEPT_ENCODING='gzip, deflate',
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            first_chunk = next(iter(response.streaming_content))
+
+        decoded = zlib.decompressobj(GZIP_WBITS).decompress(first_chunk)
+        self.assertTrue(decoded.endswith(b'\n'))
+        stats_line = json.loads(decoded)
+        self.assertEqual(stats_line['type'], 'stats')
+        self.assertIn('Return [%]', stats_line['stats'])
+
+    def test_stream_is_left_alone_without_gzip(self):
+        with quiet():
+            response = self.client.post(
+                '/api/backtest/', backtest_request(self.strategy, stream='ndjson'), format='json',
+                HTTP_ACCEPT_ENCODING='identity',
+            )
+            lines = b''.join(response.streaming_content).splitlines()
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(json.loads(lines[-1]), {'type': 'end'})
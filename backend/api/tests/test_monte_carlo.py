@@ -0,0 +1,67 @@
+# backend/api/tests/test_monte_carlo.py
+import numpy as np
+from django.test import SimpleTestCase
+
+from api.monte_carlo import MONTE_CARLO_PERCENTILES, compound, max_drawdowns, run_monte_carlo, trade_returns
+
+BANDS = [f"p{percentile}" for percentile in MONTE_CARLO_PERCENTILES]
+
+
+class TradeReturnsTests(SimpleTestCase):
+    def test_each_exit_is_a_return_on_the_portfolio_at_its_entry(self):
+        trades = [
+            {'position_size': 5000, 'portfolio': 10000, 'pnl': None},
+            {'position_size': None, 'portfolio': 10500, 'pnl': 500},
+            {'position_size': 5000, 'portfolio': 10500, 'pnl': None},
+            {'position_size': None, 'portfolio': 10290, 'pnl': -210},
+        ]
+        np.testing.assert_allclose(trade_returns(trades), [0.05, -0.02])
+
+
+class RunMonteCarloTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.returns = np.random.default_rng(7).normal(0.01, 0.05, size=40)
+        cls.report = run_monte_carlo(cls.returns, 10000)
+
+    def bands(self, section, statistic):
+        return [self.report[section][statistic][band] for band in BANDS]
+
+    def test_the_same_seed_gives_the_same_bands(self):
+        self.assertEqual(run_monte_carlo(self.returns, 10000), self.report)
+        self.assertNotEqual(run_monte_carlo(self.returns, 10000, seed=1), self.report)
+
+    def test_bands_are_ordered(self):
+        for section, statistic in (('bootstrap', 'final_equity'), ('bootstrap', 'max_drawdown'),
+                                   ('permutation', 'max_drawdown')):
+            with self.subTest(section=section, statistic=statistic):
+                bands = self.bands(section, statistic)
+                self.assertEqual(bands, sorted(bands))
+
+    def test_the_outer_bands_contain_the_original_curve(self):
+        original = compound(self.returns[np.newaxis, :], 10000)
+        final_equity = float(original[0, -1])
+        drawdown = float(max_drawdowns(original, 10000)[0])
+
+        bootstrap = self.bands('bootstrap', 'final_equity')
+        self.assertLessEqual(bootstrap[0], final_equity)
+        self.assertGreaterEqual(bootstrap[-1], final_equity)
+        for section in ('bootstrap', 'permutation'):
+            with self.subTest(section=section):
+                bands = self.bands(section, 'max_drawdown')
+                self.assertLessEqual(bands[0], drawdown)
+                self.assertGreaterEqual(bands[-1], drawdown)
+
+    def test_drawdowns_are_never_positive_and_losses_are_a_percentage(self):
+        self.assertLessEqual(self.bands('bootstrap', 'max_drawdown')[-1], 0)
+        self.assertLessEqual(self.bands('permutation', 'max_drawdown')[-1], 0)
+        self.assertTrue(0 <= self.report['bootstrap']['probability_of_loss'] <= 100)
+
+    def test_equity_cannot_go_below_zero(self):
+        report = run_monte_carlo(np.array([-1.5, 0.1, 0.2]), 10000, simulations=200)
+        self.assertEqual(report['bootstrap']['final_equity']['p5'], 0)
+        self.assertEqual(report['permutation']['max_drawdown']['p5'], -100)
+
+    def test_fewer_than_two_trades_are_not_resampled(self):
+        self.assertIsNone(run_monte_carlo(np.array([0.05]), 10000))
@@ -0,0 +1,70 @@
+# backend/api/tests/test_optimizer.py
+import copy
+
+from django.test import SimpleTestCase
+
+from api.csv_data_loader import load_csv_data
+from api.indicators import add_indicators_to_data
+from api.optimizer import (
+    MIN_WINDOW_BARS, build_grid, halving_schedule, run_walk_forward, simulate_test_window, walk_forward_windows,
+)
+from api.tests.fixtures import RSI_STRATEGY, quiet
+
+
+class WalkForwardWindowsTests(SimpleTestCase):
+    def test_test_windows_tile_the_end_of_the_data(self):
+        windows = walk_forward_windows(1000, folds=4, train_ratio=3.0)
+        self.assertEqual([(test_start, test_end) for _, _, test_start, test_end in windows],
+                         [(432, 574), (574, 716), (716, 858), (858, 1000)])
+        self.assertTrue(all(train_end - train_start == 432 for train_start, train_end, _, _ in windows))
+
+    def test_anchored_train_windows_start_at_the_first_bar(self):
+        windows = walk_forward_windows(1000, folds=4, train_ratio=3.0, anchored=True)
+        self.assertEqual([train_start for train_start, _, _, _ in windows], [0, 0, 0, 0])
+        self.assertEqual([train_end for _, train_end, _, _ in windows], [432, 574, 716, 858])
+
+    def test_short_data_is_refused(self):
+        with self.assertRaises(ValueError):
+            walk_forward_windows(MIN_WINDOW_BARS * 5 - 1, folds=2, train_ratio=3.0)
+
+
+class HalvingScheduleTests(SimpleTestCase):
+    def test_rungs_divide_candidates_and_multiply_bars(self):
+        self.assertEqual(halving_schedule(81, 8100, eta=3, min_bars=200), [(81, 300), (27, 900), (9, 2700), (3, 8100)])
+
+    def test_short_data_runs_a_single_rung(self):
+        self.assertEqual(halving_schedule(81, 300, eta=3, min_bars=200), [(81, 300)])
+
+
+class RunWalkForwardTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        data, _ = load_csv_data('BTCUSDT', '2020-01-01', '2021-01-01', '4h')
+        with quiet():
+            cls.df = add_indicators_to_data(data)
+
+    def combinations(self, sizing, value):
+        config = copy.deepcopy(RSI_STRATEGY)
+        config['entryCondition'] = {'positionSizing': sizing, 'sizingValue': value}
+        return build_grid(config, [('conditions.0.value', [25, 30, 35])])
+
+    def assert_stitched_like_sequential_runs(self, combinations, leverage=2):
+        with quiet():
+            outcome = run_walk_forward(self.df, combinations, 10000, leverage, folds=3)
+        by_parameters = {repr(parameters): config for parameters, config in combinations}
+
+        capital = 10000
+        with quiet():
+            for window, fold in zip(walk_forward_windows(len(self.df), folds=3), outcome['folds']):
+                config = by_parameters[repr(fold['parameters'])]
+                capital = simulate_test_window(self.df, window, config, capital, leverage).equity_curve[-1]
+
+        final = outcome['results']['plot_data']['equity_curve'][-1]
+        self.assertAlmostEqual(final, capital, delta=0.01)
+
+    def test_fixed_dollar_folds_carry_equity_forward(self):
+        self.assert_stitched_like_sequential_runs(self.combinations('fixed_dollar', 4000))
+
+    def test_fixed_percentage_folds_carry_equity_forward(self):
+        self.assert_stitched_like_sequential_runs(self.combinations('fixed_percentage', 50))
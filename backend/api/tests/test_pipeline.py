@@ -0,0 +1,94 @@
+# backend/api/tests/test_pipeline.py
+import contextlib
+import copy
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from api import backtest_service, pipeline
+from api.backtest_service import load_market_data
+from api.pipeline import clear_stage_caches, market_data_key, run_staged_backtest
+from api.tests.fixtures import RSI_STRATEGY, quiet
+
+BTC_2020 = ('BTCUSDT', '2020-01-01', '2021-01-01', '4h')
+
+
+def strategy(**changes):
+    config = copy.deepcopy(RSI_STRATEGY)
+    config.update(changes)
+    return config
+
+
+class StageCacheTests(SimpleTestCase):
+    def setUp(self):
+        clear_stage_caches()
+        with quiet():
+            self.data, _ = load_market_data(*BTC_2020)
+        self.data_key = market_data_key(*BTC_2020)
+
+    def run_counting(self, config, cash=10000, leverage=1, data_key=None):
+        """Run a staged backtest; returns (results, {stage: times it was computed})."""
+        stages = {'indicators': 'prepare_indicators', 'signals': 'generate_signals', 'simulation': 'normalized_simulation'}
+        with contextlib.ExitStack() as stack:
+            mocks = {
+                stage: stack.enter_context(mock.patch.object(pipeline, name, wraps=getattr(pipeline, name)))
+                for stage, name in stages.items()
+            }
+            stack.enter_context(quiet())
+            results = run_staged_backtest(self.data, config, cash, leverage, data_key or self.data_key)
+        return results, {stage: calls.call_count for stage, calls in mocks.items()}
+
+    def test_market_data_is_loaded_once_per_data_key(self):
+        with mock.patch.object(backtest_service, 'fetch_market_data', wraps=backtest_service.fetch_market_data) as fetch, \
+                quiet():
+            load_market_data(*BTC_2020)
+            load_market_data('btcusdt', '2020-01-01', '2021-01-01', '4h')
+            self.assertEqual(fetch.call_count, 0)
+            load_market_data('BTCUSDT', '2020-01-01', '2020-12-01', '4h')
+            self.assertEqual(fetch.call_count, 1)
+
+    def test_a_repeated_backtest_reuses_every_stage(self):
+        first, computed = self.run_counting(RSI_STRATEGY)
+        self.assertEqual(computed, {'indicators': 1, 'signals': 1, 'simulation': 1})
+        again, computed = self.run_counting(RSI_STRATEGY)
+        self.assertEqual(computed, {'indicators': 0, 'signals': 0, 'simulation': 0})
+        self.assertEqual(again['stats'], first['stats'])
+
+    def test_changing_the_cash_only_rescales_the_cached_simulation(self):
+        self.run_counting(RSI_STRATEGY, cash=10000)
+        rescaled, computed = self.run_counting(RSI_STRATEGY, cash=25000)
+        self.assertEqual(computed, {'indicators': 0, 'signals': 0, 'simulation': 0})
+
+        clear_stage_caches()
+        fresh, _ = self.run_counting(RSI_STRATEGY, cash=25000)
+        self.assertEqual(rescaled['stats'], fresh['stats'])
+
+    def test_changing_the_exits_or_leverage_reuses_the_signals(self):
+        self.run_counting(RSI_STRATEGY)
+        exits = {'stopLoss': {'type': 'fixed_percentage', 'value': 3}, 'takeProfit': {'type': 'fixed_percentage', 'value': 10}}
+        _, computed = self.run_counting(strategy(exitCondition=exits))
+        self.assertEqual(computed, {'indicators': 0, 'signals': 0, 'simulation': 1})
+        _, computed = self.run_counting(RSI_STRATEGY, leverage=2)
+        self.assertEqual(computed, {'indicators': 0, 'signals': 0, 'simulation': 1})
+
+    def test_changing_the_conditions_reuses_only_the_indicators(self):
+        self.run_counting(RSI_STRATEGY)
+        conditions = [{'indicator': 'RSI', 'operator': 'less_than', 'value': '35'}]
+        _, computed = self.run_counting(strategy(conditions=conditions))
+        self.assertEqual(computed, {'indicators': 0, 'signals': 1, 'simulation': 1})
+        _, computed = self.run_counting(strategy(action='SHORT'))
+        self.assertEqual(computed, {'indicators': 0, 'signals': 1, 'simulation': 1})
+
+    def test_other_data_recomputes_every_stage(self):
+        self.run_counting(RSI_STRATEGY)
+        _, computed = self.run_counting(RSI_STRATEGY, data_key=market_data_key('BTCUSDT', '2020-01-01', '2021-01-02', '4h'))
+        self.assertEqual(computed, {'indicators': 1, 'signals': 1, 'simulation': 1})
+
+    def test_frames_without_a_data_key_are_fingerprinted(self):
+        with quiet():
+            run_staged_backtest(self.data, RSI_STRATEGY, 10000, 1)
+        with mock.patch.object(pipeline, 'prepare_indicators', side_effect=AssertionError('recomputed')), quiet():
+            run_staged_backtest(self.data.copy(), RSI_STRATEGY, 10000, 1)
+        with mock.patch.object(pipeline, 'prepare_indicators', wraps=pipeline.prepare_indicators) as indicators, quiet():
+            run_staged_backtest(self.data.iloc[1:], RSI_STRATEGY, 10000, 1)
+        self.assertEqual(indicators.call_count, 1)
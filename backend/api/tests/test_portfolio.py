@@ -0,0 +1,60 @@
+# backend/api/tests/test_portfolio.py
+import pandas as pd
+from django.test import SimpleTestCase
+
+from api.portfolio import CASH_BUFFER, MultiAssetSimulator, align_assets
+
+NO_EXITS = {}
+
+
+def asset(closes, signals, start='2020-01-01', freq='4h'):
+    """A frame of closes and its signals, on `freq` bars from `start` (None closes are bars without data)."""
+    index = pd.date_range(start, periods=len(closes), freq=freq)
+    frame = pd.DataFrame({'Close': closes}, index=index).dropna()
+    return frame, pd.Series(signals, index=index).loc[frame.index]
+
+
+def simulate(assets, cash=10000, leverage=1, entry_condition=None):
+    _, frames, signals = align_assets([frame for frame, _ in assets], [signals for _, signals in assets])
+    simulator = MultiAssetSimulator(frames, signals, [f"ASSET{n}" for n in range(len(assets))], cash, leverage,
+                                    NO_EXITS, entry_condition)
+    simulator.simulate()
+    return simulator
+
+
+class MultiAssetSimulatorTests(SimpleTestCase):
+    def test_entries_asking_for_more_than_the_cash_are_scaled_down_together(self):
+        first = asset([100, 100, 100], ['LONG', 'HOLD', 'HOLD'])
+        second = asset([50, 50, 50], ['SHORT', 'HOLD', 'HOLD'])
+        simulator = simulate([first, second], entry_condition={'positionSizing': 'fixed_dollar', 'sizingValue': 8000})
+
+        entries = [trade for trade in simulator.trades if trade['pnl'] is None]
+        self.assertEqual([trade['type'] for trade in entries], ['LONG', 'SHORT'])
+        for trade in entries:
+            self.assertAlmostEqual(trade['position_size'], 8000 * 10000 * CASH_BUFFER / 16000)
+        self.assertAlmostEqual(simulator.equity_curve[-1], 10000)
+
+    def test_a_margin_call_closes_every_position_once_the_shared_equity_is_gone(self):
+        first = asset([100, 70, 70, 80], ['LONG', 'HOLD', 'HOLD', 'LONG'])
+        second = asset([100, 70, 70, 80], ['LONG', 'HOLD', 'HOLD', 'HOLD'])
+        entry_condition = {'positionSizing': 'fixed_percentage', 'sizingValue': 40}
+        simulator = simulate([first, second], leverage=10, entry_condition=entry_condition)
+
+        self.assertEqual(simulator.margin_calls, 1)
+        called = [trade for trade in simulator.trades if trade['exit_reason'] == 'Margin Call']
+        self.assertEqual([trade['type'] for trade in called], ['MARGIN CALL LONG', 'MARGIN CALL LONG'])
+        self.assertEqual([trade['date'] for trade in called], [first[0].index[1]] * 2)
+        # No cash is left to enter again, and the curve stays at zero
+        self.assertEqual(len(simulator.trades), 4)
+        self.assertEqual(simulator.equity_curve[1:], [0.0, 0.0, 0.0])
+
+    def test_positions_are_marked_at_their_last_close_on_bars_without_data(self):
+        steady = asset([50] * 6, ['HOLD'] * 6)
+        sparse = asset([100, None, 120, None, 150, None], ['LONG', 'HOLD', 'HOLD', 'HOLD', 'HOLD', 'HOLD'])
+        simulator = simulate([steady, sparse], entry_condition={'positionSizing': 'fixed_dollar', 'sizingValue': 1000})
+
+        for equity, expected in zip(simulator.equity_curve, [10000, 10000, 10200, 10200, 10500, 10500]):
+            self.assertAlmostEqual(equity, expected)
+        exit_trade = simulator.trades[-1]
+        self.assertEqual((exit_trade['ticker'], exit_trade['type'], exit_trade['price']), ('ASSET1', 'EXIT LONG', 150.0))
+        self.assertAlmostEqual(exit_trade['pnl'], 500)
@@ -0,0 +1,72 @@
+# backend/api/tests/test_pyramid.py
+import numpy as np
+from django.test import SimpleTestCase
+
+from api.pyramid import (
+    PYRAMID_FACTOR, TILE_BUCKETS, build_pyramid, pyramid_tiles, decode_tile, level_for_budget, window_points,
+)
+
+
+def pyramid_of(n_bars, seed=0):
+    minutes = np.arange(n_bars, dtype=np.int64) * 240
+    equity = 10000 + np.cumsum(np.random.default_rng(seed).normal(0, 10, n_bars))
+    close = np.full(n_bars, np.nan)
+    close[:n_bars // 2] = 100.0 + np.arange(n_bars // 2)
+    return minutes, equity, close, build_pyramid(minutes, {'equity': equity, 'close': close})
+
+
+class BuildPyramidTests(SimpleTestCase):
+    def test_each_level_merges_pyramid_factor_buckets(self):
+        _, _, _, levels = pyramid_of(1000)
+        self.assertEqual([len(level) for level in levels], [1000, 250, 63, 16, 4])
+
+    def test_every_level_keeps_the_extremes_and_their_minutes(self):
+        minutes, equity, _, levels = pyramid_of(1000)
+        for level in levels:
+            self.assertEqual(level['equity_low'].min(), equity.min())
+            self.assertEqual(level['equity_high'].max(), equity.max())
+            high = int(np.argmax(level['equity_high']))
+            self.assertEqual(level['equity_high_at'][high], minutes[int(np.argmax(equity))])
+
+    def test_buckets_without_data_stay_nan(self):
+        _, _, close, levels = pyramid_of(1000)
+        # 256 bars per top-level bucket; close only has data in the first 500 bars
+        top = levels[-1]
+        self.assertEqual(top['close_high'][:2].tolist(), [close[255], np.nanmax(close)])
+        self.assertTrue(np.isnan(top['close_low'][2:]).all())
+
+    def test_tiles_decode_back_to_their_level(self):
+        _, _, _, levels = pyramid_of(3000)
+        tiles = [tile for tile in pyramid_tiles(levels) if tile[0] == 0]
+        self.assertEqual(len(tiles), -(-3000 // TILE_BUCKETS))
+        decoded = np.concatenate([decode_tile(payload, ('equity', 'close')) for _, _, _, payload in tiles])
+        np.testing.assert_array_equal(decoded['equity_low'], levels[0]['equity_low'])
+        self.assertEqual(tiles[1][1], int(levels[0]['start'][TILE_BUCKETS]))
+
+
+class LevelForBudgetTests(SimpleTestCase):
+    def test_the_finest_level_within_the_budget_is_chosen(self):
+        self.assertEqual(level_for_budget(500, 1000), 0)
+        self.assertEqual(level_for_budget(501, 1000), 1)
+        self.assertEqual(level_for_budget(100000, 2000), 4)
+        for bars, budget in ((100000, 2000), (7, 10), (1, 10)):
+            level = level_for_budget(bars, budget)
+            self.assertLessEqual(2 * -(-bars // PYRAMID_FACTOR ** level), budget)
+
+
+class WindowPointsTests(SimpleTestCase):
+    def test_points_are_the_lows_and_highs_inside_the_window_in_time_order(self):
+        minutes, equity, _, levels = pyramid_of(1000)
+        points = window_points(levels[1], ('equity', 'close'), 240 * 100, 240 * 199)
+
+        point_minutes, values = points['equity']
+        self.assertTrue(np.all(np.diff(point_minutes) > 0))
+        self.assertTrue(np.all((point_minutes >= 240 * 100) & (point_minutes <= 240 * 199)))
+        inside = equity[100:200]
+        self.assertEqual((values.min(), values.max()), (inside.min(), inside.max()))
+        self.assertLessEqual(len(point_minutes), 2 * 25)
+
+    def test_series_without_data_in_the_window_are_empty(self):
+        _, _, _, levels = pyramid_of(1000)
+        close_minutes, _ = window_points(levels[0], ('equity', 'close'), 240 * 600, 240 * 700)['close']
+        self.assertEqual(len(close_minutes), 0)
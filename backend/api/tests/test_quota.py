@@ -0,0 +1,109 @@
+# backend/api/tests/test_quota.py
+from django.test import TestCase
+from django.utils import timezone
+
+from api.backtest_service import (
+    BacktestError, MAX_SAVED_BACKTESTS, reserved_backtest, save_backtest, check_daily_backtest_limit,
+)
+from api.models import Backtest, DailyUsage
+from api.quota import usage_cache, usage_today, consume_backtest, refund_backtest
+from api.tests.fixtures import make_user, quiet
+
+
+def used(user):
+    return DailyUsage.objects.get(user=user, day=timezone.localdate()).backtests
+
+
+class QuotaTests(TestCase):
+    def setUp(self):
+        usage_cache.clear()
+        self.user = make_user()
+
+    def test_usage_is_zero_without_a_row(self):
+        self.assertEqual(usage_today(self.user), 0)
+
+    def test_usage_is_read_through_the_cache(self):
+        consume_backtest(self.user)
+        self.assertEqual(usage_today(self.user), 1)
+        DailyUsage.objects.filter(user=self.user).update(backtests=7)
+        self.assertEqual(usage_today(self.user), 1)
+
+    def test_consuming_stops_at_the_limit(self):
+        self.assertTrue(consume_backtest(self.user, limit=2))
+        self.assertTrue(consume_backtest(self.user, limit=2))
+        self.assertFalse(consume_backtest(self.user, limit=2))
+        self.assertEqual(used(self.user), 2)
+        # A refusal caches the limit, so the next admission check fails without a query
+        self.assertEqual(usage_today(self.user), 2)
+
+    def test_consuming_without_a_limit_always_counts(self):
+        DailyUsage.objects.create(user=self.user, day=timezone.localdate(), backtests=500)
+        self.assertTrue(consume_backtest(self.user))
+        self.assertEqual(used(self.user), 501)
+
+    def test_refund_gives_a_backtest_back_but_never_goes_negative(self):
+        consume_backtest(self.user)
+        refund_backtest(self.user)
+        refund_backtest(self.user)
+        self.assertEqual(used(self.user), 0)
+        self.assertEqual(usage_today(self.user), 0)
+
+
+class ReservedBacktestTests(TestCase):
+    def setUp(self):
+        usage_cache.clear()
+        self.user = make_user(tier='free')
+
+    def test_a_completed_run_keeps_its_reservation(self):
+        with reserved_backtest(self.user):
+            pass
+        self.assertEqual(used(self.user), 1)
+
+    def test_a_failed_run_is_refunded(self):
+        with self.assertRaises(ValueError):
+            with reserved_backtest(self.user):
+                raise ValueError('engine failed')
+        self.assertEqual(used(self.user), 0)
+
+    def test_reservations_past_the_limit_are_refused(self):
+        limit = self.user.profile.get_daily_backtest_limit()
+        DailyUsage.objects.create(user=self.user, day=timezone.localdate(), backtests=limit)
+
+        with self.assertRaises(BacktestError) as raised:
+            with reserved_backtest(self.user):
+                self.fail('A run past the limit must not start')
+        self.assertEqual(raised.exception.status_code, 429)
+        self.assertEqual(used(self.user), limit)
+
+        with self.assertRaises(BacktestError):
+            check_daily_backtest_limit(self.user)
+
+
+class SaveBacktestTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.params = {
+            'ticker': 'btcusdt', 'start_date': '2020-01-01', 'end_date': '2020-02-01',
+            'timeframe': '4h', 'cash': 10000, 'leverage': 1,
+        }
+        self.results = {
+            'stats': {'Return [%]': '1.50', 'Equity Final [$]': '10,150.00', '# Trades': 1},
+            'plot_data': {'equity_curve': [10000.0, 10150.0], 'dates': ['2020-01-01 00:00', '2020-01-01 04:00']},
+            'trades': [],
+        }
+
+    def test_saving_does_not_count_against_the_daily_limit(self):
+        with quiet():
+            save_backtest(self.user, 'RSI dip', self.params, self.results)
+        self.assertFalse(DailyUsage.objects.filter(user=self.user).exists())
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.total_backtests, 1)
+
+    def test_only_the_newest_backtests_are_kept(self):
+        with quiet():
+            saved = [save_backtest(self.user, f'Run {n}', self.params, self.results) for n in range(MAX_SAVED_BACKTESTS + 3)]
+
+        kept = list(Backtest.objects.filter(user=self.user).order_by('id').values_list('id', flat=True))
+        self.assertEqual(kept, [backtest.id for backtest in saved[-MAX_SAVED_BACKTESTS:]])
+        self.assertEqual(saved[-1].ticker, 'BTCUSDT')
+        self.assertEqual(saved[-1].heavy_results()['plot_data']['equity_curve'], [10000.0, 10150.0])
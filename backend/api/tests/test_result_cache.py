@@ -0,0 +1,182 @@
+# backend/api/tests/test_result_cache.py
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from api.result_cache import ResultCache, SharedSingleFlight, SingleFlight, canonical_request_hash
+
+# A process-local stand-in for the shared 'backtests' cache: two SharedSingleFlight
+# instances play two processes
+LOCAL_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'backtests': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'shared-flight-tests'},
+}
+
+
+class CanonicalRequestHashTests(SimpleTestCase):
+    def test_key_order_and_spelling_do_not_matter(self):
+        first = canonical_request_hash({'a': 1, 'b': [1, 2]}, 'btcusdt ', '4h', '2020-01-01', '2021-01-01', 10000, 2)
+        second = canonical_request_hash({'b': [1, 2], 'a': 1}, 'BTCUSDT', '4h', '2020-01-01', '2021-01-01', 10000.0, 2.0)
+        self.assertEqual(first, second)
+
+    def test_every_input_changes_the_key(self):
+        base = ({'a': 1}, 'BTCUSDT', '4h', '2020-01-01', '2021-01-01', 10000, 1)
+        keys = {canonical_request_hash(*base)}
+        for position, value in enumerate(({'a': 2}, 'ETHUSDT', '1h', '2019-01-01', '2022-01-01', 5000, 2)):
+            changed = list(base)
+            changed[position] = value
+            keys.add(canonical_request_hash(*changed))
+        self.assertEqual(len(keys), 8)
+
+
+class ResultCacheTests(SimpleTestCase):
+    def test_least_recently_used_entries_are_evicted_by_size(self):
+        cache = ResultCache(max_bytes=30, ttl=60)
+        cache.set('a', 'A', size=10)
+        cache.set('b', 'B', size=10)
+        cache.set('c', 'C', size=10)
+        cache.get('a')
+        cache.set('d', 'D', size=10)
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual([cache.get(key) for key in 'acd'], ['A', 'C', 'D'])
+        self.assertEqual(cache.stats()['bytes'], 30)
+
+    def test_values_larger_than_the_cache_are_not_stored(self):
+        cache = ResultCache(max_bytes=10, ttl=60)
+        cache.set('big', 'x', size=11)
+        self.assertIsNone(cache.get('big'))
+        self.assertEqual(cache.stats()['entries'], 0)
+
+    def test_entries_expire_after_the_ttl(self):
+        cache = ResultCache(max_bytes=100, ttl=5)
+        with mock.patch('api.result_cache.time.monotonic', return_value=1000.0):
+            cache.set('key', 'value', size=1)
+        with mock.patch('api.result_cache.time.monotonic', return_value=1004.0):
+            self.assertEqual(cache.get('key'), 'value')
+        with mock.patch('api.result_cache.time.monotonic', return_value=1006.0):
+            self.assertIsNone(cache.get('key'))
+        self.assertEqual(cache.stats()['bytes'], 0)
+
+    def test_replacing_and_discarding_keep_the_byte_count(self):
+        cache = ResultCache(max_bytes=100, ttl=60)
+        cache.set('key', 'old', size=40)
+        cache.set('key', 'new', size=25)
+        self.assertEqual(cache.stats()['bytes'], 25)
+        cache.discard('key')
+        cache.discard('missing')
+        self.assertEqual(cache.stats(), {'entries': 0, 'bytes': 0, 'max_bytes': 100, 'hits': 0, 'misses': 0})
+
+
+class SingleFlightTests(SimpleTestCase):
+    def run_concurrently(self, flight, func, release, callers=5):
+        """
+        Call flight.do('key', func) from `callers` threads, set `release` (which
+        func waits for) once they have all called, and return their outcomes.
+        """
+        outcomes = []
+        entered = threading.Semaphore(0)
+
+        def call():
+            entered.release()
+            try:
+                outcomes.append(flight.do('key', func))
+            except Exception as e:
+                outcomes.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(callers)]
+        for thread in threads:
+            thread.start()
+        for _ in threads:
+            entered.acquire(timeout=5)
+        time.sleep(0.05)  # Let the last callers reach the wait
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        return outcomes
+
+    def test_concurrent_callers_share_one_call(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            release.wait(5)
+            return 'result'
+
+        outcomes = self.run_concurrently(flight, compute, release)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(outcomes, ['result'] * 5)
+        # Once it has finished the next call computes again
+        self.assertEqual(flight.do('key', lambda: 'again'), 'again')
+
+    def test_errors_reach_every_waiting_caller(self):
+        flight = SingleFlight()
+        release = threading.Event()
+
+        def fail():
+            release.wait(5)
+            raise ValueError('engine failed')
+
+        outcomes = self.run_concurrently(flight, fail, release, callers=3)
+
+        self.assertEqual(len(outcomes), 3)
+        self.assertTrue(all(isinstance(outcome, ValueError) for outcome in outcomes))
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class SharedSingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        caches['backtests'].clear()
+
+    def flight(self):
+        return SharedSingleFlight(lock_timeout=5, poll_interval=0.01)
+
+    def test_results_are_shared_with_other_processes(self):
+        self.assertEqual(self.flight().do('key', lambda: {'stats': 1}), {'stats': 1})
+        self.assertEqual(self.flight().do('key', mock.Mock(side_effect=AssertionError('ran again'))), {'stats': 1})
+
+    def test_unshared_results_are_run_again(self):
+        self.flight().do('key', lambda: {'error': 'boom'}, share=lambda result: 'error' not in result)
+        self.assertEqual(self.flight().do('key', lambda: 'again'), 'again')
+
+    def test_callers_wait_for_the_process_holding_the_key(self):
+        leader = self.flight()
+        release = threading.Event()
+        started = threading.Event()
+        outcomes = []
+
+        def compute():
+            started.set()
+            release.wait(5)
+            return 'result'
+
+        thread = threading.Thread(target=lambda: outcomes.append(leader.do('key', compute)))
+        thread.start()
+        started.wait(5)
+
+        follower = threading.Thread(
+            target=lambda: outcomes.append(self.flight().do('key', mock.Mock(side_effect=AssertionError('ran twice'))))
+        )
+        follower.start()
+        time.sleep(0.05)
+        release.set()
+        thread.join(5)
+        follower.join(5)
+        self.assertEqual(outcomes, ['result', 'result'])
+
+    def test_a_lock_released_without_a_result_is_taken_over(self):
+        caches['backtests'].add('lock:key', 'elsewhere')
+        threading.Timer(0.05, caches['backtests'].delete, ['lock:key']).start()
+        self.assertEqual(self.flight().do('key', lambda: 'taken over'), 'taken over')
+
+    def test_calls_run_unshared_when_the_cache_is_unavailable(self):
+        with mock.patch.object(caches['backtests'], 'add', side_effect=RuntimeError('no table')), \
+                mock.patch.object(caches['backtests'], 'get', side_effect=RuntimeError('no table')), \
+                self.assertLogs('api.result_cache', 'WARNING'):
+            self.assertEqual(self.flight().do('key', lambda: 'unshared'), 'unshared')
@@ -0,0 +1,51 @@
+# backend/api/tests/test_scheduler.py
+from django.test import TestCase
+
+from api.scheduler import TierScheduler
+from api.tests.fixtures import make_user, make_job
+
+
+class TierSchedulerTests(TestCase):
+    def test_tiers_are_served_in_proportion_to_their_weights(self):
+        scheduler = TierScheduler(weights={'premium': 4, 'pro': 2, 'free': 1})
+        served = []
+        for _ in range(14):
+            tier = scheduler.tier_order()[0]
+            served.append(tier)
+            scheduler.charge(tier)
+        self.assertEqual({tier: served.count(tier) for tier in set(served)}, {'premium': 8, 'pro': 4, 'free': 2})
+
+    def test_idle_tiers_do_not_bank_credit(self):
+        scheduler = TierScheduler(weights={'premium': 4, 'free': 1})
+        scheduler.idle = {'free'}
+        for _ in range(8):
+            scheduler.charge('premium')
+        # Free was idle while premium ran 8 jobs; it now gets its share, not 2 jobs in a row
+        self.assertEqual(scheduler.tier_order()[0], 'free')
+        scheduler.idle = set()
+        scheduler.charge('free')
+        self.assertEqual(scheduler.tier_order()[0], 'premium')
+
+    def test_users_of_a_tier_are_served_round_robin(self):
+        alice, bob = make_user('alice', tier='pro'), make_user('bob', tier='pro')
+        alice_jobs = [make_job(alice, age_seconds=age) for age in (50, 40, 30)]
+        bob_job = make_job(bob, age_seconds=10)
+
+        order = [job.id for job in TierScheduler().candidates()]
+        self.assertEqual(order, [alice_jobs[0].id, bob_job.id, alice_jobs[1].id, alice_jobs[2].id])
+
+    def test_users_at_their_concurrency_limit_are_skipped(self):
+        free_user, pro_user = make_user('free', tier='free'), make_user('pro', tier='pro')
+        make_job(free_user, status='running')
+        make_job(free_user, age_seconds=60)
+        pro_job = make_job(pro_user)
+
+        self.assertEqual([job.id for job in TierScheduler().candidates()], [pro_job.id])
+
+    def test_higher_tiers_are_offered_first_and_empty_tiers_marked_idle(self):
+        free_job = make_job(make_user('free', tier='free'), age_seconds=60)
+        premium_job = make_job(make_user('premium', tier='premium'))
+
+        scheduler = TierScheduler()
+        self.assertEqual([job.id for job in scheduler.candidates()], [premium_job.id, free_job.id])
+        self.assertEqual(scheduler.idle, {'pro'})
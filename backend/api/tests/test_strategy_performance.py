@@ -0,0 +1,65 @@
+# backend/api/tests/test_strategy_performance.py
+from datetime import date
+
+from django.test import TestCase
+
+from api.models import Backtest, StrategyPerformance
+from api.tests.fixtures import make_user
+
+
+class StrategyPerformanceTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+
+    def backtest(self, return_pct, strategy_name='RSI dip', user=None):
+        return Backtest.objects.create(
+            user=user or self.user, strategy_name=strategy_name, ticker='BTCUSDT', timeframe='4h',
+            start_date=date(2020, 1, 1), end_date=date(2021, 1, 1), initial_cash=10000, leverage=1,
+            results={}, return_pct=return_pct,
+        )
+
+    def totals(self, strategy_name='RSI dip', user=None):
+        row = StrategyPerformance.objects.get(user=user or self.user, strategy_name=strategy_name)
+        return row.backtest_count, row.return_count, row.win_count, row.total_return, row.best_return
+
+    def recomputed(self, strategy_name='RSI dip', user=None):
+        """The totals the receivers should have kept, from the Backtest rows themselves."""
+        returns = list(Backtest.objects.filter(user=user or self.user, strategy_name=strategy_name)
+                       .values_list('return_pct', flat=True))
+        known = [value for value in returns if value is not None]
+        return len(returns), len(known), sum(1 for value in known if value > 0), sum(known), max(known, default=None)
+
+    def test_saved_backtests_are_added_to_their_strategy(self):
+        for return_pct in (12.5, -4.0, None, 7.5):
+            self.backtest(return_pct)
+        self.assertEqual(self.totals(), (4, 3, 2, 16.0, 12.5))
+
+        row = StrategyPerformance.objects.get(user=self.user)
+        self.assertAlmostEqual(row.avg_return, 16.0 / 3)
+        self.assertAlmostEqual(row.win_rate, 2 / 3 * 100)
+
+    def test_deleting_the_best_backtest_looks_up_the_next_best(self):
+        best = self.backtest(12.5)
+        self.backtest(7.5)
+        self.backtest(-4.0)
+        best.delete()
+        self.assertEqual(self.totals(), (2, 2, 1, 3.5, 7.5))
+
+    def test_deleting_the_last_backtest_removes_the_row(self):
+        self.backtest(5.0).delete()
+        self.assertFalse(StrategyPerformance.objects.exists())
+
+    def test_bulk_deletes_like_pruning_keep_the_totals(self):
+        backtests = [self.backtest(return_pct) for return_pct in (3.0, -1.0, 8.0, None, 2.0, -6.0)]
+        Backtest.objects.filter(id__in=[backtests[0].id, backtests[2].id, backtests[3].id]).delete()
+        self.assertEqual(self.totals(), self.recomputed())
+        self.assertEqual(self.totals(), (3, 3, 1, -5.0, 2.0))
+
+    def test_strategies_and_users_are_kept_apart(self):
+        other_user = make_user('other')
+        self.backtest(10.0)
+        self.backtest(-2.0, strategy_name='MACD cross')
+        self.backtest(4.0, user=other_user)
+        self.assertEqual(self.totals(), (1, 1, 1, 10.0, 10.0))
+        self.assertEqual(self.totals('MACD cross'), (1, 1, 0, -2.0, -2.0))
+        self.assertEqual(self.totals(user=other_user), (1, 1, 1, 4.0, 4.0))
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import RegisterView, ProfileView, StrategyViewSet, BacktestView, RecentBacktestsView, AvailableDataView, VerifyEmailView, ResendVerificationEmailView, DashboardStatsView, UserTimeframesView, UserTickersView
+from .views import RegisterView, ProfileView, StrategyViewSet, BacktestView, LeverageSweepView, PortfolioBacktestView, OptimizeView, WalkForwardView, BatchBacktestView, BacktestJobView, BacktestJobStatusView, BacktestJobResultView, BatchDatasetResultView, BacktestQueueStatsView, RecentBacktestsView, BacktestDetailView, BacktestChartRangeView, ChartDataView, AvailableDataView, VerifyEmailView, ResendVerificationEmailView, DashboardStatsView, UserTimeframesView, UserTickersView
 
 # Create a router and register our viewsets with it.
 router = DefaultRouter()
@@ -15,7 +15,20 @@ urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
     path('profile/', ProfileView.as_view(), name='profile'),
     path('backtest/', BacktestView.as_view(), name='backtest'),
+    path('backtest/leverage-sweep/', LeverageSweepView.as_view(), name='leverage-sweep'),
+    path('backtest/portfolio/', PortfolioBacktestView.as_view(), name='portfolio-backtest'),
+    path('backtest/optimize/', OptimizeView.as_view(), name='optimize'),
+    path('backtest/walk-forward/', WalkForwardView.as_view(), name='walk-forward'),
+    path('backtest/batch/', BatchBacktestView.as_view(), name='batch-backtest'),
+    path('backtest-jobs/', BacktestJobView.as_view(), name='backtest-jobs'),
+    path('backtest-jobs/queue-stats/', BacktestQueueStatsView.as_view(), name='backtest-queue-stats'),
+    path('backtest-jobs/<uuid:job_id>/', BacktestJobStatusView.as_view(), name='backtest-job-status'),
+    path('backtest-jobs/<uuid:job_id>/result/', BacktestJobResultView.as_view(), name='backtest-job-result'),
+    path('backtest-jobs/<uuid:job_id>/result/<str:ticker>/<str:timeframe>/', BatchDatasetResultView.as_view(), name='batch-dataset-result'),
     path('recent-backtests/', RecentBacktestsView.as_view(), name='recent-backtests'),
+    path('backtests/<int:backtest_id>/', BacktestDetailView.as_view(), name='backtest-detail'),
+    path('backtests/<int:backtest_id>/range/', BacktestChartRangeView.as_view(), name='backtest-chart-range'),
+    path('chart-data/', ChartDataView.as_view(), name='chart-data'),
     path('available-data/', AvailableDataView.as_view(), name='available-data'),
     path('user-timeframes/', UserTimeframesView.as_view(), name='user-timeframes'),
     path('user-tickers/', UserTickersView.as_view(), name='user-tickers'),
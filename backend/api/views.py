@@ -1,6 +1,5 @@
 import os
 from datetime import datetime, timedelta
-import pandas as pd
 import numpy as np
 
 from rest_framework.views import APIView
@@ -11,39 +10,44 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework import generics
 
 from django.contrib.auth.models import User
+from django.http import StreamingHttpResponse
 from django.utils import timezone
-from .models import Strategy, Backtest, UserProfile, EmailVerification
-from .serializers import UserSerializer, StrategySerializer, BacktestSerializer, EmailVerificationSerializer
-from .backtester import run_backtest
-from .csv_data_loader import load_csv_data, get_available_tickers, get_available_timeframes
+from .models import Strategy, Backtest, StrategyPerformance, UserProfile, EmailVerification, BacktestJob, BatchBacktestResult
+from .serializers import UserSerializer, StrategySerializer, BacktestSerializer, EmailVerificationSerializer, BacktestJobSerializer
+from .backtest_service import (
+    BacktestError, parse_backtest_params, parse_sweep_leverages, execute_backtest, execute_leverage_sweep,
+    parse_optimization_params, parse_walk_forward_params, parse_batch_params,
+    batch_summary, parse_portfolio_tickers, execute_portfolio_backtest, parse_max_points, parse_chart_range,
+    chart_range, parse_chart_data_params, chart_data,
+)
+from .chart_data import chart_json, chart_binary_chunks
+from .downsampling import downsample_results, downsample_curves
+from .artifacts import split_results
+from .streaming import NDJSON_CONTENT_TYPE, wants_stream, result_lines
+from .jobs import submit_backtest_job
+from .scheduler import get_queue_stats
+from .csv_data_loader import get_available_tickers, get_available_timeframes
 from .email_utils import send_verification_email, send_welcome_email
 
-def fetch_csv_data(ticker, start_date, end_date, timeframe):
-    """Fetch data from local CSV files"""
-    try:
-        data, data_range_info = load_csv_data(ticker, start_date, end_date, timeframe)
-        return data, data_range_info
-    except Exception as e:
-        raise ValueError(f"CSV data loading error: {str(e)}")
+def job_accepted(job, created, **extra):
+    """The 202 response to a queued job: where to poll for its status and result."""
+    return Response({
+        'job_id': str(job.id),
+        'status': job.status,
+        'coalesced': not created,
+        **extra,
+        'status_url': f"/api/backtest-jobs/{job.id}/",
+        'result_url': f"/api/backtest-jobs/{job.id}/result/",
+    }, status=status.HTTP_202_ACCEPTED)
 
 
+def ndjson_response(lines):
+    """Stream NDJSON lines (see streaming), asking proxies not to buffer them."""
+    response = StreamingHttpResponse(lines, content_type=NDJSON_CONTENT_TYPE)
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
-
-def fetch_market_data(ticker, start_date, end_date, timeframe):
-    """
-    Fetch market data from local CSV files.
-    """
-    try:
-        print(f"Loading CSV data for {ticker}")
-        data, data_range_info = fetch_csv_data(ticker, start_date, end_date, timeframe)
-        print(f"Successfully loaded CSV data: {data.shape}")
-        return data, data_range_info
-    except Exception as e:
-        error_msg = f"CSV data loading failed: {str(e)}"
-        print(error_msg)
-        raise ValueError(error_msg)
-
 # ... (The rest of your views: RegisterView, ProfileView, StrategyViewSet, etc.) ...
 
 
@@ -259,243 +263,268 @@ class BacktestView(APIView):
 
     def post(self, request, *args, **kwargs):
         try:
-            strategy_id = request.data.get('strategy_id')
-            ticker = request.data.get('ticker', 'AAPL')
-            start_date = request.data.get('start_date', '2022-01-01')
-            end_date = request.data.get('end_date', '2023-01-01')
-            timeframe = request.data.get('timeframe', 'day') # Polygon uses 'day', 'hour', 'minute'
-            cash = int(request.data.get('cash', 10000))
-            leverage = float(request.data.get('leverage', 1.0))
+            params = parse_backtest_params(request.data)
+            max_points = parse_max_points(request.data)
 
-            # Validate inputs
-            if not strategy_id:
-                return Response({"error": "Strategy ID is required."}, status=status.HTTP_400_BAD_REQUEST)
-            
-            if cash <= 0:
-                return Response({"error": "Initial cash must be positive."}, status=status.HTTP_400_BAD_REQUEST)
-            
-            if leverage < 1.0 or leverage > 10.0:
-                return Response({"error": "Leverage must be between 1x and 10x."}, status=status.HTTP_400_BAD_REQUEST)
-            
-            if not ticker or not ticker.strip():
-                return Response({"error": "Ticker symbol is required."}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                strategy = Strategy.objects.get(id=params['strategy_id'], user=request.user)
+            except Strategy.DoesNotExist:
+                return Response({"error": "Strategy not found."}, status=status.HTTP_404_NOT_FOUND)
+
+            results, backtest = execute_backtest(request.user, strategy.name, strategy.configuration, params)
+
+            if wants_stream(request.data):
+                # Streams send the full curve unless a point budget is asked for
+                if 'max_points' in request.data:
+                    results = downsample_results(results, max_points)
+                light, heavy = split_results(results)
+                header = {'backtest_id': backtest.id if backtest else None}
+                return ndjson_response(result_lines(light, lambda: heavy, header))
+            return Response(downsample_results(results, max_points), status=status.HTTP_200_OK)
+
+        except BacktestError as e:
+            return Response({"error": e.message}, status=e.status_code)
+        except Exception as e:
+            return Response({"error": f"Unexpected error: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class LeverageSweepView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        """Backtest a strategy at several leverages at once and return one equity curve per leverage"""
+        try:
+            params = parse_backtest_params(request.data)
+            leverages = parse_sweep_leverages(request.data)
+            max_points = parse_max_points(request.data)
 
             try:
-                strategy = Strategy.objects.get(id=strategy_id, user=request.user)
+                strategy = Strategy.objects.get(id=params['strategy_id'], user=request.user)
             except Strategy.DoesNotExist:
                 return Response({"error": "Strategy not found."}, status=status.HTTP_404_NOT_FOUND)
 
-            # --- DATA FETCHING WITH FALLBACK STRATEGY ---
+            sweep, backtest = execute_leverage_sweep(request.user, strategy.name, strategy.configuration, params, leverages)
+            curves, sweep['dates'] = downsample_curves(
+                [lane['equity_curve'] for lane in sweep['lanes']], sweep['dates'], max_points
+            )
+            for lane, curve in zip(sweep['lanes'], curves):
+                lane['equity_curve'] = curve
+            return Response(sweep, status=status.HTTP_200_OK)
+
+        except BacktestError as e:
+            return Response({"error": e.message}, status=e.status_code)
+        except Exception as e:
+            return Response({"error": f"Unexpected error: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class PortfolioBacktestView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        """Backtest a strategy on several tickers at once, sharing cash across them"""
+        try:
+            params = parse_backtest_params(request.data)
+            tickers = parse_portfolio_tickers(request.data)
+            max_points = parse_max_points(request.data)
+
             try:
-                data, data_range_info = fetch_market_data(ticker, start_date, end_date, timeframe)
-                
-                # Debug: Print the actual columns we received
-                print(f"Debug: Data columns: {list(data.columns)}")
-                print(f"Debug: Data shape: {data.shape}")
-                print(f"Debug: Sample data:\n{data.head()}")
-                print(f"Debug: Data source: {data_range_info.get('source', 'unknown')}")
-                
-                # Check if we have the required 'Close' column
-                if 'Close' not in data.columns:
-                    available_columns = list(data.columns)
-                    return Response({
-                        "error": f"Data format error: 'Close' column not found. Available columns: {available_columns}. Please check your data source."
-                    }, status=status.HTTP_400_BAD_REQUEST)
-                
-                # Ensure we have all required columns
-                required_columns = ['Open', 'High', 'Low', 'Close', 'Volume']
-                missing_columns = [col for col in required_columns if col not in data.columns]
-                if missing_columns:
-                    return Response({
-                        "error": f"Missing required columns: {missing_columns}. Available columns: {list(data.columns)}"
-                    }, status=status.HTTP_400_BAD_REQUEST)
-                
-                # Validate data quality
-                if data.empty:
-                    return Response({"error": f"No valid data found for {ticker} in the specified date range."}, status=status.HTTP_400_BAD_REQUEST)
-                
-                if len(data) < 30:  # Need at least 30 data points for indicators
-                    return Response({"error": f"Insufficient data for {ticker}. Need at least 30 data points, got {len(data)}."}, status=status.HTTP_400_BAD_REQUEST)
-                
-                # Check if the requested timeframe is allowed for the user's tier
-                user_tier = request.user.profile.tier
-                allowed_timeframes = request.user.profile.get_allowed_timeframes()
-                if timeframe not in allowed_timeframes:
-                    return Response({
-                        "error": f"Timeframe '{timeframe}' is not available for your current tier '{user_tier}'. "
-                                f"Your tier allows: {', '.join(allowed_timeframes)}. "
-                                f"Please upgrade your plan to access more timeframes."
-                    }, status=status.HTTP_403_FORBIDDEN)
-                
-                # Check if the requested ticker is allowed for the user's tier
-                allowed_tickers = request.user.profile.get_allowed_tickers()
-                if allowed_tickers is not None and ticker not in allowed_tickers:
-                    return Response({
-                        "error": f"Ticker '{ticker}' is not available for your current tier '{user_tier}'. "
-                                f"Your tier allows: {', '.join(allowed_tickers)}. "
-                                f"Please upgrade your plan to access more tickers."
-                    }, status=status.HTTP_403_FORBIDDEN)
-                
-                # Check if the requested date range matches the available data range
-                requested_start = pd.to_datetime(start_date)
-                requested_end = pd.to_datetime(end_date)
-                actual_start = pd.to_datetime(data_range_info['actual_start'])
-                actual_end = pd.to_datetime(data_range_info['actual_end'])
-
-                # Calculate the coverage of the requested range
-                requested_days = (requested_end - requested_start).days
-                actual_days = (actual_end - actual_start).days
-                
-                # Debug logging
-                print(f"Debug: Requested range: {start_date} to {end_date} ({requested_days} days)")
-                print(f"Debug: Actual data range: {data_range_info['actual_start']} to {data_range_info['actual_end']} ({actual_days} days)")
-                
-                # Calculate what percentage of the requested range we actually have
-                # We'll consider it a full range if we have at least 80% of the requested days
-                # and the actual range overlaps significantly with the requested range
-                coverage_threshold = 0.8  # 80% coverage
-                
-                # Check if the actual range significantly overlaps with the requested range
-                overlap_start = max(requested_start, actual_start)
-                overlap_end = min(requested_end, actual_end)
-                overlap_days = max(0, (overlap_end - overlap_start).days)
-                
-                # Calculate coverage percentage
-                coverage_percentage = overlap_days / requested_days if requested_days > 0 else 0
-                
-                # Debug logging
-                print(f"Debug: Overlap: {overlap_start} to {overlap_end} ({overlap_days} days)")
-                print(f"Debug: Coverage percentage: {coverage_percentage:.1%}")
-                
-                # Determine if this is a significant portion of the requested range
-                is_significant_coverage = coverage_percentage >= coverage_threshold
-                
-                # Check if we have limited overlap with the requested range
-                # This should be based on overlap, not total actual days
-                is_limited_data = overlap_days < (requested_days * 0.5)  # Less than 50% overlap
-                
-                if is_limited_data or not is_significant_coverage:
-                    # Check if there's no overlap at all
-                    if overlap_days == 0:
-                        message = f"⚠️ No data available for requested range. You requested {start_date} to {end_date}, but data is only available from {data_range_info['actual_start']} to {data_range_info['actual_end']} for {ticker}."
-                    else:
-                        message = f"⚠️ Limited data available for requested range. You requested {start_date} to {end_date} ({requested_days} days), but only {overlap_days} days overlap with available data from {data_range_info['actual_start']} to {data_range_info['actual_end']} for {ticker}."
-                    
-                    data_range_message = {
-                        'warning': True,
-                        'message': message,
-                        'requested_range': f"{start_date} to {end_date}",
-                        'available_range': f"{data_range_info['actual_start']} to {data_range_info['actual_end']}",
-                        'data_points': data_range_info['data_points'],
-                        'data_source': data_range_info['source'],
-                        'coverage_percentage': round(coverage_percentage * 100, 1),
-                        'overlap_days': overlap_days
-                    }
-                elif coverage_percentage >= 0.95:  # 95% or more coverage
-                    data_range_message = {
-                        'warning': False,
-                        'message': f"✅ Full data range available: {start_date} to {end_date}",
-                        'requested_range': f"{start_date} to {end_date}",
-                        'available_range': f"{data_range_info['actual_start']} to {data_range_info['actual_end']}",
-                        'data_points': data_range_info['data_points'],
-                        'data_source': data_range_info['source'],
-                        'coverage_percentage': round(coverage_percentage * 100, 1)
-                    }
-                else:
-                    data_range_message = {
-                        'warning': False,
-                        'message': f"📊 Partial data range available: {data_range_info['actual_start']} to {data_range_info['actual_end']} (requested {start_date} to {end_date})",
-                        'requested_range': f"{start_date} to {end_date}",
-                        'available_range': f"{data_range_info['actual_start']} to {data_range_info['actual_end']}",
-                        'data_points': data_range_info['data_points'],
-                        'data_source': data_range_info['source'],
-                        'coverage_percentage': round(coverage_percentage * 100, 1)
-                    }
-
-            except Exception as e:
-                error_msg = str(e)
-                if "API key" in error_msg.lower():
-                    return Response({"error": "Invalid API key. Please check your Alpha Vantage or Polygon API configuration."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-                elif "not found" in error_msg.lower() or "invalid" in error_msg.lower():
-                    return Response({"error": f"Invalid ticker symbol: {ticker}. Please check the symbol and try again."}, status=status.HTTP_400_BAD_REQUEST)
-                else:
-                    return Response({"error": f"Could not fetch market data from Polygon, yfinance, or Alpha Vantage: {error_msg}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-            # --- RUN THE BACKTESTING ENGINE ---
+                strategy = Strategy.objects.get(id=params['strategy_id'], user=request.user)
+            except Strategy.DoesNotExist:
+                return Response({"error": "Strategy not found."}, status=status.HTTP_404_NOT_FOUND)
+
+            results, backtest = execute_portfolio_backtest(
+                request.user, strategy.name, strategy.configuration, params, tickers
+            )
+            return Response(
+                {**downsample_results(results, max_points), 'backtest_id': backtest.id if backtest else None},
+                status=status.HTTP_200_OK
+            )
+
+        except BacktestError as e:
+            return Response({"error": e.message}, status=e.status_code)
+        except Exception as e:
+            return Response({"error": f"Unexpected error: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class OptimizeView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        """Queue a search of strategy parameters (full grid or successive halving); its result ranks the combinations"""
+        try:
+            params = parse_optimization_params(request.data)
+
             try:
-                print(f"DEBUG: Strategy configuration: {strategy.configuration}")
-                print(f"DEBUG: Initial cash: ${cash:,.2f}")
-                print(f"DEBUG: Leverage: {leverage}x")
-                
-                results = run_backtest(data, strategy.configuration, cash, leverage)
-                
-                # Check if backtest returned an error
-                if 'error' in results:
-                    print(f"Error: {results['error']}")
-                    return Response({"error": results['error']}, status=status.HTTP_400_BAD_REQUEST)
-                
-                if 'Equity Final [$]' not in results:
-                    print("Warning: 'Equity Final [$]' not found in results. This might indicate no trades were made.")
-                    print("Full results:", results)
-                else:
-                    print(results)
-                
+                strategy = Strategy.objects.get(id=params['strategy_id'], user=request.user)
+            except Strategy.DoesNotExist:
+                return Response({"error": "Strategy not found."}, status=status.HTTP_404_NOT_FOUND)
 
-                
-                # Save backtest results to database
-                try:
-                    # Increment total backtests counter first
-                    # Check daily backtest limit based on user tier
-                    today = timezone.now().date()
-                    today_backtests = Backtest.objects.filter(
-                        user=request.user,
-                        created_at__date=today
-                    ).count()
-                    
-                    daily_limit = request.user.profile.get_daily_backtest_limit()
-                    if today_backtests >= daily_limit:
-                        return Response({
-                            "error": f"You have reached your daily backtest limit of {daily_limit} for your {request.user.profile.tier.title()} tier. "
-                            f"Please upgrade your plan or try again tomorrow."
-                        }, status=status.HTTP_429_TOO_MANY_REQUESTS)
-                    
-                    user_profile = request.user.profile
-                    user_profile.total_backtests += 1
-                    user_profile.save()
-                    
-                    # Delete oldest backtests if user has more than 10
-                    user_backtests = Backtest.objects.filter(user=request.user)
-                    if user_backtests.count() >= 10:
-                        oldest_backtest = user_backtests.order_by('created_at').first()
-                        if oldest_backtest:
-                            oldest_backtest.delete()
-                    
-                    # Create new backtest record
-                    backtest = Backtest.objects.create(
-                        user=request.user,
-                        strategy_name=strategy.name,
-                        ticker=ticker.upper(),
-                        start_date=start_date,
-                        end_date=end_date,
-                        timeframe=timeframe,
-                        initial_cash=cash,
-                        leverage=leverage,
-                        results=results
-                    )
-                    print(f"Backtest saved with ID: {backtest.id}")
-                except Exception as save_error:
-                    print(f"Warning: Could not save backtest to database: {save_error}")
-                    # Don't fail the request if saving fails
-                
-                return Response(results, status=status.HTTP_200_OK)
-                
-            except Exception as e:
-                return Response({"error": f"An error occurred during the backtest: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-                
+            job, created = submit_backtest_job(request.user, strategy, params, kind='optimization')
+            return job_accepted(job, created)
+
+        except BacktestError as e:
+            return Response({"error": e.message}, status=e.status_code)
+        except Exception as e:
+            return Response({"error": f"Unexpected error: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class WalkForwardView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        """Queue a walk-forward optimization: optimize on rolling train windows, backtest each winner out of sample"""
+        try:
+            params = parse_walk_forward_params(request.data)
+
+            try:
+                strategy = Strategy.objects.get(id=params['strategy_id'], user=request.user)
+            except Strategy.DoesNotExist:
+                return Response({"error": "Strategy not found."}, status=status.HTTP_404_NOT_FOUND)
+
+            job, created = submit_backtest_job(request.user, strategy, params, kind='walk_forward')
+            return job_accepted(job, created)
+
+        except BacktestError as e:
+            return Response({"error": e.message}, status=e.status_code)
+        except Exception as e:
+            return Response({"error": f"Unexpected error: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class BacktestJobView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        """Queue a backtest and return its job id immediately"""
+        try:
+            params = parse_backtest_params(request.data)
+
+            try:
+                strategy = Strategy.objects.get(id=params['strategy_id'], user=request.user)
+            except Strategy.DoesNotExist:
+                return Response({"error": "Strategy not found."}, status=status.HTTP_404_NOT_FOUND)
+
+            job, created = submit_backtest_job(request.user, strategy, params)
+            return job_accepted(job, created)
+
+        except BacktestError as e:
+            return Response({"error": e.message}, status=e.status_code)
+        except Exception as e:
+            return Response({"error": f"Unexpected error: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class BatchBacktestView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        """Queue one job backtesting a strategy across a matrix of tickers and timeframes"""
+        try:
+            params = parse_batch_params(request.user, request.data)
+
+            try:
+                strategy = Strategy.objects.get(id=params['strategy_id'], user=request.user)
+            except Strategy.DoesNotExist:
+                return Response({"error": "Strategy not found."}, status=status.HTTP_404_NOT_FOUND)
+
+            job, created = submit_backtest_job(request.user, strategy, params, kind='batch')
+            return job_accepted(job, created, datasets=job.parameters['datasets'])
+
+        except BacktestError as e:
+            return Response({"error": e.message}, status=e.status_code)
         except Exception as e:
             return Response({"error": f"Unexpected error: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class BacktestJobStatusView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        """Get the current status of one of the user's backtest jobs"""
+        try:
+            job = BacktestJob.objects.select_related('backtest').get(id=job_id, user=request.user)
+        except BacktestJob.DoesNotExist:
+            return Response({"error": "Backtest job not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response(BacktestJobSerializer(job).data, status=status.HTTP_200_OK)
+
+
+class BacktestJobResultView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        """Get the results of a finished backtest job (202 while it is still queued or running)"""
+        try:
+            max_points = parse_max_points(request.query_params)
+        except BacktestError as e:
+            return Response({"error": e.message}, status=e.status_code)
+
+        try:
+            job = BacktestJob.objects.select_related('backtest').get(id=job_id, user=request.user)
+        except BacktestJob.DoesNotExist:
+            return Response({"error": "Backtest job not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        if job.status in ['queued', 'running']:
+            return Response({'job_id': str(job.id), 'status': job.status}, status=status.HTTP_202_ACCEPTED)
+
+        if job.status == 'failed':
+            return Response({"error": job.error}, status=job.error_status or status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        if job.kind == 'batch':
+            return Response(batch_summary(job), status=status.HTTP_200_OK)
+
+        if job.kind == 'optimization':
+            return Response(job.report, status=status.HTTP_200_OK)
+
+        if job.kind == 'walk_forward':
+            # The report keeps the out-of-sample stats; its curve and trades are the saved backtest's
+            report = dict(job.report)
+            if job.backtest is not None:
+                report['out_of_sample'] = downsample_results(job.backtest.full_results(), max_points)
+            return Response(report, status=status.HTTP_200_OK)
+
+        if job.backtest is None:
+            return Response({"error": "Backtest results are no longer available."}, status=status.HTTP_410_GONE)
+
+        return Response(downsample_results(job.backtest.full_results(), max_points), status=status.HTTP_200_OK)
+
+
+class BatchDatasetResultView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id, ticker, timeframe):
+        """Get the full results of one dataset of a finished batch backtest job"""
+        try:
+            max_points = parse_max_points(request.query_params)
+        except BacktestError as e:
+            return Response({"error": e.message}, status=e.status_code)
+
+        try:
+            result = BatchBacktestResult.objects.get(
+                job_id=job_id, job__user=request.user, job__status='completed', ticker=ticker, timeframe=timeframe
+            )
+        except BatchBacktestResult.DoesNotExist:
+            return Response({"error": "Batch result not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        if result.error:
+            return Response({"error": result.error}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(downsample_results(result.full_results(), max_points), status=status.HTTP_200_OK)
+
+
+class BacktestQueueStatsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """Get queue depth and wait times for each tier's backtest queue"""
+        try:
+            return Response({
+                'tiers': get_queue_stats(),
+                'your_tier': request.user.profile.tier,
+                'your_running_jobs': BacktestJob.objects.filter(user=request.user, status='running').count(),
+                'your_concurrency_limit': request.user.profile.get_backtest_concurrency_limit(),
+            }, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({"error": f"Error fetching queue stats: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 class RecentBacktestsView(APIView):
     permission_classes = [IsAuthenticated]
     
@@ -509,6 +538,91 @@ class RecentBacktestsView(APIView):
             return Response({"error": f"Error fetching backtests: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class BacktestDetailView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, backtest_id):
+        """Get one saved backtest with its full results (equity curve, dates and trades)"""
+        try:
+            max_points = parse_max_points(request.query_params)
+        except BacktestError as e:
+            return Response({"error": e.message}, status=e.status_code)
+
+        try:
+            backtest = Backtest.objects.select_related('artifact').get(id=backtest_id, user=request.user)
+        except Backtest.DoesNotExist:
+            return Response({"error": "Backtest not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        data = BacktestSerializer(backtest).data
+        if wants_stream(request.query_params):
+            light, inline = split_results(data.pop('results') or {})
+
+            def load_heavy():
+                heavy = {**inline, **backtest.heavy_results()}
+                # Streams send the full curve unless a point budget is asked for
+                return downsample_results(heavy, max_points) if 'max_points' in request.query_params else heavy
+
+            return ndjson_response(result_lines(light, load_heavy, {'backtest': data}))
+
+        data['results'] = downsample_results(backtest.full_results(), max_points)
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class BacktestChartRangeView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, backtest_id):
+        """Get the equity curve and close prices of a saved backtest for a [from, to] window, within a point budget"""
+        try:
+            start_minute, end_minute = parse_chart_range(request.query_params)
+            max_points = parse_max_points(request.query_params)
+
+            try:
+                backtest = Backtest.objects.get(id=backtest_id, user=request.user)
+            except Backtest.DoesNotExist:
+                return Response({"error": "Backtest not found."}, status=status.HTTP_404_NOT_FOUND)
+
+            return Response(chart_range(backtest, start_minute, end_minute, max_points), status=status.HTTP_200_OK)
+
+        except BacktestError as e:
+            return Response({"error": e.message}, status=e.status_code)
+        except Exception as e:
+            return Response({"error": f"Unexpected error: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ChartDataView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """Get OHLCV and indicator columns of a dataset window, as compact JSON arrays or streamed typed arrays"""
+        try:
+            params = parse_chart_data_params(request.query_params)
+
+            strategy_config = None
+            if params['strategy_id']:
+                try:
+                    strategy = Strategy.objects.get(id=params['strategy_id'], user=request.user)
+                except Strategy.DoesNotExist:
+                    return Response({"error": "Strategy not found."}, status=status.HTTP_404_NOT_FOUND)
+                strategy_config = strategy.configuration
+
+            times, values, step = chart_data(request.user, params, strategy_config)
+
+            if params['encoding'] == 'binary':
+                response = StreamingHttpResponse(
+                    chart_binary_chunks(times, values, step, params['dtype']), content_type='application/octet-stream'
+                )
+                response['X-Chart-Rows'] = str(len(times))
+                response['X-Chart-Columns'] = ','.join(values)
+                return response
+            return Response(chart_json(times, values, step), status=status.HTTP_200_OK)
+
+        except BacktestError as e:
+            return Response({"error": e.message}, status=e.status_code)
+        except Exception as e:
+            return Response({"error": f"Unexpected error: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 class AvailableDataView(APIView):
     permission_classes = [AllowAny]  # Allow anyone to see available data
     
@@ -589,10 +703,10 @@ class DashboardStatsView(APIView):
         try:
             user = request.user
             
-            # Get user's backtests
-            backtests = Backtest.objects.filter(user=user)
-            
-            if not backtests.exists():
+            # Get 3 most recent backtests for display (the chart fetches its equity curve from the detail endpoint)
+            recent_backtests = list(Backtest.objects.filter(user=user).defer('results').order_by('-created_at')[:3])
+
+            if not recent_backtests:
                 return Response({
                     'portfolio_summary': {
                         'total_backtests': 0,
@@ -609,49 +723,28 @@ class DashboardStatsView(APIView):
             total_backtests = user.profile.total_backtests  # Use the total counter instead of stored count
             total_strategies = Strategy.objects.filter(user=user).count()
             
+            # Per-strategy totals are kept up to date as backtests are saved and pruned
+            performance = list(StrategyPerformance.objects.filter(user=user))
+
             # Calculate total P&L and find best strategy return
-            total_pnl = 0
-            best_strategy_return = 0
-            
-            for backtest in backtests:
-                if backtest.results and 'stats' in backtest.results:
-                    stats = backtest.results['stats']
-                    if 'Return [%]' in stats:
-                        return_pct = float(stats['Return [%]'])
-                        total_pnl += return_pct
-                        if return_pct > best_strategy_return:
-                            best_strategy_return = return_pct
+            total_pnl = sum(strategy.total_return for strategy in performance)
+            best_strategy_return = max([0] + [strategy.best_return for strategy in performance if strategy.best_return is not None])
             
             # Get top performing strategies
             strategy_performance = {}
-            for backtest in backtests:
-                strategy_name = backtest.strategy_name
-                if strategy_name not in strategy_performance:
-                    strategy_performance[strategy_name] = {
-                        'name': strategy_name,
-                        'total_return': 0,
-                        'backtest_count': 0,
-                        'win_count': 0,
-                        'avg_return': 0
-                    }
-                
-                if backtest.results and 'stats' in backtest.results:
-                    stats = backtest.results['stats']
-                    if 'Return [%]' in stats:
-                        return_pct = float(stats['Return [%]'])
-                        strategy_performance[strategy_name]['total_return'] += return_pct
-                        strategy_performance[strategy_name]['backtest_count'] += 1
-                        if return_pct > 0:
-                            strategy_performance[strategy_name]['win_count'] += 1
-            
-            # Calculate averages and find best win rate
-            best_win_rate = 0
-            for strategy in strategy_performance.values():
-                if strategy['backtest_count'] > 0:
-                    strategy['avg_return'] = strategy['total_return'] / strategy['backtest_count']
-                    strategy['win_rate'] = (strategy['win_count'] / strategy['backtest_count']) * 100
-                    if strategy['win_rate'] > best_win_rate:
-                        best_win_rate = strategy['win_rate']
+            for strategy in performance:
+                strategy_performance[strategy.strategy_name] = {
+                    'name': strategy.strategy_name,
+                    'total_return': strategy.total_return,
+                    'backtest_count': strategy.return_count,
+                    'win_count': strategy.win_count,
+                    'avg_return': strategy.avg_return
+                }
+                if strategy.win_rate is not None:
+                    strategy_performance[strategy.strategy_name]['win_rate'] = strategy.win_rate
+
+            # Find best win rate
+            best_win_rate = max([0] + [strategy.win_rate for strategy in performance if strategy.win_rate is not None])
             
             # Ensure best_win_rate is always a valid number
             if not isinstance(best_win_rate, (int, float)) or best_win_rate < 0:
@@ -664,24 +757,20 @@ class DashboardStatsView(APIView):
                 reverse=True
             )[:3]
             
-            # Get 3 most recent backtests for display
             recent_backtests_data = []
-            for backtest in backtests.order_by('-created_at')[:3]:
-                if backtest.results and 'stats' in backtest.results:
-                    stats = backtest.results['stats']
-                    
-                    recent_backtests_data.append({
-                        'id': backtest.id,
-                        'strategy_name': backtest.strategy_name,
-                        'ticker': backtest.ticker,
-                        'return_pct': stats.get('Return [%]', 'N/A'),
-                        'final_equity': stats.get('Equity Final [$]', 'N/A'),
-                        'trade_count': stats.get('# Trades', 0),
-                        'created_at': backtest.created_at,
-                        'timeframe': backtest.timeframe,
-                        'leverage': backtest.leverage,
-                        'results': backtest.results  # Include full results for chart
-                    })
+            for backtest in recent_backtests:
+                recent_backtests_data.append({
+                    'id': backtest.id,
+                    'strategy_name': backtest.strategy_name,
+                    'ticker': backtest.ticker,
+                    'return_pct': backtest.return_pct if backtest.return_pct is not None else 'N/A',
+                    'final_equity': backtest.final_equity if backtest.final_equity is not None else 'N/A',
+                    'trade_count': backtest.trade_count,
+                    'max_drawdown': backtest.max_drawdown,
+                    'created_at': backtest.created_at,
+                    'timeframe': backtest.timeframe,
+                    'leverage': backtest.leverage,
+                })
             
             return Response({
                 'portfolio_summary': {
@@ -0,0 +1,24 @@
+# backend/api/worker_process.py
+"""
+Entry points for spawned backtest worker processes.
+
+A spawned child unpickles these functions before Django is configured, so this
+module must not import models (or anything that does) at import time.
+"""
+
+
+def init_worker_process():
+    """Each spawned worker needs its own Django setup and database connections."""
+    import django
+    django.setup()
+
+
+def run_job_in_worker(job_id, worker_id=None):
+    from django.db import connections
+    from .jobs import execute_job
+
+    try:
+        return execute_job(job_id, worker_id)
+    finally:
+        connections.close_all()
+
@@ -39,6 +39,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Listed early so it compresses responses after the other middleware is done with their bodies
+    'api.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -85,6 +87,26 @@ DATABASES = {
     }
 }
 
+# DATABASE_URL overrides the default connection, e.g. a throwaway Postgres for
+# running several backtest worker nodes locally, or sqlite:///db.sqlite3
+DATABASE_URL = os.environ.get('DATABASE_URL')
+if DATABASE_URL:
+    import dj_database_url
+    DATABASES['default'] = dj_database_url.parse(DATABASE_URL)
+
+# The 'backtests' cache is a table in the database, so every gunicorn and
+# backtest worker process on every node shares it: identical backtests running
+# at once are coalesced through it (see api.result_cache.SharedSingleFlight)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'backtests': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'backtest_cache',
+        'OPTIONS': {'MAX_ENTRIES': 500},
+    },
+}
 
 
 # Password validation
@@ -134,6 +156,11 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    # orjson-backed JSON (see api/renderers.py), and the browsable API for development
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 
 # JWT Token Settings
@@ -195,4 +222,17 @@ if FRONTEND_URL:
 # Email Configuration
 RESEND_API_KEY = os.environ.get('RESEND_API_KEY')
 if not RESEND_API_KEY:
-    raise ValueError("RESEND_API_KEY environment variable is required for email functionality")
\ No newline at end of file
+    raise ValueError("RESEND_API_KEY environment variable is required for email functionality")
+
+
+# Logging: the api app's loggers write to the console, at INFO unless API_LOG_LEVEL says otherwise
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api': {'handlers': ['console'], 'level': os.environ.get('API_LOG_LEVEL', 'INFO')},
+    },
+}
@@ -10,6 +10,10 @@ import 'react-datepicker/dist/react-datepicker.css';
 import { format, parseISO } from 'date-fns';
 
 interface SavedStrategy { id: number; name: string; }
+
+// How often, and for how long, to poll a queued backtest before giving up
+const JOB_POLL_INTERVAL_MS = 1000;
+const JOB_MAX_WAIT_MS = 5 * 60 * 1000;
 interface BacktestResults { 
   stats: any; 
   plot_data: any; 
@@ -135,7 +139,8 @@ const BacktestPage: React.FC = () => {
     setResults(null);
     
     try {
-      const response = await api.post('/api/backtest/', {
+      // Queue the backtest
+      const job = await api.post('/api/backtest-jobs/', {
         strategy_id: selectedStrategy,
         ticker: ticker.trim().toUpperCase(),
         start_date: parseDate(startDate),
@@ -145,6 +150,19 @@ const BacktestPage: React.FC = () => {
         leverage: leverageAmount,
       });
       
+      // Poll until a worker has finished it. A failed job answers with its error status,
+      // which api.get throws and the catch below shows like any other error
+      const deadline = Date.now() + JOB_MAX_WAIT_MS;
+      let response = await api.get(job.data.result_url);
+      while (response.status === 202) {
+        if (Date.now() >= deadline) {
+          setError('The backtest is taking longer than expected. It will keep running; check Recent Backtests in a few minutes.');
+          return;
+        }
+        await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+        response = await api.get(job.data.result_url);
+      }
+      
       // Check if the response contains an error
       if (response.data.error) {
         setError(response.data.error);
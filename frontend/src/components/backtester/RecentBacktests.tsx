@@ -12,6 +12,10 @@ interface Backtest {
   initial_cash: string;
   leverage: string;
   results: any;
+  return_pct: number | null;
+  final_equity: number | null;
+  trade_count: number;
+  max_drawdown: number | null;
   created_at: string;
 }
 
@@ -34,7 +34,7 @@ interface DashboardStats {
     created_at: string;
     timeframe: string;
     leverage: string;
-    results: any;
+    max_drawdown: number | null;
   }>;
 }
 
@@ -1,4 +1,5 @@
-import React from 'react';
+import React, { useEffect, useState } from 'react';
+import api from '../../api';
 import './RecentBacktestChart.css';
 
 interface RecentBacktest {
@@ -11,7 +12,7 @@ interface RecentBacktest {
   created_at: string;
   timeframe: string;
   leverage: string;
-  results: any;
+  max_drawdown?: number | null;
 }
 
 interface RecentBacktestChartProps {
@@ -19,6 +20,25 @@ interface RecentBacktestChartProps {
 }
 
 const RecentBacktestChart: React.FC<RecentBacktestChartProps> = ({ backtest }) => {
+  // The dashboard only sends summaries; the equity curve comes from the backtest's detail endpoint
+  const [results, setResults] = useState<any>(null);
+
+  useEffect(() => {
+    setResults(null);
+    if (!backtest) return;
+
+    let cancelled = false;
+    // The chart is 400 units wide, so more points than that would not be drawn
+    api.get(`/api/backtests/${backtest.id}/`, { params: { max_points: 400 } })
+      .then((response) => {
+        if (!cancelled) setResults(response.data.results);
+      })
+      .catch((error) => console.error("Failed to fetch backtest results", error));
+    return () => {
+      cancelled = true;
+    };
+  }, [backtest?.id]);
+
   if (!backtest) {
     return (
       <div className="dashboard-card recent-backtest-chart">
@@ -79,7 +99,7 @@ const RecentBacktestChart: React.FC<RecentBacktestChartProps> = ({ backtest }) =
 
   // Generate a beautiful, compact equity curve chart
   const generateEquityCurve = () => {
-    if (!backtest.results) {
+    if (!results) {
       // Fallback to a beautiful line chart
       return (
         <svg width="100%" height="120" viewBox="0 0 400 120" preserveAspectRatio="none">
@@ -103,24 +123,24 @@ const RecentBacktestChart: React.FC<RecentBacktestChartProps> = ({ backtest }) =
     let equityData = null;
     
     // Check for plot_data.equity_curve (the actual structure from backtester)
-    if (backtest.results.plot_data && backtest.results.plot_data.equity_curve) {
-      equityData = backtest.results.plot_data.equity_curve;
+    if (results.plot_data && results.plot_data.equity_curve) {
+      equityData = results.plot_data.equity_curve;
     }
     // Check for equity_curve in results (fallback)
-    else if (backtest.results.equity_curve) {
-      equityData = backtest.results.equity_curve;
+    else if (results.equity_curve) {
+      equityData = results.equity_curve;
     }
     // Check for equity curve in stats
-    else if (backtest.results.stats && backtest.results.stats.equity_curve) {
-      equityData = backtest.results.stats.equity_curve;
+    else if (results.stats && results.stats.equity_curve) {
+      equityData = results.stats.equity_curve;
     }
     // Check for portfolio value progression
-    else if (backtest.results.portfolio_values) {
-      equityData = backtest.results.portfolio_values;
+    else if (results.portfolio_values) {
+      equityData = results.portfolio_values;
     }
     // Check for any array of numeric values that could represent equity
-    else if (backtest.results.equity && Array.isArray(backtest.results.equity)) {
-      equityData = backtest.results.equity;
+    else if (results.equity && Array.isArray(results.equity)) {
+      equityData = results.equity;
     }
 
     // If we have actual equity curve data, use it